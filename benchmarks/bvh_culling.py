@@ -0,0 +1,67 @@
+"""Benchmarks frustum culling with :py:mod:`pygly.bvh` against
+testing every box with :py:func:`pygly.frustum.aabb_mask`.
+
+Usage::
+
+    python benchmarks/bvh_culling.py
+"""
+
+import timeit
+
+import numpy
+from pyrr import matrix44
+
+from pygly import frustum
+from pygly.bvh import BVH
+
+
+def create_aabbs( count, size ):
+    centres = numpy.random.uniform( -size, size, (count, 3) )
+    extents = numpy.random.uniform( 0.1, 3.0, (count, 3) )
+    return numpy.concatenate(
+        ( ( centres - extents )[ :, numpy.newaxis ], ( centres + extents )[ :, numpy.newaxis ] ),
+        axis = 1
+        )
+
+def benchmark( count, repeat = 5 ):
+    # keep the density of the scene constant
+    size = 500.0 * ( count / 100000.0 ) ** ( 1.0 / 3.0 )
+    aabbs = create_aabbs( count, size )
+
+    view = matrix44.create_from_translation( [ 0.0, 0.0, -size * 0.2 ] )
+    projection = matrix44.create_perspective_projection_matrix( 60.0, 1.5, 1.0, size * 0.8 )
+    planes = frustum.planes_from_matrix( numpy.dot( view, projection ) )
+
+    build_time = timeit.timeit( lambda: BVH( aabbs ), number = 1 )
+    bvh = BVH( aabbs )
+
+    def brute_force():
+        numpy.nonzero( frustum.aabb_mask( planes, aabbs ) )[ 0 ]
+
+    def hierarchy():
+        bvh.frustum( planes )
+
+    brute_time = min( timeit.repeat( brute_force, number = 1, repeat = repeat ) )
+    query_time = min( timeit.repeat( hierarchy, number = 1, repeat = repeat ) )
+    visible = len( bvh.frustum( planes ) )
+
+    return build_time, brute_time, query_time, visible
+
+def main():
+    print "%10s %10s %10s %10s %12s %8s" % (
+        'boxes', 'visible', 'build ms', 'brute ms', 'bvh ms', 'speedup'
+        )
+    for count in [ 10000, 100000, 1000000 ]:
+        build_time, brute_time, query_time, visible = benchmark( count )
+        print "%10d %10d %10.1f %10.2f %12.2f %8.2f" % (
+            count,
+            visible,
+            build_time * 1000.0,
+            brute_time * 1000.0,
+            query_time * 1000.0,
+            brute_time / query_time
+            )
+
+
+if __name__ == '__main__':
+    main()
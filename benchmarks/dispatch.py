@@ -0,0 +1,62 @@
+"""Benchmarks the backends of :py:mod:`pygly.dispatcher`.
+
+Measures the cost of connecting handlers, sending a signal
+to a sender with handlers, and sending a signal to a sender
+without any handlers.
+
+Usage::
+
+    python benchmarks/dispatch.py
+"""
+
+import timeit
+
+from pygly import dispatcher
+
+
+class Sender( object ):
+    pass
+
+class Receiver( object ):
+    def handler( self, value ):
+        pass
+
+
+def benchmark( backend, count = 10000, handlers = 4 ):
+    dispatcher.set_backend( backend )
+
+    senders = [ Sender() for index in xrange( count ) ]
+    receivers = [ Receiver() for index in xrange( handlers ) ]
+
+    def connect():
+        for sender in senders:
+            for receiver in receivers:
+                dispatcher.connect( receiver.handler, 'signal', sender )
+
+    def send():
+        for sender in senders:
+            dispatcher.send( 'signal', sender, 1 )
+
+    def send_unconnected():
+        for sender in senders:
+            dispatcher.send( 'other', sender, 1 )
+
+    connect_time = timeit.timeit( connect, number = 1 )
+    send_time = min( timeit.repeat( send, number = 1, repeat = 5 ) )
+    unconnected_time = min( timeit.repeat( send_unconnected, number = 1, repeat = 5 ) )
+
+    # per operation, in microseconds
+    return (
+        connect_time / ( count * handlers ) * 1.0e6,
+        send_time / count * 1.0e6,
+        unconnected_time / count * 1.0e6,
+        )
+
+def main():
+    print "%12s %12s %12s %12s" % ( 'backend', 'connect us', 'send us', 'no-op us' )
+    for backend in [ 'pydispatch', 'slots' ]:
+        print "%12s %12.2f %12.2f %12.2f" % ( ( backend, ) + benchmark( backend ) )
+
+
+if __name__ == '__main__':
+    main()
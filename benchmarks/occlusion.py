@@ -0,0 +1,113 @@
+"""Benchmarks occlusion culling with :py:class:`pygly.occlusion.OcclusionBuffer`
+in a city of box shaped buildings, viewed from street level.
+
+Usage::
+
+    python benchmarks/occlusion.py [width] [height]
+"""
+
+import sys
+import timeit
+
+import numpy
+from pyrr import matrix44
+
+from pygly import frustum
+from pygly.occlusion import OcclusionBuffer
+
+
+# the 12 triangles of a unit cube, as indices of its corners
+cube_triangles = numpy.array( [
+    [ 0, 2, 1 ], [ 1, 2, 3 ],
+    [ 4, 5, 6 ], [ 5, 7, 6 ],
+    [ 0, 1, 4 ], [ 1, 5, 4 ],
+    [ 2, 6, 3 ], [ 3, 6, 7 ],
+    [ 0, 4, 2 ], [ 2, 4, 6 ],
+    [ 1, 3, 5 ], [ 3, 7, 5 ],
+    ] )
+
+def box_triangles( aabbs ):
+    corners = numpy.empty( ( len( aabbs ), 8, 3 ) )
+    for corner in xrange( 8 ):
+        for axis in xrange( 3 ):
+            corners[ :, corner, axis ] = aabbs[ :, ( corner >> axis ) & 1, axis ]
+    return corners[ :, cube_triangles ].reshape( -1, 3, 3 )
+
+def create_city( building_count, object_count, size = 1000.0 ):
+    # buildings on a grid of blocks
+    blocks = int( numpy.ceil( numpy.sqrt( building_count ) ) )
+    spacing = size * 2.0 / blocks
+    x, z = numpy.meshgrid( numpy.arange( blocks ), numpy.arange( blocks ) )
+    centres = ( numpy.column_stack( ( x.ravel(), z.ravel() ) )[ :building_count ] + 0.5 ) * spacing - size
+    extents = numpy.random.uniform( 0.25, 0.4, ( building_count, 2 ) ) * spacing
+    heights = numpy.random.uniform( 20.0, 120.0, building_count )
+
+    buildings = numpy.zeros( ( building_count, 2, 3 ) )
+    buildings[ :, 0, 0 ] = centres[ :, 0 ] - extents[ :, 0 ]
+    buildings[ :, 1, 0 ] = centres[ :, 0 ] + extents[ :, 0 ]
+    buildings[ :, 0, 2 ] = centres[ :, 1 ] - extents[ :, 1 ]
+    buildings[ :, 1, 2 ] = centres[ :, 1 ] + extents[ :, 1 ]
+    buildings[ :, 1, 1 ] = heights
+
+    # small objects scattered through the city
+    positions = numpy.random.uniform( -size, size, ( object_count, 3 ) )
+    positions[ :, 1 ] = numpy.random.uniform( 0.0, 10.0, object_count )
+    object_extents = numpy.random.uniform( 0.5, 2.0, ( object_count, 3 ) )
+    objects = numpy.concatenate(
+        ( ( positions - object_extents )[ :, numpy.newaxis ], ( positions + object_extents )[ :, numpy.newaxis ] ),
+        axis = 1
+        )
+    return buildings, objects
+
+def benchmark( width, height, building_count, object_count, repeat = 5 ):
+    buildings, objects = create_city( building_count, object_count )
+    occluders = box_triangles( buildings )
+
+    # a street level camera looking along a street
+    view = matrix44.multiply(
+        matrix44.create_from_translation( [ 0.0, -2.0, 0.0 ] ),
+        matrix44.create_from_y_rotation( 0.3 )
+        )
+    projection = matrix44.create_perspective_projection_matrix( 70.0, 2.0, 1.0, 2000.0 )
+    matrix = numpy.dot( view, projection )
+    planes = frustum.planes_from_matrix( matrix )
+
+    buffer = OcclusionBuffer( width, height )
+    def rasterize():
+        buffer.clear()
+        buffer.rasterize( matrix, occluders, double_sided = False )
+        buffer.pyramid
+
+    rasterize_time = min( timeit.repeat( rasterize, number = 1, repeat = repeat ) )
+
+    candidates = objects[ frustum.aabb_mask( planes, objects ) ]
+    test_time = min( timeit.repeat( lambda: buffer.test( matrix, candidates ), number = 1, repeat = repeat ) )
+    buffer.test( matrix, candidates )
+    return rasterize_time, test_time, len( occluders ), len( candidates ), buffer.culled
+
+def main():
+    width = int( sys.argv[ 1 ] ) if len( sys.argv ) > 1 else 256
+    height = int( sys.argv[ 2 ] ) if len( sys.argv ) > 2 else 128
+
+    print "%10s %10s %10s %14s %10s %10s %10s" % (
+        'buildings', 'triangles', 'objects', 'rasterize ms', 'in view', 'culled', 'test ms' )
+    for building_count, object_count in [ ( 400, 10000 ), ( 1600, 100000 ), ( 6400, 1000000 ) ]:
+        rasterize_time, test_time, triangle_count, candidate_count, culled = benchmark(
+            width,
+            height,
+            building_count,
+            object_count
+            )
+        print "%10d %10d %10d %14.2f %10d %10d %10.2f" % (
+            building_count,
+            triangle_count,
+            object_count,
+            rasterize_time * 1000.0,
+            candidate_count,
+            culled,
+            test_time * 1000.0
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Benchmarks frustum culling of a scene of moving boxes with
+:py:mod:`pygly.octree`, :py:mod:`pygly.bvh` and
+:py:func:`pygly.frustum.aabb_mask`.
+
+Each frame a fraction of the boxes move, the structure is
+updated and then queried.
+
+Usage::
+
+    python benchmarks/octree_dynamic.py [moving fraction]
+"""
+
+import sys
+import timeit
+
+import numpy
+from pyrr import matrix44
+
+from pygly import frustum
+from pygly.bvh import BVH
+from pygly.octree import LooseOctree
+
+
+def create_aabbs( centres ):
+    extents = numpy.random.uniform( 0.1, 3.0, centres.shape )
+    return numpy.concatenate(
+        ( ( centres - extents )[ :, numpy.newaxis ], ( centres + extents )[ :, numpy.newaxis ] ),
+        axis = 1
+        )
+
+def benchmark( count, fraction, frames = 10 ):
+    size = 500.0 * ( count / 100000.0 ) ** ( 1.0 / 3.0 )
+    centres = numpy.random.uniform( -size, size, (count, 3) )
+    aabbs = create_aabbs( centres )
+
+    view = matrix44.create_from_translation( [ 0.0, 0.0, -size * 0.2 ] )
+    projection = matrix44.create_perspective_projection_matrix( 60.0, 1.5, 1.0, size * 0.8 )
+    planes = frustum.planes_from_matrix( numpy.dot( view, projection ) )
+
+    # the boxes that move and their positions each frame
+    moving = numpy.random.choice( count, int( count * fraction ), replace = False )
+    moves = []
+    for frame in xrange( frames ):
+        aabbs = aabbs.copy()
+        aabbs[ moving ] += numpy.random.uniform( -1.0, 1.0, (len( moving ), 1, 3) )
+        moves.append( aabbs )
+
+    octree = LooseOctree( [ 0.0, 0.0, 0.0 ], size * 2.0 )
+    slots = numpy.array( [
+        octree.insert( index, moves[ 0 ][ index ] )
+        for index in xrange( count )
+        ] )[ moving ]
+    bvh = BVH( moves[ 0 ] )
+
+    def brute_force():
+        for aabbs in moves:
+            numpy.nonzero( frustum.aabb_mask( planes, aabbs ) )[ 0 ]
+
+    def octree_frames():
+        for aabbs in moves:
+            octree.update_slots( slots, aabbs[ moving ] )
+            octree.frustum( planes )
+
+    def bvh_frames():
+        for aabbs in moves:
+            bvh.update( aabbs )
+            bvh.frustum( planes )
+
+    brute_time = min( timeit.repeat( brute_force, number = 1, repeat = 3 ) ) / frames
+    octree_time = min( timeit.repeat( octree_frames, number = 1, repeat = 3 ) ) / frames
+    bvh_time = min( timeit.repeat( bvh_frames, number = 1, repeat = 3 ) ) / frames
+    return brute_time, octree_time, bvh_time
+
+def main():
+    fraction = float( sys.argv[ 1 ] ) if len( sys.argv ) > 1 else 0.1
+
+    print "%10s %10s %10s %10s" % ( 'boxes', 'brute ms', 'octree ms', 'bvh ms' )
+    for count in [ 10000, 100000 ]:
+        brute_time, octree_time, bvh_time = benchmark( count, fraction )
+        print "%10d %10.2f %10.2f %10.2f" % (
+            count,
+            brute_time * 1000.0,
+            octree_time * 1000.0,
+            bvh_time * 1000.0
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""Benchmarks picking with :py:class:`pygly.picking.Picker`
+against testing the triangles of every node.
+
+The scene is made of nodes sharing a few tessellated meshes,
+with random positions and scales.
+
+Usage::
+
+    python benchmarks/picking.py [rays]
+"""
+
+import sys
+import timeit
+
+import numpy
+from pyrr import matrix44
+
+from pygly import affine
+from pygly.bvh import BVH
+from pygly.picking import Picker, ray_triangles, transform_rays
+
+
+def create_mesh( divisions ):
+    # a bumpy square of triangles
+    steps = numpy.linspace( -1.0, 1.0, divisions + 1 )
+    x, y = numpy.meshgrid( steps, steps )
+    z = numpy.sin( x * 3.0 ) * numpy.cos( y * 3.0 ) * 0.2
+    vertices = numpy.dstack( ( x, y, z ) )
+    corners = [
+        vertices[ :-1, :-1 ],
+        vertices[ :-1, 1: ],
+        vertices[ 1:, 1: ],
+        vertices[ 1:, :-1 ],
+        ]
+    first = numpy.stack( corners[ 0:3 ], axis = 2 ).reshape( -1, 3, 3 )
+    second = numpy.stack( [ corners[ 0 ], corners[ 2 ], corners[ 3 ] ], axis = 2 ).reshape( -1, 3, 3 )
+    return numpy.concatenate( ( first, second ) )
+
+def create_scene( count, mesh_count, divisions ):
+    size = 50.0 * ( count / 1000.0 ) ** ( 1.0 / 3.0 )
+    meshes = [ create_mesh( divisions ) for index in xrange( mesh_count ) ]
+    mesh_indices = numpy.random.randint( 0, mesh_count, count )
+
+    matrices = numpy.empty( ( count, 4, 4 ) )
+    for index in xrange( count ):
+        matrices[ index ] = reduce( matrix44.multiply, [
+            matrix44.create_from_x_rotation( numpy.random.uniform( -numpy.pi, numpy.pi ) ),
+            matrix44.create_from_y_rotation( numpy.random.uniform( -numpy.pi, numpy.pi ) ),
+            matrix44.create_from_scale( [ numpy.random.uniform( 1.0, 4.0 ) ] * 3 ),
+            matrix44.create_from_translation( numpy.random.uniform( -size, size, 3 ) ),
+            ] )
+
+    local_bounds = numpy.array( [
+        [ mesh.reshape( -1, 3 ).min( axis = 0 ), mesh.reshape( -1, 3 ).max( axis = 0 ) ]
+        for mesh in meshes
+        ] )
+    aabbs = affine.transform_aabbs( local_bounds[ mesh_indices ], matrices )
+    return meshes, mesh_indices, matrices, aabbs, size
+
+def create_rays( count, size ):
+    origins = numpy.random.uniform( -size, size, (count, 3) )
+    targets = numpy.random.uniform( -size * 0.5, size * 0.5, (count, 3) )
+    directions = targets - origins
+    directions /= numpy.linalg.norm( directions, axis = 1 )[ :, numpy.newaxis ]
+    return numpy.concatenate( ( origins[ :, numpy.newaxis ], directions[ :, numpy.newaxis ] ), axis = 1 )
+
+def brute_force( ray, meshes, mesh_indices, matrices ):
+    inverses = affine.inverse( matrices )
+    nearest = numpy.inf
+    for index, inverse in enumerate( inverses ):
+        distances = ray_triangles( transform_rays( ray, inverse ), meshes[ mesh_indices[ index ] ] )[ 0 ]
+        nearest = min( nearest, distances.min() )
+    return nearest
+
+def benchmark( count, ray_count, mesh_count = 8, divisions = 40, repeat = 3 ):
+    meshes, mesh_indices, matrices, aabbs, size = create_scene( count, mesh_count, divisions )
+    rays = create_rays( ray_count, size )
+
+    bvh = BVH( aabbs )
+    picker = Picker( meshes )
+
+    def pick():
+        for ray in rays:
+            picker.pick( ray, bvh, mesh_indices, matrices )
+
+    pick_time = min( timeit.repeat( pick, number = 1, repeat = repeat ) ) / ray_count
+    hits = sum( picker.pick( ray, bvh, mesh_indices, matrices ) is not None for ray in rays )
+
+    if count <= 1000:
+        brute_time = min( timeit.repeat(
+            lambda: brute_force( rays[ 0 ], meshes, mesh_indices, matrices ),
+            number = 1,
+            repeat = 1
+            ) )
+    else:
+        brute_time = None
+
+    return pick_time, brute_time, hits
+
+def main():
+    ray_count = int( sys.argv[ 1 ] ) if len( sys.argv ) > 1 else 200
+
+    print "%10s %10s %10s %10s %12s" % ( 'nodes', 'triangles', 'hits', 'pick ms', 'brute ms' )
+    for count in [ 1000, 10000, 100000 ]:
+        pick_time, brute_time, hits = benchmark( count, ray_count )
+        print "%10d %10d %10d %10.3f %12s" % (
+            count,
+            count * 2 * 40 * 40,
+            hits,
+            pick_time * 1000.0,
+            '%.2f' % ( brute_time * 1000.0 ) if brute_time is not None else '-'
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Benchmarks projecting points and selecting them with a rectangle
+using :py:mod:`pygly.screen_space`, against projecting one point at
+a time with :py:func:`pyrr.matrix44.apply_to_vector`.
+
+Usage::
+
+    python benchmarks/screen_space.py
+"""
+
+import timeit
+
+import numpy
+from pyrr import matrix44
+
+from pygly import screen_space
+
+
+def per_point_rectangle( matrix, rect, points, selection ):
+    low = selection[ 0 ]
+    high = selection[ 0 ] + selection[ 1 ]
+    selected = []
+    for index, point in enumerate( points ):
+        clip = matrix44.apply_to_vector( matrix, numpy.append( point, 1.0 ) )
+        if clip[ 3 ] <= 0.0:
+            continue
+        ndc = clip[ 0:3 ] / clip[ 3 ]
+        if numpy.any( numpy.abs( ndc ) > 1.0 ):
+            continue
+        pixel = rect[ 0 ] + ( ndc[ 0:2 ] + 1.0 ) * 0.5 * rect[ 1 ]
+        if numpy.all( pixel >= low ) and numpy.all( pixel <= high ):
+            selected.append( index )
+    return selected
+
+def benchmark( count, repeat = 5 ):
+    view = matrix44.create_from_translation( [ 0.0, 0.0, -100.0 ] )
+    projection = matrix44.create_perspective_projection_matrix( 60.0, 1.5, 1.0, 500.0 )
+    matrix = numpy.dot( view, projection )
+    rect = numpy.array( [ [ 0, 0 ], [ 1920, 1080 ] ] )
+    selection = numpy.array( [ [ 500.0, 300.0 ], [ 600.0, 400.0 ] ] )
+    points = numpy.random.uniform( -100.0, 100.0, (count, 3) )
+
+    project_time = min( timeit.repeat(
+        lambda: screen_space.project( matrix, rect, points ),
+        number = 1,
+        repeat = repeat
+        ) )
+    unproject_time = min( timeit.repeat(
+        lambda: screen_space.unproject( matrix, rect, points[ :, 0:2 ], 0.5 ),
+        number = 1,
+        repeat = repeat
+        ) )
+    select_time = min( timeit.repeat(
+        lambda: screen_space.rectangle_mask( matrix, rect, points, selection ),
+        number = 1,
+        repeat = repeat
+        ) )
+
+    if count <= 10000:
+        per_point_time = min( timeit.repeat(
+            lambda: per_point_rectangle( matrix, rect, points, selection ),
+            number = 1,
+            repeat = 1
+            ) )
+    else:
+        per_point_time = None
+
+    return project_time, unproject_time, select_time, per_point_time
+
+def main():
+    print "%10s %12s %14s %12s %14s" % ( 'points', 'project ms', 'unproject ms', 'select ms', 'per point ms' )
+    for count in [ 1000, 10000, 100000, 1000000 ]:
+        project_time, unproject_time, select_time, per_point_time = benchmark( count )
+        print "%10d %12.2f %14.2f %12.2f %14s" % (
+            count,
+            project_time * 1000.0,
+            unproject_time * 1000.0,
+            select_time * 1000.0,
+            '%.2f' % ( per_point_time * 1000.0 ) if per_point_time is not None else '-'
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""Benchmarks rebuilding a :py:class:`pygly.spatial_hash.SpatialHash`
+each frame and querying it, against testing every point.
+
+Usage::
+
+    python benchmarks/spatial_hash.py [queries]
+"""
+
+import sys
+import timeit
+
+import numpy
+
+from pygly.spatial_hash import SpatialHash
+
+
+def brute_force_radius( positions, points, radius ):
+    for point in points:
+        numpy.nonzero( ( ( positions - point ) ** 2 ).sum( axis = 1 ) <= radius ** 2 )[ 0 ]
+
+def benchmark( count, query_count, radius = 10.0, k = 8, repeat = 3 ):
+    # keep the density of the points constant
+    size = 500.0 * ( count / 100000.0 ) ** ( 1.0 / 3.0 )
+    positions = numpy.random.uniform( -size, size, (count, 3) )
+    points = numpy.random.uniform( -size, size, (query_count, 3) )
+
+    build_time = min( timeit.repeat( lambda: SpatialHash( radius, positions ), number = 1, repeat = repeat ) )
+    grid = SpatialHash( radius, positions )
+    radius_time = min( timeit.repeat( lambda: grid.radius( points, radius ), number = 1, repeat = repeat ) )
+    nearest_time = min( timeit.repeat( lambda: grid.nearest( points, k ), number = 1, repeat = repeat ) )
+
+    if count <= 100000:
+        brute_time = min( timeit.repeat(
+            lambda: brute_force_radius( positions, points, radius ),
+            number = 1,
+            repeat = 1
+            ) )
+    else:
+        brute_time = None
+
+    return build_time, radius_time, nearest_time, brute_time
+
+def main():
+    query_count = int( sys.argv[ 1 ] ) if len( sys.argv ) > 1 else 5000
+
+    print "%10s %10s %10s %10s %12s" % ( 'points', 'build ms', 'radius ms', 'knn ms', 'brute ms' )
+    for count in [ 10000, 100000, 1000000 ]:
+        build_time, radius_time, nearest_time, brute_time = benchmark( count, query_count )
+        print "%10d %10.2f %10.2f %10.2f %12s" % (
+            count,
+            build_time * 1000.0,
+            radius_time * 1000.0,
+            nearest_time * 1000.0,
+            '%.2f' % ( brute_time * 1000.0 ) if brute_time is not None else '-'
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""Benchmarks updating a :py:class:`pygly.sweep_and_prune.SweepAndPrune`
+as boxes move, against sorting from scratch each frame and
+testing every pair of boxes.
+
+Usage::
+
+    python benchmarks/sweep_and_prune.py [speed]
+"""
+
+import sys
+import timeit
+
+import numpy
+
+from pygly.sweep_and_prune import SweepAndPrune
+
+
+def brute_force_pairs( aabbs, block = 1000 ):
+    for start in xrange( 0, len( aabbs ), block ):
+        boxes = aabbs[ start:start + block ]
+        numpy.nonzero( numpy.all(
+            ( boxes[ :, numpy.newaxis, 0 ] <= aabbs[ :, 1 ] ) & ( aabbs[ :, 0 ] <= boxes[ :, numpy.newaxis, 1 ] ),
+            axis = 2
+            ) )
+
+def benchmark( count, speed, frame_count = 10, repeat = 3 ):
+    # keep the density of the boxes constant
+    size = 500.0 * ( count / 100000.0 ) ** ( 1.0 / 3.0 )
+    centres = numpy.random.uniform( -size, size, (count, 3) )
+    extents = numpy.random.uniform( 0.5, 3.0, (count, 3) )
+
+    frames = []
+    for frame in xrange( frame_count ):
+        centres = centres + numpy.random.uniform( -speed, speed, centres.shape )
+        frames.append( numpy.array( [ centres - extents, centres + extents ] ).transpose( 1, 0, 2 ) )
+
+    broadphase = SweepAndPrune()
+    def incremental():
+        for aabbs in frames:
+            broadphase.update( aabbs )
+
+    def full():
+        for aabbs in frames:
+            broadphase.reset()
+            broadphase.update( aabbs )
+
+    # the first frame is sorted from scratch
+    broadphase.update( frames[ 0 ] )
+    incremental_time = min( timeit.repeat( incremental, number = 1, repeat = repeat ) ) / frame_count
+    full_time = min( timeit.repeat( full, number = 1, repeat = repeat ) ) / frame_count
+
+    if count <= 10000:
+        brute_time = min( timeit.repeat(
+            lambda: brute_force_pairs( frames[ 0 ] ),
+            number = 1,
+            repeat = 1
+            ) )
+    else:
+        brute_time = None
+
+    return incremental_time, full_time, brute_time, len( broadphase.pairs )
+
+def main():
+    speed = float( sys.argv[ 1 ] ) if len( sys.argv ) > 1 else 0.01
+
+    print "%10s %10s %14s %10s %12s" % ( 'boxes', 'pairs', 'incremental ms', 'full ms', 'brute ms' )
+    for count in [ 1000, 10000, 100000 ]:
+        incremental_time, full_time, brute_time, pair_count = benchmark( count, speed )
+        print "%10d %10d %14.2f %10.2f %12s" % (
+            count,
+            pair_count,
+            incremental_time * 1000.0,
+            full_time * 1000.0,
+            '%.2f' % ( brute_time * 1000.0 ) if brute_time is not None else '-'
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""Benchmarks the serial and thread-pool world matrix updates
+of :py:mod:`pygly.transform_array`.
+
+Usage::
+
+    python benchmarks/transform_update.py [workers]
+
+Requires concurrent.futures (the 'futures' package on Python 2).
+"""
+
+import sys
+import timeit
+
+import numpy
+from concurrent import futures
+
+from pygly import transform_array
+
+
+def create_tree( count, fanout = 8 ):
+    """Creates the arrays for a complete tree in depth-first pre-order.
+    """
+    # a complete tree is simple to describe in breadth-first order
+    bfs_parents = ( numpy.arange( count ) - 1 ) // fanout
+    bfs_parents[ 0 ] = -1
+
+    # re-order it into depth-first pre-order
+    order = []
+    stack = [ 0 ]
+    while stack:
+        node = stack.pop()
+        order.append( node )
+        first = node * fanout + 1
+        stack.extend( reversed( xrange( first, min( first + fanout, count ) ) ) )
+    order = numpy.array( order )
+
+    remap = numpy.empty( count, dtype = numpy.int )
+    remap[ order ] = numpy.arange( count )
+
+    parents = bfs_parents[ order ]
+    parents[ 1: ] = remap[ parents[ 1: ] ]
+
+    depths = numpy.zeros( count, dtype = numpy.int )
+    for index in xrange( 1, count ):
+        depths[ index ] = depths[ parents[ index ] ] + 1
+
+    return parents, depths, transform_array.subtree_ends( parents )
+
+def create_locals( count ):
+    translations = numpy.random.uniform( -10.0, 10.0, (count, 3) )
+    orientations = numpy.random.normal( size = (count, 4) )
+    orientations /= numpy.sqrt( ( orientations ** 2 ).sum( axis = 1 ) )[ :, numpy.newaxis ]
+    scales = numpy.random.uniform( 0.5, 2.0, (count, 3) )
+    return transform_array.create_matrices( translations, orientations, scales )
+
+def benchmark( count, workers, repeat = 5 ):
+    parents, depths, ends = create_tree( count )
+    local_matrices = create_locals( count )
+    out = numpy.empty_like( local_matrices )
+
+    levels = transform_array.levels( depths )
+    top, batches = transform_array.partition( depths, ends, workers )
+
+    def serial():
+        transform_array.world_matrices( local_matrices, parents, levels, out = out )
+
+    executor = futures.ThreadPoolExecutor( workers )
+    def parallel():
+        transform_array.world_matrices_parallel(
+            local_matrices,
+            parents,
+            top,
+            batches,
+            executor,
+            out = out
+            )
+
+    serial_time = min( timeit.repeat( serial, number = 1, repeat = repeat ) )
+    parallel_time = min( timeit.repeat( parallel, number = 1, repeat = repeat ) )
+    executor.shutdown()
+
+    return serial_time, parallel_time
+
+def main():
+    workers = int( sys.argv[ 1 ] ) if len( sys.argv ) > 1 else 4
+
+    print "%10s %12s %12s %8s" % ( 'nodes', 'serial ms', 'parallel ms', 'speedup' )
+    for count in [ 10000, 100000, 1000000 ]:
+        serial_time, parallel_time = benchmark( count, workers )
+        print "%10d %12.2f %12.2f %8.2f" % (
+            count,
+            serial_time * 1000.0,
+            parallel_time * 1000.0,
+            serial_time / parallel_time
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+"""Provides functions for affine matrices.
+
+Matrices use the same row-vector layout as Pyrr, with the
+translation in the last row.
+
+All functions accept either a single (4,4) matrix or
+an (N,4,4) array of matrices.
+"""
+
+import numpy
+
+
+def is_affine( matrices ):
+    """Checks if matrices are affine.
+
+    An affine matrix has a last column of [0,0,0,1].
+
+    :rtype: bool
+    :return: True if every matrix is affine.
+    """
+    matrices = numpy.asarray( matrices )
+    return (
+        numpy.all( matrices[ ..., 0:3, 3 ] == 0.0 )
+        and numpy.all( matrices[ ..., 3, 3 ] == 1.0 )
+        )
+
+def inverse( matrices ):
+    """Inverts matrices, using the cheapest method that is exact.
+
+    Matrices whose rows are orthogonal (rotation and scale, but
+    no shear) are inverted with a scaled transpose.
+    Other affine matrices only require a 3x3 inverse.
+    Non-affine matrices use a general 4x4 inverse.
+
+    :param numpy.array matrices: A (4,4) or (N,4,4) array.
+    :rtype: numpy.array
+    :return: The inverted matrices.
+    """
+    matrices = numpy.asarray( matrices, dtype = numpy.float )
+    if not is_affine( matrices ):
+        return numpy.linalg.inv( matrices )
+
+    basis = matrices[ ..., 0:3, 0:3 ]
+    translation = matrices[ ..., 3:4, 0:3 ]
+
+    # the rows of a rotation and scale are orthogonal
+    # and the inverse is the transpose divided by the square of the scale
+    squares = numpy.matmul( basis, numpy.swapaxes( basis, -1, -2 ) )
+    lengths = numpy.diagonal( squares, axis1 = -2, axis2 = -1 )
+    off_diagonal = squares - lengths[ ..., numpy.newaxis ] * numpy.eye( 3 )
+
+    # each matrix is tested against its own scale
+    tolerance = 1.0e-9 * numpy.max( lengths, axis = -1 )
+    orthogonal = numpy.all( numpy.abs( off_diagonal ) <= tolerance[ ..., numpy.newaxis, numpy.newaxis ], axis = ( -2, -1 ) )
+    orthogonal &= numpy.all( lengths > 0.0, axis = -1 )
+
+    if numpy.all( orthogonal ):
+        inverse_basis = numpy.swapaxes( basis, -1, -2 ) / lengths[ ..., numpy.newaxis, : ]
+    elif not numpy.any( orthogonal ):
+        inverse_basis = numpy.linalg.inv( basis )
+    else:
+        inverse_basis = numpy.empty_like( basis )
+        inverse_basis[ orthogonal ] = numpy.swapaxes( basis[ orthogonal ], -1, -2 ) / lengths[ orthogonal ][ :, numpy.newaxis, : ]
+        inverse_basis[ ~orthogonal ] = numpy.linalg.inv( basis[ ~orthogonal ] )
+
+    result = numpy.zeros_like( matrices )
+    result[ ..., 0:3, 0:3 ] = inverse_basis
+    result[ ..., 3:4, 0:3 ] = -numpy.matmul( translation, inverse_basis )
+    result[ ..., 3, 3 ] = 1.0
+    return result
+
+def quaternions_from_matrices( matrices ):
+    """Extracts rotations from matrices as quaternions.
+
+    The matrices must contain a pure rotation in their
+    upper 3x3 values.
+
+    :param numpy.array matrices: A (3,3), (4,4), (N,3,3) or (N,4,4) array.
+    :rtype: numpy.array
+    :return: A (4,) or (N,4) array of quaternions.
+    """
+    matrices = numpy.asarray( matrices, dtype = numpy.float )
+    single = matrices.ndim == 2
+    matrices = matrices.reshape( (-1,) + matrices.shape[ -2: ] )
+
+    m00 = matrices[ :, 0, 0 ]
+    m01 = matrices[ :, 0, 1 ]
+    m02 = matrices[ :, 0, 2 ]
+    m10 = matrices[ :, 1, 0 ]
+    m11 = matrices[ :, 1, 1 ]
+    m12 = matrices[ :, 1, 2 ]
+    m20 = matrices[ :, 2, 0 ]
+    m21 = matrices[ :, 2, 1 ]
+    m22 = matrices[ :, 2, 2 ]
+
+    # each row of candidates is 4 * a component squared
+    # the largest component is the most accurate to divide by
+    candidates = numpy.array( [
+        1.0 + m00 - m11 - m22,
+        1.0 - m00 + m11 - m22,
+        1.0 - m00 - m11 + m22,
+        1.0 + m00 + m11 + m22,
+        ] )
+    largest = numpy.argmax( candidates, axis = 0 )
+    rows = numpy.arange( len( matrices ) )
+    root = numpy.sqrt( numpy.maximum( candidates[ largest, rows ], 0.0 ) )
+    scale = 0.5 / root
+
+    # products of pairs of components, as laid out by
+    # pyrr.matrix33.create_from_quaternion
+    xy = m01 + m10
+    xz = m02 + m20
+    yz = m12 + m21
+    wx = m12 - m21
+    wy = m20 - m02
+    wz = m01 - m10
+
+    quaternions = numpy.empty( (len( matrices ), 4), dtype = numpy.float )
+    # x is largest
+    quaternions[ :, 0 ] = numpy.choose( largest, [ 0.5 * root, xy * scale, xz * scale, wx * scale ] )
+    quaternions[ :, 1 ] = numpy.choose( largest, [ xy * scale, 0.5 * root, yz * scale, wy * scale ] )
+    quaternions[ :, 2 ] = numpy.choose( largest, [ xz * scale, yz * scale, 0.5 * root, wz * scale ] )
+    quaternions[ :, 3 ] = numpy.choose( largest, [ wx * scale, wy * scale, wz * scale, 0.5 * root ] )
+
+    if single:
+        return quaternions[ 0 ]
+    return quaternions
+
+def decompose( matrices ):
+    """Decomposes affine matrices into translation, orientation
+    and scale.
+
+    This is the inverse of
+    :py:func:`pygly.transform_array.create_matrices`.
+
+    .. note::
+        A matrix that contains shear, such as a child of a
+        non-uniformly scaled and rotated parent, cannot be
+        represented exactly. The rotation is orthogonalised
+        and the shear is lost.
+
+    :param numpy.array matrices: A (4,4) or (N,4,4) array.
+    :rtype: tuple
+    :return: A tuple of (translations, orientations, scales).
+    """
+    matrices = numpy.asarray( matrices, dtype = numpy.float )
+    single = matrices.ndim == 2
+    matrices = matrices.reshape( -1, 4, 4 )
+
+    translations = matrices[ :, 3, 0:3 ].copy()
+
+    # the scale is applied to the rows of the rotation
+    basis = matrices[ :, 0:3, 0:3 ]
+    scales = numpy.sqrt( ( basis ** 2 ).sum( axis = 2 ) )
+
+    # a negative determinant is a mirror, which we put into the x scale
+    mirrored = numpy.linalg.det( basis ) < 0.0
+    scales[ mirrored, 0 ] *= -1.0
+
+    rotations = basis / scales[ :, :, numpy.newaxis ]
+
+    # remove any shear so the rotation is orthonormal
+    u, s, v = numpy.linalg.svd( rotations )
+    rotations = numpy.matmul( u, v )
+
+    orientations = quaternions_from_matrices( rotations )
+
+    if single:
+        return translations[ 0 ], orientations[ 0 ], scales[ 0 ]
+    return translations, orientations, scales
+
+def transform_aabbs( aabbs, matrices ):
+    """Transforms axis aligned bounding boxes by affine matrices.
+
+    The result is the axis aligned box that contains each
+    transformed box.
+
+    :param numpy.array aabbs: An (N,2,3) array of boxes, or a single
+        (2,3) box to transform by every matrix.
+    :param numpy.array matrices: An (N,4,4) array of affine matrices.
+    :rtype: numpy.array
+    :return: An (N,2,3) array of boxes.
+    """
+    aabbs = numpy.asarray( aabbs, dtype = numpy.float )
+    matrices = numpy.asarray( matrices, dtype = numpy.float ).reshape( -1, 4, 4 )
+
+    centres = ( aabbs[ ..., 0, : ] + aabbs[ ..., 1, : ] ) * 0.5
+    extents = ( aabbs[ ..., 1, : ] - aabbs[ ..., 0, : ] ) * 0.5
+    centres = numpy.broadcast_to( centres, ( len( matrices ), 3 ) )
+    extents = numpy.broadcast_to( extents, ( len( matrices ), 3 ) )
+
+    basis = matrices[ :, 0:3, 0:3 ]
+    centres = numpy.einsum( 'ij,ijk->ik', centres, basis ) + matrices[ :, 3, 0:3 ]
+    # the extent along each axis is the sum of the absolute
+    # contributions of each of the box's axes
+    extents = numpy.einsum( 'ij,ijk->ik', extents, numpy.abs( basis ) )
+
+    result = numpy.empty( ( len( matrices ), 2, 3 ), dtype = numpy.float )
+    result[ :, 0 ] = centres - extents
+    result[ :, 1 ] = centres + extents
+    return result
@@ -0,0 +1,450 @@
+"""Provides a bounding volume hierarchy over axis aligned boxes.
+
+A :py:class:`BVH` is built over an (N,2,3) array of world space
+bounding boxes, such as the bounds of the nodes of a
+:py:class:`pygly.transform_array.TransformArray`::
+
+    bounds = affine.transform_aabbs( local_bounds, array.world_matrices )
+    bvh = BVH( bounds )
+
+    visible = bvh.frustum( camera.frustum )
+    nodes = [ array.nodes[ index ] for index in visible ]
+
+    # after the scene has moved
+    bvh.update( affine.transform_aabbs( local_bounds, array.world_matrices ) )
+
+Queries return the indices of the boxes within the original array.
+
+The tree is built with a binned surface area heuristic.
+Rather than building one tree node at a time, every tree node
+at the same depth is split together using vectorised operations.
+
+Items are re-ordered so that the items beneath any tree node
+are a contiguous range, which allows a query to return every
+item beneath a tree node without visiting its children.
+"""
+
+import numpy
+
+
+def _areas( mins, maxs ):
+    """Returns the surface areas of boxes.
+
+    Empty boxes, with a minimum greater than their maximum,
+    have an area of 0.
+    """
+    extents = numpy.maximum( maxs - mins, 0.0 )
+    return 2.0 * (
+        extents[ ..., 0 ] * extents[ ..., 1 ]
+        + extents[ ..., 1 ] * extents[ ..., 2 ]
+        + extents[ ..., 2 ] * extents[ ..., 0 ]
+        )
+
+def _expand( starts, counts ):
+    """Returns the concatenated ranges [start, start + count).
+    """
+    counts = numpy.asarray( counts, dtype = numpy.int )
+    total = counts.sum()
+    offsets = numpy.cumsum( counts ) - counts
+    return (
+        numpy.arange( total )
+        - numpy.repeat( offsets, counts )
+        + numpy.repeat( starts, counts )
+        )
+
+def _ray_inverses( directions ):
+    """Returns the inverse of ray directions for :py:func:`_ray_slabs`.
+
+    Components of 0 are given a large finite inverse rather
+    than an infinite one, which avoids a NaN when the origin
+    lies on a slab.
+    """
+    with numpy.errstate( divide = 'ignore' ):
+        inverses = 1.0 / numpy.asarray( directions, dtype = numpy.float )
+    return numpy.clip( inverses, -1e30, 1e30 )
+
+def _ray_slabs( origins, inverses, aabbs, max_distance = numpy.inf ):
+    """Intersects rays with boxes.
+
+    Origins and inverses may be a single (3,) vector or
+    an (N,3) array with a ray per box.
+
+    :rtype: tuple
+    :return: A tuple of (hit, entry), a mask of the boxes that are
+        hit and the distance along each ray at which they are entered.
+    """
+    near = ( aabbs[ :, 0 ] - origins ) * inverses
+    far = ( aabbs[ :, 1 ] - origins ) * inverses
+    entry = numpy.minimum( near, far ).max( axis = 1 )
+    exit = numpy.maximum( near, far ).min( axis = 1 )
+    hit = ( exit >= numpy.maximum( entry, 0.0 ) ) & ( entry <= max_distance )
+    return hit, numpy.maximum( entry, 0.0 )
+
+def _segment_reduce( values, counts ):
+    """Calculates the minimum and maximum of contiguous
+    segments of an (N,2,3) array of boxes.
+    """
+    offsets = numpy.cumsum( counts ) - counts
+    mins = numpy.minimum.reduceat( values[ :, 0 ], offsets )
+    maxs = numpy.maximum.reduceat( values[ :, 1 ], offsets )
+    return mins, maxs
+
+
+class BVH( object ):
+    """A bounding volume hierarchy of axis aligned boxes.
+    """
+
+    def __init__(
+        self,
+        aabbs,
+        bin_count = 16,
+        max_leaf_size = 8,
+        traversal_cost = 2.0,
+        rebuild_threshold = 1.5
+        ):
+        """Builds a hierarchy over an array of boxes.
+
+        :param numpy.array aabbs: An (N,2,3) array of boxes.
+        :param int bin_count: The number of bins used to evaluate
+            splits along an axis.
+        :param int max_leaf_size: The maximum number of items in
+            a leaf.
+        :param float traversal_cost: The cost of visiting a tree node
+            relative to testing an item.
+        :param float rebuild_threshold: :py:meth:`update` rebuilds the
+            tree when its cost exceeds the cost after the last build
+            by this factor.
+        """
+        super( BVH, self ).__init__()
+
+        self.bin_count = bin_count
+        self.max_leaf_size = max_leaf_size
+        self.traversal_cost = traversal_cost
+        self.rebuild_threshold = rebuild_threshold
+
+        self.build( aabbs )
+
+    def __len__( self ):
+        return len( self.aabbs )
+
+    def build( self, aabbs ):
+        """Rebuilds the tree for new boxes.
+
+        :param numpy.array aabbs: An (N,2,3) array of boxes.
+        """
+        self.aabbs = numpy.array( aabbs, dtype = numpy.float ).reshape( -1, 2, 3 )
+        count = len( self.aabbs )
+        centroids = ( self.aabbs[ :, 0 ] + self.aabbs[ :, 1 ] ) * 0.5
+
+        #: The items in tree order.
+        self.order = numpy.arange( count )
+
+        starts = [ numpy.zeros( 1, dtype = numpy.int ) ]
+        counts = [ numpy.array( [ count ], dtype = numpy.int ) ]
+        children = []
+        bounds = []
+        levels = []
+        node_count = 1
+
+        while len( starts[ -1 ] ) and count:
+            level_starts = starts[ -1 ]
+            level_counts = counts[ -1 ]
+            levels.append( numpy.arange( node_count - len( level_starts ), node_count ) )
+
+            mins, maxs = _segment_reduce( self.aabbs[ self.order[ _expand( level_starts, level_counts ) ] ], level_counts )
+            bounds.append( numpy.concatenate( ( mins[ :, numpy.newaxis ], maxs[ :, numpy.newaxis ] ), axis = 1 ) )
+
+            # nodes small enough to be leaves are never split
+            split = level_counts > max( self.max_leaf_size, 1 )
+            level_children = numpy.full( len( level_starts ), -1, dtype = numpy.int )
+            level_children[ split ] = node_count + 2 * numpy.arange( numpy.count_nonzero( split ) )
+            children.append( level_children )
+            node_count += 2 * numpy.count_nonzero( split )
+            if not numpy.any( split ):
+                break
+
+            level_starts = level_starts[ split ]
+            level_counts = level_counts[ split ]
+            mins = mins[ split ]
+            maxs = maxs[ split ]
+            segments = len( level_starts )
+            # small nodes don't need every bin
+            bins = min( self.bin_count, level_counts.max() )
+
+            positions = _expand( level_starts, level_counts )
+            items = self.order[ positions ]
+            segment = numpy.repeat( numpy.arange( segments ), level_counts )
+
+            # bin the centroids along the longest axis of each node
+            item_centroids = centroids[ items ]
+            centroid_mins = numpy.minimum.reduceat( item_centroids, numpy.cumsum( level_counts ) - level_counts )
+            centroid_maxs = numpy.maximum.reduceat( item_centroids, numpy.cumsum( level_counts ) - level_counts )
+            extents = centroid_maxs - centroid_mins
+            axes = numpy.argmax( extents, axis = 1 )
+            rows = numpy.arange( segments )
+            axis_mins = centroid_mins[ rows, axes ]
+            axis_extents = extents[ rows, axes ]
+            scales = numpy.where( axis_extents > 0.0, bins * ( 1.0 - 1.0e-9 ) / numpy.where( axis_extents > 0.0, axis_extents, 1.0 ), 0.0 )
+
+            values = item_centroids[ numpy.arange( len( items ) ), axes[ segment ] ]
+            item_bins = ( ( values - axis_mins[ segment ] ) * scales[ segment ] ).astype( numpy.int )
+            item_bins = numpy.clip( item_bins, 0, bins - 1 )
+
+            # sort the items of each node by bin, so each split
+            # is a contiguous range
+            keys = segment * bins + item_bins
+            sorted_keys = numpy.argsort( keys, kind = 'mergesort' )
+            items = items[ sorted_keys ]
+            keys = keys[ sorted_keys ]
+            self.order[ positions ] = items
+
+            # the count and bounds of each bin
+            bin_counts = numpy.bincount( keys, minlength = segments * bins ).reshape( segments, bins )
+            runs = numpy.concatenate( ( [ 0 ], numpy.nonzero( numpy.diff( keys ) )[ 0 ] + 1 ) )
+            bin_mins = numpy.full( ( segments * bins, 3 ), numpy.inf )
+            bin_maxs = numpy.full( ( segments * bins, 3 ), -numpy.inf )
+            item_aabbs = self.aabbs[ items ]
+            bin_mins[ keys[ runs ] ] = numpy.minimum.reduceat( item_aabbs[ :, 0 ], runs )
+            bin_maxs[ keys[ runs ] ] = numpy.maximum.reduceat( item_aabbs[ :, 1 ], runs )
+            bin_mins = bin_mins.reshape( segments, bins, 3 )
+            bin_maxs = bin_maxs.reshape( segments, bins, 3 )
+
+            # the cost of splitting after each bin
+            left_counts = numpy.cumsum( bin_counts, axis = 1 )[ :, :-1 ]
+            right_counts = level_counts[ :, numpy.newaxis ] - left_counts
+            left_areas = _areas(
+                numpy.minimum.accumulate( bin_mins, axis = 1 ),
+                numpy.maximum.accumulate( bin_maxs, axis = 1 )
+                )[ :, :-1 ]
+            right_areas = _areas(
+                numpy.minimum.accumulate( bin_mins[ :, ::-1 ], axis = 1 )[ :, ::-1 ],
+                numpy.maximum.accumulate( bin_maxs[ :, ::-1 ], axis = 1 )[ :, ::-1 ]
+                )[ :, 1: ]
+            parent_areas = numpy.maximum( _areas( mins, maxs ), 1.0e-30 )[ :, numpy.newaxis ]
+            costs = self.traversal_cost + (
+                left_areas * left_counts + right_areas * right_counts
+                ) / parent_areas
+            costs[ ( left_counts == 0 ) | ( right_counts == 0 ) ] = numpy.inf
+
+            best = numpy.argmin( costs, axis = 1 )
+            best_costs = costs[ rows, best ]
+            split_counts = left_counts[ rows, best ]
+
+            # nodes whose centroids all fall in one bin are split in half
+            degenerate = ~numpy.isfinite( best_costs )
+            split_counts[ degenerate ] = level_counts[ degenerate ] // 2
+
+            # the children of each split node
+            split_starts = level_starts
+            split_totals = level_counts
+            next_starts = numpy.empty( 2 * len( split_starts ), dtype = numpy.int )
+            next_counts = numpy.empty( 2 * len( split_starts ), dtype = numpy.int )
+            next_starts[ 0::2 ] = split_starts
+            next_starts[ 1::2 ] = split_starts + split_counts
+            next_counts[ 0::2 ] = split_counts
+            next_counts[ 1::2 ] = split_totals - split_counts
+            starts.append( next_starts )
+            counts.append( next_counts )
+
+        if count == 0:
+            starts = [ numpy.zeros( 1, dtype = numpy.int ) ]
+            counts = [ numpy.zeros( 1, dtype = numpy.int ) ]
+            children = [ numpy.full( 1, -1, dtype = numpy.int ) ]
+            bounds = [ numpy.zeros( ( 1, 2, 3 ) ) ]
+            levels = [ numpy.zeros( 1, dtype = numpy.int ) ]
+
+        #: The first item of each tree node within :py:attr:`order`.
+        self.starts = numpy.concatenate( starts[ :len( children ) ] )
+        #: The number of items beneath each tree node.
+        self.counts = numpy.concatenate( counts[ :len( children ) ] )
+        #: The first child of each tree node, the second child
+        #: follows it. Leaves have a child of -1.
+        self.children = numpy.concatenate( children )
+        #: The bounds of each tree node.
+        self.bounds = numpy.concatenate( bounds )
+        #: The tree nodes at each depth.
+        self.levels = levels
+
+        leaves = numpy.nonzero( self.children < 0 )[ 0 ]
+        self._leaves = leaves[ numpy.argsort( self.starts[ leaves ] ) ]
+
+        self.build_cost = self.cost()
+
+    def cost( self ):
+        """Calculates the surface area heuristic cost of the tree.
+
+        :rtype: float
+        """
+        root_area = _areas( self.bounds[ 0, 0 ], self.bounds[ 0, 1 ] )
+        if root_area <= 0.0:
+            return 0.0
+
+        areas = _areas( self.bounds[ :, 0 ], self.bounds[ :, 1 ] )
+        leaves = self.children < 0
+        return (
+            self.traversal_cost * areas[ ~leaves ].sum()
+            + ( areas[ leaves ] * self.counts[ leaves ] ).sum()
+            ) / root_area
+
+    def refit( self, aabbs ):
+        """Updates the bounds of the tree for moved boxes
+        without changing its structure.
+
+        :param numpy.array aabbs: An (N,2,3) array of boxes, in the
+            same order as the boxes the tree was built with.
+        """
+        self.aabbs = numpy.array( aabbs, dtype = numpy.float ).reshape( -1, 2, 3 )
+        if len( self.aabbs ) == 0:
+            return
+
+        # the items of the leaves, in order, are the items in tree order
+        leaves = self._leaves
+        mins, maxs = _segment_reduce( self.aabbs[ self.order ], self.counts[ leaves ] )
+        self.bounds[ leaves, 0 ] = mins
+        self.bounds[ leaves, 1 ] = maxs
+
+        for level in reversed( self.levels ):
+            nodes = level[ self.children[ level ] >= 0 ]
+            left = self.children[ nodes ]
+            self.bounds[ nodes, 0 ] = numpy.minimum( self.bounds[ left, 0 ], self.bounds[ left + 1, 0 ] )
+            self.bounds[ nodes, 1 ] = numpy.maximum( self.bounds[ left, 1 ], self.bounds[ left + 1, 1 ] )
+
+    def update( self, aabbs ):
+        """Refits the tree for moved boxes, rebuilding it if
+        the quality of the tree has degraded.
+
+        A different number of boxes always causes a rebuild.
+
+        :param numpy.array aabbs: An (N,2,3) array of boxes.
+        :rtype: bool
+        :return: True if the tree was rebuilt.
+        """
+        if len( aabbs ) != len( self.aabbs ):
+            self.build( aabbs )
+            return True
+
+        self.refit( aabbs )
+        if self.cost() > self.build_cost * self.rebuild_threshold:
+            self.build( aabbs )
+            return True
+        return False
+
+    def _query( self, classify, test_items ):
+        """Traverses the tree, one depth at a time.
+
+        :param classify: Called with an array of tree node indices,
+            returns a tuple of (intersecting, contained) masks.
+        :param test_items: Called with an array of item indices,
+            returns a mask of the items that match.
+        """
+        results = []
+        frontier = numpy.zeros( 1, dtype = numpy.int )
+        if len( self.aabbs ) == 0:
+            return numpy.zeros( 0, dtype = numpy.int )
+
+        while len( frontier ):
+            intersecting, contained = classify( frontier )
+
+            # every item beneath a contained node matches
+            nodes = frontier[ contained ]
+            if len( nodes ):
+                results.append( self.order[ _expand( self.starts[ nodes ], self.counts[ nodes ] ) ] )
+
+            partial = frontier[ intersecting & ~contained ]
+            leaves = partial[ self.children[ partial ] < 0 ]
+            if len( leaves ):
+                items = self.order[ _expand( self.starts[ leaves ], self.counts[ leaves ] ) ]
+                results.append( items[ test_items( items ) ] )
+
+            inner = self.children[ partial ]
+            inner = inner[ inner >= 0 ]
+            frontier = numpy.concatenate( ( inner, inner + 1 ) )
+
+        if not results:
+            return numpy.zeros( 0, dtype = numpy.int )
+        return numpy.concatenate( results )
+
+    def frustum( self, planes ):
+        """Finds the boxes that intersect a frustum.
+
+        :param numpy.array planes: A (6,4) array of planes as returned by
+            :py:func:`pygly.frustum.planes_from_matrix`.
+        :rtype: numpy.array
+        :return: The indices of the boxes.
+        """
+        normals = planes[ :, 0:3 ]
+        absolute_normals = numpy.abs( normals )
+        distances = planes[ :, 3 ]
+
+        def plane_distances( aabbs ):
+            centres = ( aabbs[ :, 0 ] + aabbs[ :, 1 ] ) * 0.5
+            extents = ( aabbs[ :, 1 ] - aabbs[ :, 0 ] ) * 0.5
+            centre_distances = numpy.dot( centres, normals.T ) - distances
+            extent_distances = numpy.dot( extents, absolute_normals.T )
+            return centre_distances, extent_distances
+
+        def classify( nodes ):
+            centres, extents = plane_distances( self.bounds[ nodes ] )
+            intersecting = numpy.all( centres + extents >= 0.0, axis = 1 )
+            contained = numpy.all( centres - extents >= 0.0, axis = 1 )
+            return intersecting, contained
+
+        def test_items( items ):
+            centres, extents = plane_distances( self.aabbs[ items ] )
+            return numpy.all( centres + extents >= 0.0, axis = 1 )
+
+        return self._query( classify, test_items )
+
+    def sphere( self, sphere ):
+        """Finds the boxes that intersect a sphere.
+
+        :param numpy.array sphere: A (4,) sphere of centre and radius.
+        :rtype: numpy.array
+        :return: The indices of the boxes.
+        """
+        centre = numpy.asarray( sphere[ 0:3 ], dtype = numpy.float )
+        radius_squared = float( sphere[ 3 ] ) ** 2
+
+        def nearest_squared( aabbs ):
+            nearest = numpy.clip( centre, aabbs[ :, 0 ], aabbs[ :, 1 ] )
+            return ( ( nearest - centre ) ** 2 ).sum( axis = 1 )
+
+        def classify( nodes ):
+            aabbs = self.bounds[ nodes ]
+            intersecting = nearest_squared( aabbs ) <= radius_squared
+
+            # the corner furthest from the centre is within the sphere
+            furthest = numpy.maximum( numpy.abs( aabbs[ :, 0 ] - centre ), numpy.abs( aabbs[ :, 1 ] - centre ) )
+            contained = ( furthest ** 2 ).sum( axis = 1 ) <= radius_squared
+            return intersecting, contained
+
+        def test_items( items ):
+            return nearest_squared( self.aabbs[ items ] ) <= radius_squared
+
+        return self._query( classify, test_items )
+
+    def ray( self, ray, max_distance = numpy.inf ):
+        """Finds the boxes that a ray intersects.
+
+        :param numpy.array ray: A (2,3) ray of origin and direction,
+            as used by Pyrr.
+        :param float max_distance: The furthest distance along the
+            ray to test, in multiples of the direction's length.
+        :rtype: tuple
+        :return: A tuple of (indices, distances), sorted by the distance
+            along the ray at which each box is entered.
+        """
+        origin = numpy.asarray( ray[ 0 ], dtype = numpy.float )
+        inverse = _ray_inverses( ray[ 1 ] )
+
+        def classify( nodes ):
+            hit, entry = _ray_slabs( origin, inverse, self.bounds[ nodes ], max_distance )
+            return hit, numpy.zeros( len( nodes ), dtype = numpy.bool )
+
+        def test_items( items ):
+            return _ray_slabs( origin, inverse, self.aabbs[ items ], max_distance )[ 0 ]
+
+        indices = self._query( classify, test_items )
+        distances = _ray_slabs( origin, inverse, self.aabbs[ indices ], max_distance )[ 1 ]
+        order = numpy.argsort( distances )
+        return indices[ order ], distances[ order ]
@@ -2,9 +2,10 @@ import math
 
 from pyrr import quaternion
 from pyrr import matrix44
-from pyrr import ray
 
 from scene_node import SceneNode
+import frustum
+import screen_space
 
 
 class CameraNode( SceneNode ):
@@ -19,10 +20,34 @@ class CameraNode( SceneNode ):
         :param ProjectionMatrix projection_matrix: The camera's projection matrix.
         """
         super( CameraNode, self ).__init__( name )
+
+        self._view_projection = None
+        self._view_projection_version = None
+        self._frustum = None
         
         #: the camer's view matrix
         self.projection_matrix = projection_matrix
 
+    @property
+    def projection_matrix( self ):
+        """The camera's projection matrix.
+
+        .. note::
+            Assign a new matrix rather than modifying the
+            existing one, or the cached view projection matrix
+            will not be updated.
+
+        This is an @property decorated method which allows
+        retrieval and assignment of the projection matrix.
+        """
+        return self._projection_matrix
+
+    @projection_matrix.setter
+    def projection_matrix( self, projection_matrix ):
+        self._projection_matrix = projection_matrix
+        self._view_projection = None
+        self._frustum = None
+
     @property
     def model_view( self ):
         """Property for the camera's model view matrix.
@@ -31,11 +56,107 @@ class CameraNode( SceneNode ):
         and is used as the initial matrix for the model view
         matrix.
 
+        The matrix is the world transform's cached
+        :py:attr:`pygly.world_transform.WorldTransform.inverse_matrix`.
+        The returned matrix should not be modified.
+
         This is an @property decorated method.
 
         :rtype: numpy.array
         :return: A matrix set to the camera's model view
             matrix.
         """
-        # return the inverse of our world matrix
-        return matrix44.inverse( self.world_transform.matrix )
+        return self.world_transform.inverse_matrix
+
+    @property
+    def view_projection( self ):
+        """Property for the camera's model view matrix multiplied
+        by its projection matrix.
+
+        The matrix is cached until the camera's world transform
+        or projection matrix changes. The returned matrix should
+        not be modified.
+
+        This is an @property decorated method.
+
+        :rtype: numpy.array
+        :return: The combined view and projection matrix.
+        """
+        version = self.world_transform.version
+        if self._view_projection is None or self._view_projection_version != version:
+            self._view_projection = matrix44.multiply(
+                self.model_view,
+                self.projection_matrix
+                )
+            self._view_projection_version = version
+            self._frustum = None
+
+        return self._view_projection
+
+    @property
+    def frustum( self ):
+        """Property for the camera's frustum planes in world space.
+
+        The planes are cached with the view projection matrix.
+        The returned array should not be modified.
+
+        This is an @property decorated method.
+
+        :rtype: numpy.array
+        :return: A (6,4) array of planes as returned by
+            :py:func:`pygly.frustum.planes_from_matrix`.
+        """
+        view_projection = self.view_projection
+        if self._frustum is None:
+            self._frustum = frustum.planes_from_matrix( view_projection )
+        return self._frustum
+
+    def project( self, viewport, points ):
+        """Projects world space points onto a viewport.
+
+        .. seealso::
+            Function :py:func:`pygly.screen_space.project`
+            Documentation of the
+            :py:func:`pygly.screen_space.project` function.
+
+        :param viewport: The :py:class:`pygly.viewport.Viewport`
+            the camera renders to, or its (2,2) rectangle in pixels.
+        :param numpy.array points: An (N,3) array of world space points.
+        :rtype: tuple
+        :return: A tuple of (pixels, depths, visible).
+        """
+        return screen_space.project( self.view_projection, viewport, points )
+
+    def unproject( self, viewport, pixels, depths ):
+        """Converts viewport pixels and window depths to
+        world space points.
+
+        .. seealso::
+            Function :py:func:`pygly.screen_space.unproject`
+            Documentation of the
+            :py:func:`pygly.screen_space.unproject` function.
+
+        :param viewport: The :py:class:`pygly.viewport.Viewport`
+            the camera renders to, or its (2,2) rectangle in pixels.
+        :param numpy.array pixels: An (N,2) array of pixels.
+        :param numpy.array depths: An (N,) array of window depths.
+        :rtype: numpy.array
+        :return: An (N,3) array of world space points.
+        """
+        return screen_space.unproject( self.view_projection, viewport, pixels, depths )
+
+    def screen_ray( self, viewport, point ):
+        """Creates a world space ray through a point on a viewport.
+
+        This is used to pick the objects beneath the mouse
+        with a :py:class:`pygly.picking.Picker`.
+
+        :param viewport: The :py:class:`pygly.viewport.Viewport`
+            the camera renders to, or its (2,2) rectangle in pixels.
+        :param point: The (x,y) window position in pixels, with
+            the origin at the bottom left as used by OpenGL and Pyglet.
+        :rtype: numpy.array
+        :return: A (2,3) ray as used by Pyrr, starting on the
+            near plane with a unit length direction.
+        """
+        return screen_space.rays( self.view_projection, viewport, point )[ 0 ]
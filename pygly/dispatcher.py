@@ -0,0 +1,407 @@
+"""Provides the event dispatch used by the scene graph.
+
+Events are sent with send( signal, sender, \*args ) and received by
+handlers registered with
+connect( receiver, signal, sender = Any, deferred = False ).
+Handlers are removed with
+disconnect( receiver, signal, sender = Any, deferred = False ).
+Receivers that are bound methods are weakly referenced, and are
+disconnected when their object is destroyed.
+
+Receivers are normally called immediately when a signal is sent.
+Receivers connected with deferred = True are instead called
+by :py:func:`flush`, which is usually called once per frame.
+Events are coalesced, so a deferred receiver is called once per
+(signal, sender) no matter how many times the signal was sent::
+
+    dispatcher.connect( rebuild, Transform.on_transform_changed, node.world_transform, deferred = True )
+
+    # each frame
+    update_scene()
+    dispatcher.flush()
+
+These functions are replaced when the backend is changed, so they
+must be called through the module rather than imported directly.
+
+Two backends are available.
+
+The 'pydispatch' backend passes events to PyDispatcher.
+Handlers may receive the sender and any named arguments they
+accept, but every send performs lookups in PyDispatcher's global
+registry and inspects the handler's arguments.
+
+The 'slots' backend stores a :py:class:`Dispatcher` per signal on
+each sender. Sending an event calls each handler directly with the
+event's arguments. Handlers are not passed the sender.
+Plain functions are held strongly by this backend, while
+PyDispatcher holds them weakly.
+
+The backend should be selected before any scene objects are
+created, as existing connections are not moved between backends::
+
+    from pygly import dispatcher
+    dispatcher.set_backend( 'slots' )
+
+The 'pydispatch' backend is used by default if PyDispatcher
+is installed.
+"""
+
+import weakref
+from collections import OrderedDict
+from timeit import default_timer
+
+from weak_method_reference import WeakMethodReference
+
+try:
+    from pydispatch import dispatcher as pydispatcher
+except ImportError:
+    pydispatcher = None
+
+
+class _Any( object ):
+    """Used to connect to events from any sender.
+    """
+
+    def __repr__( self ):
+        return 'Any'
+
+#: Pass as the sender to receive the signal from any sender.
+Any = _Any()
+
+
+class Dispatcher( object ):
+    """An ordered list of handlers that are called together.
+
+    Handlers that are bound methods are weakly referenced.
+    Handlers whose object has been destroyed are removed
+    the next time the dispatcher is called.
+    Plain functions are strongly referenced and remain
+    registered until they are unregistered.
+    """
+
+    def __init__( self ):
+        super( Dispatcher, self ).__init__()
+
+        # the list is replaced rather than modified, so handlers
+        # can be changed while the dispatcher is being called
+        self._slots = []
+
+    def __len__( self ):
+        return len( self._slots )
+
+    @property
+    def handlers( self ):
+        """The handlers that are still alive.
+        """
+        return [ slot() for slot in self._slots if slot.is_alive() ]
+
+    def register_handler( self, handler ):
+        """Adds a handler to the dispatcher.
+
+        Handlers that are already registered are ignored.
+        """
+        slot = WeakMethodReference( handler )
+        if slot not in self._slots:
+            self._slots = self._slots + [ slot ]
+
+    def unregister_handler( self, handler ):
+        """Removes a handler from the dispatcher.
+
+        :raise ValueError: Raised if the handler is not registered.
+        """
+        slots = list( self._slots )
+        slots.remove( WeakMethodReference( handler ) )
+        self._slots = slots
+
+    def compact( self ):
+        """Removes handlers whose object has been destroyed.
+        """
+        self._slots = [ slot for slot in self._slots if slot.is_alive() ]
+
+    def dispatch( self, *args, **kwargs ):
+        """Calls each handler with the specified arguments.
+        """
+        dead = False
+        for slot in self._slots:
+            handler = slot()
+            if handler is None:
+                dead = True
+                continue
+            handler( *args, **kwargs )
+
+        if dead:
+            self.compact()
+
+    __call__ = dispatch
+
+
+# dispatchers for senders that can't store their own
+_senders = weakref.WeakKeyDictionary()
+_deferred_senders = weakref.WeakKeyDictionary()
+# dispatchers connected to Any sender
+_any = {}
+_any_deferred = {}
+
+# the arguments of deferred events keyed by (signal, sender)
+# in the order they were first sent
+_queue = OrderedDict()
+# set once a deferred receiver has been connected, so sends
+# don't look for deferred receivers until there are any
+_deferring = False
+
+
+def _dispatchers( sender, deferred = False, create = False ):
+    """Returns the dictionary of signal dispatchers for a sender.
+    """
+    if sender is Any:
+        return _any_deferred if deferred else _any
+
+    key = '_deferred_dispatchers' if deferred else '_dispatchers'
+    try:
+        return sender.__dict__[ key ]
+    except KeyError:
+        if not create:
+            return None
+        dispatchers = sender.__dict__[ key ] = {}
+        return dispatchers
+    except AttributeError:
+        # objects without a __dict__
+        senders = _deferred_senders if deferred else _senders
+        if create:
+            return senders.setdefault( sender, {} )
+        return senders.get( sender )
+
+def _connect( receiver, signal, sender = Any, deferred = False ):
+    global _deferring
+
+    _deferring = _deferring or deferred
+    dispatchers = _dispatchers( sender, deferred, create = True )
+    if signal not in dispatchers:
+        dispatchers[ signal ] = Dispatcher()
+    dispatchers[ signal ].register_handler( receiver )
+
+def _disconnect( receiver, signal, sender = Any, deferred = False ):
+    dispatchers = _dispatchers( sender, deferred )
+    if not dispatchers or signal not in dispatchers:
+        raise ValueError( "Receiver not connected" )
+    dispatchers[ signal ].unregister_handler( receiver )
+
+def _defer( signal, sender, args, kwargs ):
+    """Queues an event if there are any deferred receivers for it.
+    """
+    dispatchers = _dispatchers( sender, deferred = True )
+    if ( dispatchers and signal in dispatchers ) or signal in _any_deferred:
+        _queue[ ( signal, sender ) ] = ( args, kwargs )
+
+def flush():
+    """Delivers queued events to deferred receivers.
+
+    Each (signal, sender) pair is delivered once, with
+    the arguments of the last time it was sent.
+    Events sent by the receivers are queued until
+    the next call to flush.
+
+    :rtype: int
+    :return: The number of events delivered.
+    """
+    global _queue
+
+    queue = _queue
+    _queue = OrderedDict()
+
+    for ( signal, sender ), ( args, kwargs ) in queue.iteritems():
+        dispatchers = _dispatchers( sender, deferred = True )
+        if dispatchers:
+            dispatcher = dispatchers.get( signal )
+            if dispatcher:
+                dispatcher.dispatch( *args, **kwargs )
+
+        dispatcher = _any_deferred.get( signal )
+        if dispatcher:
+            dispatcher.dispatch( *args, **kwargs )
+
+    return len( queue )
+
+def _slots_connect( receiver, signal, sender = Any, deferred = False ):
+    _connect( receiver, signal, sender, deferred )
+
+def _slots_disconnect( receiver, signal, sender = Any, deferred = False ):
+    _disconnect( receiver, signal, sender, deferred )
+
+def _slots_send( signal, sender, *args, **kwargs ):
+    try:
+        attributes = sender.__dict__
+        dispatchers = attributes.get( '_dispatchers' )
+        deferred = '_deferred_dispatchers' in attributes
+    except AttributeError:
+        dispatchers = _senders.get( sender )
+        deferred = sender in _deferred_senders
+
+    if dispatchers:
+        dispatcher = dispatchers.get( signal )
+        if dispatcher:
+            dispatcher.dispatch( *args, **kwargs )
+
+    if _any:
+        dispatcher = _any.get( signal )
+        if dispatcher:
+            dispatcher.dispatch( *args, **kwargs )
+
+    if deferred or _any_deferred:
+        _defer( signal, sender, args, kwargs )
+
+def _pydispatch_sender( sender ):
+    return pydispatcher.Any if sender is Any else sender
+
+def _pydispatch_connect( receiver, signal, sender = Any, deferred = False ):
+    # deferred receivers are always stored by this module
+    if deferred:
+        _connect( receiver, signal, sender, deferred )
+    else:
+        pydispatcher.connect( receiver, signal, _pydispatch_sender( sender ) )
+
+def _pydispatch_disconnect( receiver, signal, sender = Any, deferred = False ):
+    if deferred:
+        _disconnect( receiver, signal, sender, deferred )
+    else:
+        pydispatcher.disconnect( receiver, signal, _pydispatch_sender( sender ) )
+
+def _pydispatch_send( signal, sender, *args, **kwargs ):
+    pydispatcher.send( signal, sender, *args, **kwargs )
+    if _deferring:
+        _defer( signal, sender, args, kwargs )
+
+
+def _slots_receivers( signal, sender ):
+    count = 0
+    for dispatchers in ( _dispatchers( sender ), _any ):
+        if dispatchers and signal in dispatchers:
+            # dead handlers are only removed when they are reached
+            count += len( dispatchers[ signal ].handlers )
+    return count
+
+def _pydispatch_receivers( signal, sender ):
+    return len( list(
+        pydispatcher.getAllReceivers( sender, signal )
+        ) )
+
+
+_backends = {
+    'slots': ( _slots_connect, _slots_disconnect, _slots_send, _slots_receivers ),
+    'pydispatch': ( _pydispatch_connect, _pydispatch_disconnect, _pydispatch_send, _pydispatch_receivers ),
+    }
+
+
+class SignalProfile( object ):
+    """Profiling counters for a single signal.
+    """
+
+    def __init__( self ):
+        super( SignalProfile, self ).__init__()
+
+        #: The number of times the signal was sent.
+        self.sends = 0
+        #: The total number of immediate receivers the signal was sent to.
+        self.receivers = 0
+        #: The time spent sending the signal, including any
+        #: signals sent by its receivers.
+        self.time = 0.0
+        #: The time spent sending the signal, excluding any
+        #: signals sent by its receivers.
+        self.self_time = 0.0
+
+    def __repr__( self ):
+        return 'SignalProfile(sends=%d, receivers=%d, time=%f, self_time=%f)' % (
+            self.sends,
+            self.receivers,
+            self.time,
+            self.self_time
+            )
+
+
+# the counters of the current frame
+_profile = {}
+# the time spent in signals sent by the signal currently being sent
+_nested = [ 0.0 ]
+
+def _profiled_send( signal, sender, *args, **kwargs ):
+    profile = _profile.get( signal )
+    if profile is None:
+        profile = _profile[ signal ] = SignalProfile()
+
+    _nested.append( 0.0 )
+    start = default_timer()
+    try:
+        _send( signal, sender, *args, **kwargs )
+    finally:
+        elapsed = default_timer() - start
+        nested = _nested.pop()
+        _nested[ -1 ] += elapsed
+
+    profile.sends += 1
+    profile.receivers += _receivers( signal, sender )
+    profile.time += elapsed
+    profile.self_time += elapsed - nested
+
+#: The name of the current backend.
+backend = None
+#: True if signals are being profiled.
+profiling = False
+
+def _bind():
+    global connect, disconnect, send, _send, _receivers
+
+    connect, disconnect, _send, _receivers = _backends[ backend ]
+    send = _profiled_send if profiling else _send
+
+def set_backend( name ):
+    """Selects the backend used to dispatch events.
+
+    :param string name: Either 'slots' or 'pydispatch'.
+    :raise ValueError: Raised if the backend is unknown or
+        PyDispatcher is not installed.
+    """
+    global backend
+
+    if name not in _backends:
+        raise ValueError( "Unknown dispatcher backend" )
+    if name == 'pydispatch' and pydispatcher is None:
+        raise ValueError( "PyDispatcher is not installed" )
+
+    backend = name
+    _bind()
+
+def set_profiling( enabled ):
+    """Enables or disables profiling of sent signals.
+
+    When profiling is disabled, send is the backend's
+    own function and profiling has no cost.
+
+    Counters are accumulated until :py:func:`end_frame`
+    is called.
+    """
+    global profiling
+
+    profiling = enabled
+    _bind()
+
+def frame_profile():
+    """Returns the profiling counters of the current frame.
+
+    :rtype: dict
+    :return: A dictionary of signal to :py:class:`SignalProfile`.
+    """
+    return dict( _profile )
+
+def end_frame():
+    """Returns the profiling counters of the current frame
+    and resets them.
+
+    :rtype: dict
+    :return: A dictionary of signal to :py:class:`SignalProfile`.
+    """
+    profile = frame_profile()
+    _profile.clear()
+    return profile
+
+set_backend( 'pydispatch' if pydispatcher else 'slots' )
@@ -0,0 +1,124 @@
+"""Provides view frustum extraction and culling.
+
+A frustum is represented by a (6,4) array of planes in the order
+left, right, bottom, top, near, far.
+Planes use the same layout as Pyrr, a normal followed by the
+distance of the plane from the origin along the normal.
+Normals point into the frustum.
+
+Bounds are tested in batches and a visibility mask is returned.
+Spheres are an (N,4) array of centre and radius, and
+axis aligned bounding boxes are an (N,2,3) array of minimum and
+maximum points, as used by Pyrr.
+
+Example::
+
+    planes = camera.frustum
+    visible = sphere_mask( planes, spheres )
+    for index in numpy.nonzero( visible )[ 0 ]:
+        nodes[ index ].render()
+
+The tests are conservative, bounds near the corners of a
+frustum may be reported as visible when they are not.
+"""
+
+import numpy
+
+
+left = 0
+right = 1
+bottom = 2
+top = 3
+near = 4
+far = 5
+
+
+def planes_from_matrix( matrix ):
+    """Extracts the frustum planes from a matrix.
+
+    Using a projection matrix gives the planes in view space.
+    Using a view projection matrix, such as
+    :py:attr:`pygly.camera_node.CameraNode.view_projection`,
+    gives the planes in world space.
+
+    :param numpy.array matrix: A (4,4) matrix in Pyrr's row-vector layout.
+    :rtype: numpy.array
+    :return: A (6,4) array of normalised planes.
+    """
+    matrix = numpy.asarray( matrix, dtype = numpy.float )
+
+    # points are multiplied as row vectors, so each clip space
+    # coordinate is the dot product of the point and a column
+    x = matrix[ :, 0 ]
+    y = matrix[ :, 1 ]
+    z = matrix[ :, 2 ]
+    w = matrix[ :, 3 ]
+
+    # a point is inside when -w <= x,y,z <= w
+    planes = numpy.array( [
+        w + x,
+        w - x,
+        w + y,
+        w - y,
+        w + z,
+        w - z,
+        ] )
+
+    # convert a.x + b.y + c.z + d >= 0 to the normal and distance form
+    planes[ :, 3 ] *= -1.0
+    lengths = numpy.sqrt( ( planes[ :, 0:3 ] ** 2 ).sum( axis = 1 ) )
+    planes /= lengths[ :, numpy.newaxis ]
+    return planes
+
+def point_distances( planes, points ):
+    """Calculates the signed distance of points from each plane.
+
+    :param numpy.array planes: A (6,4) array of planes.
+    :param numpy.array points: An (N,3) array of points.
+    :rtype: numpy.array
+    :return: An (N,6) array of distances, positive values are
+        on the inside of the plane.
+    """
+    return numpy.dot( points, planes[ :, 0:3 ].T ) - planes[ :, 3 ]
+
+def point_mask( planes, points ):
+    """Tests if points are within a frustum.
+
+    :param numpy.array planes: A (6,4) array of planes.
+    :param numpy.array points: An (N,3) array of points.
+    :rtype: numpy.array
+    :return: A boolean array, True for points within the frustum.
+    """
+    points = numpy.asarray( points, dtype = numpy.float ).reshape( -1, 3 )
+    return numpy.all( point_distances( planes, points ) >= 0.0, axis = 1 )
+
+def sphere_mask( planes, spheres ):
+    """Tests if spheres intersect a frustum.
+
+    :param numpy.array planes: A (6,4) array of planes.
+    :param numpy.array spheres: An (N,4) array of spheres.
+    :rtype: numpy.array
+    :return: A boolean array, True for spheres that are
+        at least partially within the frustum.
+    """
+    spheres = numpy.asarray( spheres, dtype = numpy.float ).reshape( -1, 4 )
+    distances = point_distances( planes, spheres[ :, 0:3 ] )
+    return numpy.all( distances >= -spheres[ :, 3:4 ], axis = 1 )
+
+def aabb_mask( planes, aabbs ):
+    """Tests if axis aligned bounding boxes intersect a frustum.
+
+    :param numpy.array planes: A (6,4) array of planes.
+    :param numpy.array aabbs: An (N,2,3) array of boxes.
+    :rtype: numpy.array
+    :return: A boolean array, True for boxes that are
+        at least partially within the frustum.
+    """
+    aabbs = numpy.asarray( aabbs, dtype = numpy.float ).reshape( -1, 2, 3 )
+    centres = ( aabbs[ :, 0 ] + aabbs[ :, 1 ] ) * 0.5
+    extents = ( aabbs[ :, 1 ] - aabbs[ :, 0 ] ) * 0.5
+
+    # the distance of the corner furthest along each normal
+    distances = point_distances( planes, centres )
+    distances += numpy.dot( extents, numpy.abs( planes[ :, 0:3 ] ).T )
+    return numpy.all( distances >= 0.0, axis = 1 )
@@ -0,0 +1,297 @@
+"""Provides software occlusion culling with a small depth buffer.
+
+An :py:class:`OcclusionBuffer` rasterises the triangles of a few
+large occluders, such as buildings or terrain, into a low resolution
+depth buffer on the CPU. The bounds of other objects are then tested
+against the buffer and those entirely behind the occluders are culled.
+
+No GPU or OpenGL context is required, so culling can also be
+performed by headless servers.
+
+Triangles are set up and rasterised with vectorised operations, every
+pixel of the bounding rectangle of each triangle is tested at once.
+A pyramid of the furthest depth of each 2x2 block of pixels is built
+from the buffer, so that each box is tested against at most 4 texels::
+
+    buffer = OcclusionBuffer( 256, 128 )
+    while running:
+        buffer.clear()
+        for mesh, matrix in occluders:
+            buffer.rasterize( numpy.dot( matrix, camera.view_projection ), mesh )
+
+        visible = frustum.aabb_mask( camera.frustum, aabbs )
+        indices = numpy.nonzero( visible )[ 0 ]
+        indices = indices[ buffer.test( camera.view_projection, aabbs[ indices ] ) ]
+        print "culled %d draws" % buffer.culled
+
+Depths are window depths in the range [0,1], as used by
+:py:mod:`pygly.screen_space`.
+
+Culling is conservative. Triangles that cross the near plane are not
+rasterised, pixels are only covered if their centre is within a
+triangle, and boxes that cross the near plane are always visible.
+Boxes should be frustum culled first, as boxes outside of the buffer
+are tested against the pixels at its edge.
+"""
+
+import numpy
+
+from bvh import _expand
+
+
+# depths are quantised into the low bits of a sort key
+_depth_bits = 32
+_depth_mask = ( 1 << _depth_bits ) - 1
+_depth_scale = float( _depth_mask )
+
+class OcclusionBuffer( object ):
+    """A low resolution depth buffer of occluders.
+    """
+
+    #: The most pixels tested at once while rasterising,
+    #: which limits the memory used by large triangles.
+    chunk_size = 1 << 18
+
+    def __init__( self, width = 256, height = 128 ):
+        """Creates a cleared buffer.
+
+        :param int width: The width of the buffer in pixels.
+        :param int height: The height of the buffer in pixels.
+        """
+        super( OcclusionBuffer, self ).__init__()
+
+        self.width = width
+        self.height = height
+
+        #: The (height,width) array of depths, with the
+        #: first row at the bottom of the screen.
+        self.depths = numpy.ones( ( height, width ) )
+
+        #: The number of triangles rasterised since the last clear.
+        self.rasterized = 0
+        #: The number of boxes tested in the last test.
+        self.tested = 0
+        #: The number of boxes culled in the last test.
+        self.culled = 0
+
+        self._pyramid = None
+
+    def clear( self ):
+        """Resets every pixel to the far plane.
+        """
+        self.depths.fill( 1.0 )
+        self.rasterized = 0
+        self._pyramid = None
+
+    def _screen( self, matrix, points ):
+        """Projects points into the buffer.
+
+        :rtype: tuple
+        :return: A tuple of (screen, in_front), an (...,3) array of
+            pixel coordinates and depth, and a mask of the points in
+            front of the near plane.
+        """
+        matrix = numpy.asarray( matrix, dtype = numpy.float )
+        clip = numpy.dot( points.reshape( -1, 3 ), matrix[ 0:3 ] ) + matrix[ 3 ]
+        clip = clip.reshape( points.shape[ :-1 ] + ( 4, ) )
+        w = clip[ ..., 3 ]
+        in_front = ( w > 0.0 ) & ( clip[ ..., 2 ] >= -w )
+
+        with numpy.errstate( divide = 'ignore', invalid = 'ignore' ):
+            screen = ( clip[ ..., 0:3 ] / w[ ..., numpy.newaxis ] + 1.0 ) * 0.5
+        screen[ ..., 0 ] *= self.width
+        screen[ ..., 1 ] *= self.height
+        return screen, in_front
+
+    def rasterize( self, matrix, triangles, double_sided = True ):
+        """Renders the depth of triangles into the buffer.
+
+        :param numpy.array matrix: A (4,4) matrix that transforms the
+            triangles into clip space. For object space triangles,
+            this is the world matrix multiplied by the view projection.
+        :param numpy.array triangles: An (N,3,3) array of triangle vertices.
+        :param bool double_sided: If False, triangles that are wound
+            clockwise on screen are skipped. The back faces of closed
+            meshes are always hidden by their front faces, so this
+            halves the work without changing the depths.
+        """
+        triangles = numpy.asarray( triangles, dtype = numpy.float ).reshape( -1, 3, 3 )
+        screen, in_front = self._screen( matrix, triangles )
+        screen = screen[ numpy.all( in_front, axis = 1 ) ]
+
+        x = screen[ :, :, 0 ]
+        y = screen[ :, :, 1 ]
+        z = screen[ :, :, 2 ]
+
+        # the edge function of each edge, a.x + b.y + c, is positive
+        # on the inside of the edge for counter clockwise triangles
+        following = [ 1, 2, 0 ]
+        a = y - y[ :, following ]
+        b = x[ :, following ] - x
+        c = x * y[ :, following ] - x[ :, following ] * y
+        areas = c.sum( axis = 1 )
+
+        keep = areas > 0.0 if not double_sided else areas != 0.0
+        signs = numpy.sign( areas[ keep ] )[ :, numpy.newaxis ]
+        a = a[ keep ] * signs
+        b = b[ keep ] * signs
+        c = c[ keep ] * signs
+        areas = numpy.abs( areas[ keep ] )
+        x = x[ keep ]
+        y = y[ keep ]
+        z = z[ keep ]
+
+        # depth is linear in screen space, weight the depth of each
+        # vertex by the edge function of the opposite edge
+        depth_plane = numpy.column_stack( (
+            ( a * z[ :, [ 2, 0, 1 ] ] ).sum( axis = 1 ),
+            ( b * z[ :, [ 2, 0, 1 ] ] ).sum( axis = 1 ),
+            ( c * z[ :, [ 2, 0, 1 ] ] ).sum( axis = 1 ),
+            ) ) / areas[ :, numpy.newaxis ]
+
+        # the pixels whose centres may be within each triangle
+        lows = numpy.empty( ( len( x ), 2 ), dtype = numpy.int )
+        highs = numpy.empty( ( len( x ), 2 ), dtype = numpy.int )
+        lows[ :, 0 ] = numpy.clip( numpy.ceil( x.min( axis = 1 ) - 0.5 ), 0, self.width )
+        lows[ :, 1 ] = numpy.clip( numpy.ceil( y.min( axis = 1 ) - 0.5 ), 0, self.height )
+        highs[ :, 0 ] = numpy.clip( numpy.floor( x.max( axis = 1 ) - 0.5 ), -1, self.width - 1 )
+        highs[ :, 1 ] = numpy.clip( numpy.floor( y.max( axis = 1 ) - 0.5 ), -1, self.height - 1 )
+        sizes = numpy.maximum( highs - lows + 1, 0 )
+        counts = sizes[ :, 0 ] * sizes[ :, 1 ]
+
+        # rasterise as many triangles at once as fit within a chunk
+        triangles = numpy.nonzero( counts )[ 0 ]
+        totals = numpy.cumsum( counts[ triangles ] )
+        start = 0
+        while start < len( triangles ):
+            limit = ( totals[ start - 1 ] if start else 0 ) + self.chunk_size
+            stop = max( numpy.searchsorted( totals, limit, side = 'right' ), start + 1 )
+            chunk = triangles[ start:stop ]
+            start = stop
+
+            owners = numpy.repeat( chunk, counts[ chunk ] )
+            offsets = _expand( numpy.zeros( len( chunk ), dtype = numpy.int ), counts[ chunk ] )
+            widths = sizes[ owners, 0 ]
+            px = lows[ owners, 0 ] + offsets % widths
+            py = lows[ owners, 1 ] + offsets // widths
+            centre_x = px + 0.5
+            centre_y = py + 0.5
+
+            inside = numpy.ones( len( owners ), dtype = numpy.bool )
+            for edge in xrange( 3 ):
+                inside &= (
+                    a[ owners, edge ] * centre_x + b[ owners, edge ] * centre_y + c[ owners, edge ]
+                    ) >= 0.0
+            owners = owners[ inside ]
+            centre_x = centre_x[ inside ]
+            centre_y = centre_y[ inside ]
+            pixels = py[ inside ] * self.width + px[ inside ]
+            depths = (
+                depth_plane[ owners, 0 ] * centre_x
+                + depth_plane[ owners, 1 ] * centre_y
+                + depth_plane[ owners, 2 ]
+                )
+
+            # keep the nearest depth of each pixel, sorting a single
+            # key of pixel and depth is faster than sorting by both,
+            # depths are rounded away from the camera
+            keys = numpy.ceil( numpy.clip( depths, 0.0, 1.0 ) * _depth_scale ).astype( numpy.int64 )
+            keys |= pixels.astype( numpy.int64 ) << _depth_bits
+            keys.sort()
+            first = numpy.ones( len( keys ), dtype = numpy.bool )
+            first[ 1: ] = ( keys[ 1: ] >> _depth_bits ) != ( keys[ :-1 ] >> _depth_bits )
+            keys = keys[ first ]
+            pixels = keys >> _depth_bits
+            depths = ( keys & _depth_mask ) / _depth_scale
+
+            buffer = self.depths.reshape( -1 )
+            buffer[ pixels ] = numpy.minimum( buffer[ pixels ], depths )
+
+        self.rasterized += len( x )
+        self._pyramid = None
+
+    @property
+    def pyramid( self ):
+        """The furthest depths of the buffer at decreasing resolutions.
+
+        The first level is the buffer itself, each following level
+        is half the size of the one before, and the last is a single
+        pixel. The pyramid is rebuilt after triangles are rasterised.
+
+        This is an @property decorated method.
+
+        :rtype: list
+        :return: A list of 2D arrays of depths.
+        """
+        if self._pyramid is None:
+            levels = [ self.depths ]
+            while levels[ -1 ].size > 1:
+                level = levels[ -1 ]
+                height, width = level.shape
+
+                # odd sizes are padded with the far plane
+                padded = numpy.ones( ( height + height % 2, width + width % 2 ) )
+                padded[ :height, :width ] = level
+                levels.append( padded.reshape(
+                    padded.shape[ 0 ] // 2, 2,
+                    padded.shape[ 1 ] // 2, 2
+                    ).max( axis = ( 1, 3 ) ) )
+            self._pyramid = levels
+        return self._pyramid
+
+    def test( self, matrix, aabbs ):
+        """Tests if boxes may be visible past the occluders.
+
+        The number of boxes tested and culled are stored in
+        :py:attr:`tested` and :py:attr:`culled`.
+
+        :param numpy.array matrix: A (4,4) view projection matrix.
+        :param numpy.array aabbs: An (N,2,3) array of world space boxes.
+        :rtype: numpy.array
+        :return: A boolean array, True for boxes that may be visible.
+        """
+        aabbs = numpy.asarray( aabbs, dtype = numpy.float ).reshape( -1, 2, 3 )
+
+        # the 8 corners of each box, corners are the first axis
+        # so that reducing over them is fast
+        corners = numpy.empty( ( 8, len( aabbs ), 3 ) )
+        for corner in xrange( 8 ):
+            for axis in xrange( 3 ):
+                corners[ corner, :, axis ] = aabbs[ :, ( corner >> axis ) & 1, axis ]
+
+        screen, in_front = self._screen( matrix, corners )
+        in_front = numpy.all( in_front, axis = 0 )
+
+        # the pixels covered by each box and its nearest depth
+        with numpy.errstate( invalid = 'ignore' ):
+            lows = numpy.floor( screen[ :, :, 0:2 ].min( axis = 0 ) )
+            highs = numpy.floor( screen[ :, :, 0:2 ].max( axis = 0 ) )
+            nearest = screen[ :, :, 2 ].min( axis = 0 )
+        limits = [ self.width - 1, self.height - 1 ]
+        lows = numpy.clip( numpy.nan_to_num( lows ), 0, limits ).astype( numpy.int )
+        highs = numpy.clip( numpy.nan_to_num( highs ), 0, limits ).astype( numpy.int )
+
+        # use the level at which the pixels are within 2x2 texels
+        pyramid = self.pyramid
+        spans = ( highs - lows ).max( axis = 1 )
+        levels = numpy.zeros( len( aabbs ), dtype = numpy.int )
+        nonzero = spans > 0
+        levels[ nonzero ] = numpy.floor( numpy.log2( spans[ nonzero ] ) ).astype( numpy.int ) + 1
+        levels = numpy.minimum( levels, len( pyramid ) - 1 )
+
+        shapes = numpy.array( [ level.shape for level in pyramid ], dtype = numpy.int )
+        starts = numpy.cumsum( shapes[ :, 0 ] * shapes[ :, 1 ] ) - shapes[ :, 0 ] * shapes[ :, 1 ]
+        texels = numpy.concatenate( [ level.ravel() for level in pyramid ] )
+
+        lows >>= levels[ :, numpy.newaxis ]
+        highs >>= levels[ :, numpy.newaxis ]
+        furthest = numpy.zeros( len( aabbs ) )
+        for tx, ty in ( ( lows[ :, 0 ], lows[ :, 1 ] ), ( highs[ :, 0 ], lows[ :, 1 ] ),
+                        ( lows[ :, 0 ], highs[ :, 1 ] ), ( highs[ :, 0 ], highs[ :, 1 ] ) ):
+            indices = starts[ levels ] + ty * shapes[ levels, 1 ] + tx
+            furthest = numpy.maximum( furthest, texels[ indices ] )
+
+        visible = ~in_front | ~( nearest > furthest )
+        self.tested = len( aabbs )
+        self.culled = self.tested - numpy.count_nonzero( visible )
+        return visible
@@ -0,0 +1,491 @@
+"""Provides a loose octree of moving scene nodes.
+
+A :py:class:`LooseOctree` stores the world space bounds of nodes.
+Each node is placed in a single cell, chosen from the centre and
+size of its bounds alone. Cells are enlarged by the looseness factor
+so that a node never needs to be split between cells.
+
+This makes the octree suited to scenes with many independently
+moving objects, where refitting a :py:class:`pygly.bvh.BVH`
+every frame is expensive::
+
+    octree = LooseOctree( centre = [ 0.0, 0.0, 0.0 ], size = 1000.0 )
+    for node, aabb in zip( nodes, bounds ):
+        octree.insert( node, aabb )
+
+    # each frame
+    octree.update( moved_nodes, moved_bounds )
+    visible = octree.select( octree.frustum( camera.frustum ) )
+
+The octree is stored linearly. Nodes are sorted by the Morton code
+of their cell, so the nodes beneath any cell are a contiguous range
+which queries can return without visiting the cells beneath it.
+
+Moving a node within its cell only updates its bounds.
+Inserting, removing or moving a node to another cell marks it
+as stale, and it is tested individually by queries until the nodes
+are next sorted. The sort is O(N log N) and happens once the number
+of stale nodes exceeds a fraction of the octree, so each change
+costs O(log N) amortised over the sorts, plus the cost of testing
+stale nodes in each query until then.
+
+Nodes outside of the octree's extent are tested individually
+by every query.
+"""
+
+import numpy
+
+from bvh import _expand
+
+
+def _spread_bits( values ):
+    """Inserts two zero bits between each of the lower 21 bits of values.
+    """
+    values = values.astype( numpy.uint64 ) & numpy.uint64( 0x1fffff )
+    for shift, mask in (
+        ( 32, 0x1f00000000ffff ),
+        ( 16, 0x1f0000ff0000ff ),
+        ( 8, 0x100f00f00f00f00f ),
+        ( 4, 0x10c30c30c30c30c3 ),
+        ( 2, 0x1249249249249249 ),
+        ):
+        values = ( values | ( values << numpy.uint64( shift ) ) ) & numpy.uint64( mask )
+    return values
+
+def _compact_bits( values ):
+    """Reverses :py:func:`_spread_bits`.
+    """
+    values = values.astype( numpy.uint64 ) & numpy.uint64( 0x1249249249249249 )
+    for shift, mask in (
+        ( 2, 0x10c30c30c30c30c3 ),
+        ( 4, 0x100f00f00f00f00f ),
+        ( 8, 0x1f0000ff0000ff ),
+        ( 16, 0x1f00000000ffff ),
+        ( 32, 0x1fffff ),
+        ):
+        values = ( values | ( values >> numpy.uint64( shift ) ) ) & numpy.uint64( mask )
+    return values.astype( numpy.int64 )
+
+def morton_codes( coordinates ):
+    """Interleaves the bits of integer coordinates.
+
+    :param numpy.array coordinates: An (N,3) array of integer coordinates
+        of up to 21 bits.
+    :rtype: numpy.array
+    :return: An int64 array of codes.
+    """
+    coordinates = numpy.asarray( coordinates )
+    codes = (
+        ( _spread_bits( coordinates[ :, 0 ] ) << numpy.uint64( 2 ) )
+        | ( _spread_bits( coordinates[ :, 1 ] ) << numpy.uint64( 1 ) )
+        | _spread_bits( coordinates[ :, 2 ] )
+        )
+    return codes.astype( numpy.int64 )
+
+def morton_coordinates( codes ):
+    """Reverses :py:func:`morton_codes`.
+
+    :rtype: numpy.array
+    :return: An (N,3) array of integer coordinates.
+    """
+    codes = numpy.asarray( codes, dtype = numpy.int64 )
+    return numpy.column_stack( (
+        _compact_bits( codes >> 2 ),
+        _compact_bits( codes >> 1 ),
+        _compact_bits( codes ),
+        ) )
+
+def _frustum_test( planes, mins, maxs ):
+    """Tests boxes against a frustum.
+
+    :rtype: tuple
+    :return: A tuple of (intersecting, contained) masks.
+    """
+    centres = ( mins + maxs ) * 0.5
+    extents = ( maxs - mins ) * 0.5
+    distances = numpy.dot( centres, planes[ :, 0:3 ].T ) - planes[ :, 3 ]
+    extent_distances = numpy.dot( extents, numpy.abs( planes[ :, 0:3 ] ).T )
+    return (
+        numpy.all( distances + extent_distances >= 0.0, axis = 1 ),
+        numpy.all( distances - extent_distances >= 0.0, axis = 1 )
+        )
+
+def _aabb_test( region, mins, maxs ):
+    """Tests boxes against a box.
+    """
+    return (
+        numpy.all( ( mins <= region[ 1 ] ) & ( maxs >= region[ 0 ] ), axis = 1 ),
+        numpy.all( ( mins >= region[ 0 ] ) & ( maxs <= region[ 1 ] ), axis = 1 )
+        )
+
+def _sphere_test( sphere, mins, maxs ):
+    """Tests boxes against a sphere.
+    """
+    centre = sphere[ 0:3 ]
+    radius_squared = sphere[ 3 ] ** 2
+    nearest = numpy.clip( centre, mins, maxs )
+    furthest = numpy.maximum( numpy.abs( mins - centre ), numpy.abs( maxs - centre ) )
+    return (
+        ( ( nearest - centre ) ** 2 ).sum( axis = 1 ) <= radius_squared,
+        ( furthest ** 2 ).sum( axis = 1 ) <= radius_squared
+        )
+
+
+class LooseOctree( object ):
+    """A linear loose octree of axis aligned bounding boxes.
+
+    The key of a cell is the Morton code of its minimum corner at
+    the maximum depth, multiplied by 16, plus its depth.
+    Sorting by key places each cell before the cells beneath it.
+    """
+
+    #: The key used for nodes outside of the octree.
+    outside = -1
+
+    def __init__(
+        self,
+        centre,
+        size,
+        max_depth = 5,
+        looseness = 2.0,
+        rebuild_fraction = 0.05,
+        capacity = 64
+        ):
+        """Creates an empty octree.
+
+        :param numpy.array centre: The centre of the octree.
+        :param float size: The width of the octree along each axis.
+        :param int max_depth: The depth of the smallest cells.
+            Must be 15 or less. Queries are fastest when the
+            smallest cells hold a few nodes each.
+        :param float looseness: The size of a cell's bounds relative
+            to the cell. Must be greater than 1.
+        :param float rebuild_fraction: The fraction of nodes that may
+            be stale before the nodes are sorted again.
+        :param int capacity: The initial number of node slots.
+        """
+        super( LooseOctree, self ).__init__()
+
+        if not 0 <= max_depth <= 15:
+            raise ValueError( "Maximum depth must be between 0 and 15" )
+        if looseness <= 1.0:
+            raise ValueError( "Looseness must be greater than 1" )
+
+        self.size = float( size )
+        self.origin = numpy.asarray( centre, dtype = numpy.float ) - self.size * 0.5
+        self.max_depth = max_depth
+        self.looseness = looseness
+        self.rebuild_fraction = rebuild_fraction
+
+        # each node has a slot in the arrays
+        # removed nodes leave their slot free for re-use
+        self.nodes = []
+        self.slots = {}
+        self._free = []
+        self.aabbs = numpy.zeros( ( capacity, 2, 3 ), dtype = numpy.float )
+        self.keys = numpy.full( capacity, LooseOctree.outside, dtype = numpy.int64 )
+        self.alive = numpy.zeros( capacity, dtype = numpy.bool )
+        # slots whose position in the sorted order is out of date
+        self.stale = numpy.zeros( capacity, dtype = numpy.bool )
+        self._stale_count = 0
+
+        # the slots sorted by key, and the populated
+        # cells at each depth, None when out of date
+        self._order = None
+        self._sorted_keys = None
+        self._levels = None
+
+    def __len__( self ):
+        return len( self.slots )
+
+    def __contains__( self, node ):
+        return node in self.slots
+
+    def cell_keys( self, aabbs ):
+        """Calculates the cells that boxes belong in.
+
+        :param numpy.array aabbs: An (N,2,3) array of boxes.
+        :rtype: numpy.array
+        :return: The cell key of each box, :py:attr:`outside`
+            for boxes that do not fit within the octree.
+        """
+        aabbs = numpy.asarray( aabbs, dtype = numpy.float ).reshape( -1, 2, 3 )
+        centres = ( aabbs[ :, 0 ] + aabbs[ :, 1 ] ) * 0.5
+        radii = ( aabbs[ :, 1 ] - aabbs[ :, 0 ] ).max( axis = 1 ) * 0.5
+        margin = ( self.looseness - 1.0 ) * self.size * 0.5
+
+        # the deepest cell whose loose bounds contain the box
+        # from anywhere within the cell
+        with numpy.errstate( divide = 'ignore' ):
+            depths = numpy.floor( numpy.log2( margin / radii ) )
+        depths = numpy.clip( depths, 0, self.max_depth ).astype( numpy.int64 )
+
+        positions = ( centres - self.origin ) / self.size
+        inside = numpy.all( ( positions >= 0.0 ) & ( positions < 1.0 ), axis = 1 )
+        inside &= radii <= margin
+
+        cells = ( 1 << depths )[ :, numpy.newaxis ]
+        coordinates = numpy.clip( ( positions * cells ).astype( numpy.int64 ), 0, cells - 1 )
+        coordinates <<= ( self.max_depth - depths )[ :, numpy.newaxis ]
+
+        keys = morton_codes( coordinates ) * 16 + depths
+        keys[ ~inside ] = LooseOctree.outside
+        return keys
+
+    def _grow( self, size ):
+        capacity = max( size, len( self.keys ) * 2 )
+
+        aabbs = numpy.zeros( ( capacity, 2, 3 ), dtype = numpy.float )
+        aabbs[ :len( self.aabbs ) ] = self.aabbs
+        self.aabbs = aabbs
+
+        keys = numpy.full( capacity, LooseOctree.outside, dtype = numpy.int64 )
+        keys[ :len( self.keys ) ] = self.keys
+        self.keys = keys
+
+        alive = numpy.zeros( capacity, dtype = numpy.bool )
+        alive[ :len( self.alive ) ] = self.alive
+        self.alive = alive
+
+        stale = numpy.zeros( capacity, dtype = numpy.bool )
+        stale[ :len( self.stale ) ] = self.stale
+        self.stale = stale
+
+    def _mark_stale( self, slots ):
+        stale = self.stale[ slots ]
+        self.stale[ slots ] = True
+        self._stale_count += len( stale ) - numpy.count_nonzero( stale )
+        if self._stale_count > self.rebuild_fraction * len( self.slots ):
+            self._order = None
+
+    def insert( self, node, aabb ):
+        """Adds a node to the octree.
+
+        :param node: The node, any hashable object.
+        :param numpy.array aabb: The (2,3) world space bounds of the node.
+        :raise ValueError: Raised if the node is already in the octree.
+        :rtype: int
+        :return: The slot of the node.
+        """
+        if node in self.slots:
+            raise ValueError( "Node is already in the octree" )
+
+        if self._free:
+            slot = self._free.pop()
+            self.nodes[ slot ] = node
+        else:
+            slot = len( self.nodes )
+            self.nodes.append( node )
+            if slot >= len( self.keys ):
+                self._grow( slot + 1 )
+
+        # the node's cell is found when the nodes are next sorted
+        self.slots[ node ] = slot
+        self.aabbs[ slot ] = aabb
+        self.keys[ slot ] = LooseOctree.outside
+        self.alive[ slot ] = True
+        self._mark_stale( [ slot ] )
+        return slot
+
+    def remove( self, node ):
+        """Removes a node from the octree.
+
+        :raise KeyError: Raised if the node is not in the octree.
+        """
+        slot = self.slots.pop( node )
+        self.nodes[ slot ] = None
+        self.alive[ slot ] = False
+        self._mark_stale( [ slot ] )
+        self._free.append( slot )
+
+    def move( self, node, aabb ):
+        """Changes the bounds of a node.
+
+        :raise KeyError: Raised if the node is not in the octree.
+        :rtype: bool
+        :return: True if the node changed cells.
+        """
+        return self.update( [ node ], [ aabb ] ) > 0
+
+    def update( self, nodes, aabbs ):
+        """Changes the bounds of many nodes.
+
+        :param list nodes: The nodes to update.
+        :param numpy.array aabbs: An (N,2,3) array of new bounds.
+        :raise KeyError: Raised if a node is not in the octree.
+        :rtype: int
+        :return: The number of nodes that changed cells.
+        """
+        slots = [ self.slots[ node ] for node in nodes ]
+        return self.update_slots( slots, aabbs )
+
+    def update_slots( self, slots, aabbs ):
+        """Changes the bounds of the nodes in slots.
+
+        This avoids looking up the slot of each node when the
+        same nodes are updated every frame.
+
+        :param numpy.array slots: The slots to update, as returned
+            by :py:meth:`insert`.
+        :param numpy.array aabbs: An (N,2,3) array of new bounds.
+        :rtype: int
+        :return: The number of nodes that changed cells.
+        """
+        slots = numpy.asarray( slots, dtype = numpy.int )
+        aabbs = numpy.asarray( aabbs, dtype = numpy.float ).reshape( -1, 2, 3 )
+
+        keys = self.cell_keys( aabbs )
+        self.aabbs[ slots ] = aabbs
+
+        changed = slots[ keys != self.keys[ slots ] ]
+        self.keys[ slots ] = keys
+        self._mark_stale( changed )
+        return len( changed )
+
+    def bounds( self, node ):
+        """Returns the bounds of a node.
+
+        :raise KeyError: Raised if the node is not in the octree.
+        :rtype: numpy.array
+        """
+        return self.aabbs[ self.slots[ node ] ].copy()
+
+    def _sort( self ):
+        """Sorts the nodes by key and finds the populated cells.
+        """
+        stale = numpy.nonzero( self.stale & self.alive )[ 0 ]
+        self.keys[ stale ] = self.cell_keys( self.aabbs[ stale ] )
+
+        slots = numpy.nonzero( self.alive )[ 0 ]
+        keys = self.keys[ slots ]
+        order = numpy.argsort( keys )
+
+        self._order = slots[ order ]
+        self._sorted_keys = keys[ order ]
+        self.stale[ : ] = False
+        self._stale_count = 0
+
+        # the codes of the populated cells at each depth, a cell
+        # is populated if it or any cell beneath it has nodes
+        keys = self._sorted_keys[ self._sorted_keys >= 0 ]
+        codes = keys >> 4
+        depths = keys & 15
+        self._levels = []
+        for depth in xrange( self.max_depth + 1 ):
+            # codes are sorted, so the codes of each depth are as well
+            cells = codes[ depths >= depth ] >> ( 3 * ( self.max_depth - depth ) )
+            unique = numpy.ones( len( cells ), dtype = numpy.bool )
+            unique[ 1: ] = cells[ 1: ] != cells[ :-1 ]
+            self._levels.append( cells[ unique ] )
+
+    def _range( self, lower, upper ):
+        """Returns the slots with keys in [lower, upper).
+        """
+        starts = numpy.searchsorted( self._sorted_keys, lower )
+        ends = numpy.searchsorted( self._sorted_keys, upper )
+        return self._order[ _expand( starts, ends - starts ) ]
+
+    def _query( self, test ):
+        """Traverses the populated cells, one depth at a time.
+
+        :param test: Called with arrays of minimums and maximums,
+            returns a tuple of (intersecting, contained) masks.
+        """
+        if self._order is None:
+            self._sort()
+
+        aabbs = self.aabbs
+        results = []
+        candidates = []
+
+        # nodes outside the octree and stale nodes are always tested
+        candidates.append( self._range( [ LooseOctree.outside ], [ 0 ] ) )
+        stale = self._stale_count > 0
+        if stale:
+            candidates.append( numpy.nonzero( self.stale & self.alive )[ 0 ] )
+
+        cells = self._levels[ 0 ]
+        margin = ( self.looseness - 1.0 ) * 0.5
+        for depth in xrange( self.max_depth + 1 ):
+            if not len( cells ):
+                break
+
+            cell_size = self.size / ( 1 << depth )
+            coordinates = morton_coordinates( cells )
+            intersecting, contained = test(
+                self.origin + ( coordinates - margin ) * cell_size,
+                self.origin + ( coordinates + 1.0 + margin ) * cell_size
+                )
+
+            # every node in or beneath a contained cell matches,
+            # nodes in shallower cells with the same code come
+            # before the cell's own key and were already tested
+            shift = 3 * ( self.max_depth - depth )
+            codes = cells[ contained ] << shift
+            results.append( self._range( codes * 16 + depth, ( codes + ( 1 << shift ) ) * 16 ) )
+
+            # nodes in partially intersecting cells are tested
+            cells = cells[ intersecting & ~contained ]
+            keys = ( cells << shift ) * 16 + depth
+            candidates.append( self._range( keys, keys + 1 ) )
+
+            if depth == self.max_depth:
+                break
+
+            # the populated children of the remaining cells
+            children = self._levels[ depth + 1 ]
+            if not len( children ):
+                break
+            cells = ( ( cells << 3 )[ :, numpy.newaxis ] + numpy.arange( 8 ) ).ravel()
+            indices = numpy.minimum( numpy.searchsorted( children, cells ), len( children ) - 1 )
+            cells = cells[ children[ indices ] == cells ]
+
+        results.append( numpy.zeros( 0, dtype = numpy.int ) )
+        results = numpy.concatenate( results )
+        candidates = numpy.concatenate( candidates )
+        if stale:
+            # stale nodes may also be found in their old cell
+            results = results[ ~self.stale[ results ] ]
+            candidates = numpy.unique( candidates[ self.alive[ candidates ] ] )
+        candidates = candidates[ test( aabbs[ candidates, 0 ], aabbs[ candidates, 1 ] )[ 0 ] ]
+
+        return numpy.concatenate( ( results, candidates ) )
+
+    def frustum( self, planes ):
+        """Finds the nodes that intersect a frustum.
+
+        :param numpy.array planes: A (6,4) array of planes as returned by
+            :py:func:`pygly.frustum.planes_from_matrix`.
+        :rtype: numpy.array
+        :return: The slots of the nodes.
+        """
+        planes = numpy.asarray( planes, dtype = numpy.float )
+        return self._query( lambda mins, maxs: _frustum_test( planes, mins, maxs ) )
+
+    def aabb( self, region ):
+        """Finds the nodes that intersect a box.
+
+        :param numpy.array region: A (2,3) box.
+        :rtype: numpy.array
+        :return: The slots of the nodes.
+        """
+        region = numpy.asarray( region, dtype = numpy.float )
+        return self._query( lambda mins, maxs: _aabb_test( region, mins, maxs ) )
+
+    def sphere( self, sphere ):
+        """Finds the nodes that intersect a sphere.
+
+        :param numpy.array sphere: A (4,) sphere of centre and radius.
+        :rtype: numpy.array
+        :return: The slots of the nodes.
+        """
+        sphere = numpy.asarray( sphere, dtype = numpy.float )
+        return self._query( lambda mins, maxs: _sphere_test( sphere, mins, maxs ) )
+
+    def select( self, slots ):
+        """Returns the nodes in slots.
+
+        :rtype: list
+        """
+        nodes = self.nodes
+        return [ nodes[ slot ] for slot in slots ]
@@ -0,0 +1,270 @@
+"""Provides ray picking against the triangles of meshes.
+
+A :py:class:`Picker` finds the nearest triangle that a ray hits.
+Candidate nodes are found with a :py:class:`pygly.bvh.BVH` over the
+world space bounds of the nodes.
+
+Meshes are given in object space and may be shared by many nodes.
+Rather than transforming the triangles of a mesh into world space,
+the ray is transformed into the object space of each node.
+The triangles of each mesh are sorted along a Morton curve and
+grouped into small clusters with their own bounds, so that only the
+triangles of clusters that the ray passes through are tested.
+
+Every candidate node is tested at once with vectorised operations,
+rather than one node at a time::
+
+    picker = Picker( [ vertices[ indices ] for vertices, indices in meshes ] )
+    bvh = BVH( affine.transform_aabbs( local_bounds, array.world_matrices ) )
+
+    ray = camera.screen_ray( viewport, mouse_position )
+    hit = picker.pick( ray, bvh, mesh_indices, array.world_matrices )
+    if hit is not None:
+        index, distance, triangle, barycentrics = hit
+        selected = array.nodes[ index ]
+"""
+
+import numpy
+
+import affine
+from bvh import _expand, _ray_inverses, _ray_slabs
+from octree import morton_codes
+
+
+def _cross( a, b ):
+    """Calculates the cross product of vectors along the last axis.
+
+    This avoids the overhead of numpy.cross for small arrays.
+    """
+    return numpy.stack( (
+        a[ ..., 1 ] * b[ ..., 2 ] - a[ ..., 2 ] * b[ ..., 1 ],
+        a[ ..., 2 ] * b[ ..., 0 ] - a[ ..., 0 ] * b[ ..., 2 ],
+        a[ ..., 0 ] * b[ ..., 1 ] - a[ ..., 1 ] * b[ ..., 0 ],
+        ), axis = -1 )
+
+def ray_triangles( ray, triangles, max_distance = numpy.inf, epsilon = 1e-12 ):
+    """Intersects rays with triangles.
+
+    Uses the Moller-Trumbore algorithm. Both sides of a
+    triangle are hit.
+
+    :param numpy.array ray: A (2,3) ray of origin and direction,
+        as used by Pyrr, or an (N,2,3) array with a ray per triangle.
+    :param numpy.array triangles: An (N,3,3) array of triangle vertices.
+    :param float max_distance: The furthest distance along the
+        ray to test, in multiples of the direction's length.
+    :param float epsilon: Triangles that are closer to parallel
+        with the ray than this are missed.
+    :rtype: tuple
+    :return: A tuple of (distances, barycentrics).
+        Distances are in multiples of the direction's length,
+        and are infinite for triangles that are missed.
+        Barycentrics are an (N,2) array of the weights of the
+        second and third vertex of each triangle.
+    """
+    ray = numpy.asarray( ray, dtype = numpy.float )
+    origins = ray[ ..., 0, : ]
+    directions = ray[ ..., 1, : ]
+    triangles = numpy.asarray( triangles, dtype = numpy.float ).reshape( -1, 3, 3 )
+
+    first = triangles[ :, 0 ]
+    edge1 = triangles[ :, 1 ] - first
+    edge2 = triangles[ :, 2 ] - first
+
+    p = _cross( directions, edge2 )
+    determinants = ( edge1 * p ).sum( axis = 1 )
+    parallel = numpy.abs( determinants ) <= epsilon
+    with numpy.errstate( divide = 'ignore', invalid = 'ignore' ):
+        inverse = 1.0 / determinants
+
+        s = origins - first
+        u = ( s * p ).sum( axis = 1 ) * inverse
+        q = _cross( s, edge1 )
+        v = ( q * directions ).sum( axis = 1 ) * inverse
+        distances = ( edge2 * q ).sum( axis = 1 ) * inverse
+
+        hit = (
+            ~parallel
+            & ( u >= 0.0 )
+            & ( v >= 0.0 )
+            & ( u + v <= 1.0 )
+            & ( distances >= 0.0 )
+            & ( distances <= max_distance )
+            )
+    distances[ ~hit ] = numpy.inf
+    return distances, numpy.column_stack( ( u, v ) )
+
+def transform_rays( rays, matrices ):
+    """Transforms rays by matrices.
+
+    The direction is not normalised, so distances along the
+    transformed ray are the same as along the original ray.
+
+    :param numpy.array rays: A (2,3) ray or an (N,2,3) array of rays.
+    :param numpy.array matrices: A (4,4) matrix or an (N,4,4)
+        array of matrices.
+    :rtype: numpy.array
+    :return: The transformed (2,3) or (N,2,3) rays.
+    """
+    rays = numpy.asarray( rays, dtype = numpy.float )
+    matrices = numpy.asarray( matrices, dtype = numpy.float )
+    rotations = matrices[ ..., 0:3, 0:3 ]
+    transformed = numpy.einsum( '...ij,...jk->...ik', rays, rotations )
+    transformed[ ..., 0, : ] += matrices[ ..., 3, 0:3 ]
+    return transformed
+
+
+class Picker( object ):
+    """Finds the nearest triangle hit by a ray.
+    """
+
+    def __init__( self, meshes, cluster_size = 32 ):
+        """Creates a picker for a list of meshes.
+
+        :param list meshes: A list of (N,3,3) arrays of the object
+            space vertices of the triangles of each mesh.
+        :param int cluster_size: The number of triangles
+            in each cluster.
+        """
+        super( Picker, self ).__init__()
+
+        self.cluster_size = cluster_size
+        self.meshes = [
+            numpy.asarray( mesh, dtype = numpy.float ).reshape( -1, 3, 3 )
+            for mesh in meshes
+            ]
+
+        # the triangles of every mesh, sorted by cluster
+        triangles = []
+        self._triangle_ids = []
+        cluster_counts = []
+        for mesh in self.meshes:
+            order = self._cluster_order( mesh )
+            triangles.append( mesh[ order ] )
+            self._triangle_ids.append( order )
+            cluster_counts.append( -( -len( mesh ) // cluster_size ) )
+
+        self._triangles = numpy.concatenate( triangles ) if triangles else numpy.zeros( ( 0, 3, 3 ) )
+        self._triangle_ids = numpy.concatenate( self._triangle_ids ) if triangles else numpy.zeros( 0, dtype = numpy.int )
+
+        #: The first cluster and number of clusters of each mesh.
+        self.mesh_clusters = numpy.zeros( ( len( self.meshes ), 2 ), dtype = numpy.int )
+        self.mesh_clusters[ :, 1 ] = cluster_counts
+        self.mesh_clusters[ :, 0 ] = numpy.cumsum( cluster_counts ) - cluster_counts
+
+        # clusters never span two meshes
+        mesh_sizes = numpy.array( [ len( mesh ) for mesh in self.meshes ], dtype = numpy.int )
+        mesh_starts = numpy.cumsum( mesh_sizes ) - mesh_sizes
+        offsets = _expand( numpy.zeros( len( self.meshes ), dtype = numpy.int ), cluster_counts ) * cluster_size
+        starts = numpy.repeat( mesh_starts, cluster_counts ) + offsets
+        ends = numpy.minimum( starts + cluster_size, numpy.repeat( mesh_starts + mesh_sizes, cluster_counts ) )
+
+        #: The first triangle and number of triangles of each cluster.
+        self.clusters = numpy.column_stack( ( starts, ends - starts ) )
+        #: The (N,2,3) bounds of each cluster.
+        self.cluster_bounds = numpy.zeros( ( len( starts ), 2, 3 ) )
+        if len( starts ):
+            self.cluster_bounds[ :, 0 ] = numpy.minimum.reduceat( self._triangles.min( axis = 1 ), starts )
+            self.cluster_bounds[ :, 1 ] = numpy.maximum.reduceat( self._triangles.max( axis = 1 ), starts )
+
+    def _cluster_order( self, triangles ):
+        """Sorts triangles along a Morton curve through their centres.
+        """
+        if len( triangles ) <= self.cluster_size:
+            return numpy.arange( len( triangles ) )
+
+        centres = triangles.mean( axis = 1 )
+        minimum = centres.min( axis = 0 )
+        size = max( ( centres.max( axis = 0 ) - minimum ).max(), 1e-12 )
+        coordinates = ( ( centres - minimum ) / size * 1023.0 ).astype( numpy.int64 )
+        return numpy.argsort( morton_codes( coordinates ), kind = 'mergesort' )
+
+    def intersect( self, rays, meshes, max_distance = numpy.inf ):
+        """Finds the nearest triangle hit by each ray.
+
+        :param numpy.array rays: An (N,2,3) array of rays, each in the
+            object space of its mesh.
+        :param numpy.array meshes: The index of the mesh tested by each ray.
+        :param float max_distance: The furthest distance along the
+            rays to test, in multiples of their direction's length.
+        :rtype: tuple
+        :return: A tuple of (triangles, distances, barycentrics).
+            Rays that miss have a triangle of -1 and an infinite distance.
+        """
+        rays = numpy.asarray( rays, dtype = numpy.float ).reshape( -1, 2, 3 )
+        meshes = numpy.asarray( meshes, dtype = numpy.int )
+        triangles = numpy.empty( len( rays ), dtype = numpy.int )
+        triangles.fill( -1 )
+        distances = numpy.empty( len( rays ) )
+        distances.fill( numpy.inf )
+        barycentrics = numpy.zeros( ( len( rays ), 2 ) )
+
+        # the clusters each ray passes through
+        counts = self.mesh_clusters[ meshes, 1 ]
+        owners = numpy.repeat( numpy.arange( len( rays ) ), counts )
+        clusters = _expand( self.mesh_clusters[ meshes, 0 ], counts )
+        hit = _ray_slabs(
+            rays[ owners, 0 ],
+            _ray_inverses( rays[ :, 1 ] )[ owners ],
+            self.cluster_bounds[ clusters ],
+            max_distance
+            )[ 0 ]
+        owners = owners[ hit ]
+        clusters = clusters[ hit ]
+
+        # the triangles of those clusters
+        counts = self.clusters[ clusters, 1 ]
+        owners = numpy.repeat( owners, counts )
+        candidates = _expand( self.clusters[ clusters, 0 ], counts )
+        candidate_distances, candidate_barycentrics = ray_triangles(
+            rays[ owners ],
+            self._triangles[ candidates ],
+            max_distance
+            )
+
+        # the nearest hit of each ray
+        order = numpy.lexsort( ( candidate_distances, owners ) )
+        first = numpy.ones( len( order ), dtype = numpy.bool )
+        first[ 1: ] = owners[ order[ 1: ] ] != owners[ order[ :-1 ] ]
+        nearest = order[ first ]
+        nearest = nearest[ candidate_distances[ nearest ] < numpy.inf ]
+
+        owners = owners[ nearest ]
+        triangles[ owners ] = self._triangle_ids[ candidates[ nearest ] ]
+        distances[ owners ] = candidate_distances[ nearest ]
+        barycentrics[ owners ] = candidate_barycentrics[ nearest ]
+        return triangles, distances, barycentrics
+
+    def pick( self, ray, bvh, mesh_indices = None, matrices = None, max_distance = numpy.inf ):
+        """Finds the nearest triangle of the scene hit by a ray.
+
+        :param numpy.array ray: A (2,3) world space ray, such as
+            one created by :py:meth:`pygly.camera_node.CameraNode.screen_ray`.
+        :param BVH bvh: A hierarchy over the world space bounds of
+            the nodes.
+        :param numpy.array mesh_indices: The index of the mesh of each
+            node. If None, each node uses the mesh with its own index.
+        :param numpy.array matrices: An (N,4,4) array of the world matrix
+            of each node. If None, meshes are in world space.
+        :param float max_distance: The furthest distance along the
+            ray to test, in multiples of the direction's length.
+        :rtype: tuple
+        :return: A tuple of (index, distance, triangle, barycentrics),
+            or None if nothing was hit.
+        """
+        ray = numpy.asarray( ray, dtype = numpy.float )
+        indices = bvh.ray( ray, max_distance )[ 0 ]
+        if len( indices ) == 0:
+            return None
+
+        meshes = indices if mesh_indices is None else numpy.asarray( mesh_indices )[ indices ]
+        if matrices is None:
+            rays = numpy.repeat( ray[ numpy.newaxis ], len( indices ), axis = 0 )
+        else:
+            rays = transform_rays( ray, affine.inverse( numpy.asarray( matrices )[ indices ] ) )
+
+        triangles, distances, barycentrics = self.intersect( rays, meshes, max_distance )
+        nearest = numpy.argmin( distances )
+        if distances[ nearest ] == numpy.inf:
+            return None
+        return indices[ nearest ], distances[ nearest ], triangles[ nearest ], barycentrics[ nearest ]
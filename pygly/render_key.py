@@ -0,0 +1,220 @@
+"""Provides packed 64 bit sort keys for draw calls.
+
+Sorting draw calls by depth alone ignores the cost of changing
+render state. A render key packs the render pass, translucency,
+shader, material and depth of a draw call into a single uint64,
+so that a single sort orders draw calls by all of them.
+
+The bits of a key, from most to least significant, are:
+
+=========== ====== =========================================
+Field       Bits   Notes
+=========== ====== =========================================
+pass        4      Passes are drawn in ascending order.
+translucent 1      Opaque draws are drawn first.
+shader      12     Opaque draws are grouped by shader, then
+material    16     material, then sorted front to back.
+depth       24
+=========== ====== =========================================
+
+Translucent draws must be drawn back to front, so for these
+the inverted depth is placed above the shader and material.
+
+Example::
+
+    keys = create_keys( passes, translucent, shaders, materials, depths, near, far )
+    for index in sort_keys( keys ):
+        draws[ index ].draw()
+"""
+
+import numpy
+
+
+pass_bits = 4
+translucent_bits = 1
+shader_bits = 12
+material_bits = 16
+depth_bits = 24
+
+pass_shift = 64 - pass_bits
+translucent_shift = pass_shift - translucent_bits
+
+# opaque layout
+shader_shift = translucent_shift - shader_bits
+material_shift = shader_shift - material_bits
+depth_shift = material_shift - depth_bits
+
+# translucent layout
+translucent_depth_shift = translucent_shift - depth_bits
+translucent_shader_shift = translucent_depth_shift - shader_bits
+translucent_material_shift = translucent_shader_shift - material_bits
+
+
+def _field( values, bits ):
+    """Converts values to uint64 and checks they fit within bits.
+    """
+    values = numpy.asarray( values ).astype( numpy.uint64 )
+    if numpy.any( values >> numpy.uint64( bits ) ):
+        raise ValueError( "Value exceeds %d bits" % bits )
+    return values
+
+def quantize_depths( depths, near, far, bits = depth_bits ):
+    """Converts depths to integers.
+
+    Depths are clamped to the range [near, far].
+
+    :param numpy.array depths: The view depth of each draw.
+    :param float near: The nearest depth.
+    :param float far: The furthest depth.
+    :param int bits: The number of bits to quantize to.
+    :rtype: numpy.array
+    :return: A uint64 array of quantized depths.
+    """
+    maximum = ( 1 << bits ) - 1
+    depths = ( numpy.asarray( depths, dtype = numpy.float ) - near ) / ( far - near )
+    depths = numpy.clip( depths, 0.0, 1.0 ) * maximum
+    return depths.astype( numpy.uint64 )
+
+def create_keys(
+    passes,
+    translucent,
+    shaders,
+    materials,
+    depths,
+    near,
+    far,
+    out = None
+    ):
+    """Packs the render state of draws into keys.
+
+    Each parameter may be an array with a value per draw or
+    a single value used for all draws.
+
+    :param numpy.array passes: The render pass of each draw.
+    :param numpy.array translucent: True for translucent draws.
+    :param numpy.array shaders: The shader id of each draw.
+    :param numpy.array materials: The material id of each draw.
+    :param numpy.array depths: The view depth of each draw.
+    :param float near: The nearest depth.
+    :param float far: The furthest depth.
+    :param numpy.array out: An optional uint64 array to write into.
+    :rtype: numpy.array
+    :return: A uint64 array of keys.
+    :raise ValueError: Raised if a value is too large for its field.
+    """
+    passes = _field( passes, pass_bits )
+    translucent = numpy.asarray( translucent, dtype = numpy.bool )
+    shaders = _field( shaders, shader_bits )
+    materials = _field( materials, material_bits )
+    depths = quantize_depths( depths, near, far )
+
+    passes, translucent, shaders, materials, depths = numpy.broadcast_arrays(
+        passes,
+        translucent,
+        shaders,
+        materials,
+        depths
+        )
+
+    if out is None:
+        out = numpy.empty( passes.shape, dtype = numpy.uint64 )
+
+    # opaque draws
+    numpy.left_shift( shaders, numpy.uint64( shader_shift ), out = out )
+    out |= materials << numpy.uint64( material_shift )
+    out |= depths << numpy.uint64( depth_shift )
+
+    # translucent draws are sorted back to front first
+    if translucent.any():
+        inverted = numpy.uint64( ( 1 << depth_bits ) - 1 ) - depths[ translucent ]
+        out[ translucent ] = (
+            ( inverted << numpy.uint64( translucent_depth_shift ) )
+            | ( shaders[ translucent ] << numpy.uint64( translucent_shader_shift ) )
+            | ( materials[ translucent ] << numpy.uint64( translucent_material_shift ) )
+            | numpy.uint64( 1 << translucent_shift )
+            )
+
+    out |= passes << numpy.uint64( pass_shift )
+    return out
+
+def unpack_keys( keys ):
+    """Extracts the fields of keys.
+
+    The depth is the quantized depth, as passed to
+    :py:func:`create_keys`.
+
+    :rtype: tuple
+    :return: A tuple of (passes, translucent, shaders, materials, depths).
+    """
+    keys = numpy.asarray( keys, dtype = numpy.uint64 )
+
+    def field( shift, bits ):
+        return ( keys >> numpy.uint64( shift ) ) & numpy.uint64( ( 1 << bits ) - 1 )
+
+    passes = field( pass_shift, pass_bits )
+    translucent = field( translucent_shift, translucent_bits ).astype( numpy.bool )
+
+    shaders = numpy.where(
+        translucent,
+        field( translucent_shader_shift, shader_bits ),
+        field( shader_shift, shader_bits )
+        )
+    materials = numpy.where(
+        translucent,
+        field( translucent_material_shift, material_bits ),
+        field( material_shift, material_bits )
+        )
+    depths = numpy.where(
+        translucent,
+        numpy.uint64( ( 1 << depth_bits ) - 1 ) - field( translucent_depth_shift, depth_bits ),
+        field( depth_shift, depth_bits )
+        )
+    return passes, translucent, shaders, materials, depths
+
+def radix_argsort( keys, digit_bits = 16 ):
+    """Sorts uint64 keys with a least significant digit radix sort.
+
+    Digits that are the same in every key are skipped, so keys
+    that only use a few fields need only a few passes.
+
+    .. note::
+        Each pass is a stable argsort of 8 or 16 bit digits, which NumPy
+        1.17 and later perform as a linear time radix sort.
+        Older versions use a merge sort, making this slower than
+        :py:func:`sort_keys`.
+
+    :param numpy.array keys: A uint64 array of keys.
+    :param int digit_bits: The number of bits sorted per pass.
+    :rtype: numpy.array
+    :return: The indices of the keys in ascending order.
+        Equal keys keep their original order.
+    """
+    keys = numpy.asarray( keys, dtype = numpy.uint64 )
+    order = numpy.arange( len( keys ) )
+    if len( keys ) < 2:
+        return order
+
+    # bits that differ between any two keys
+    varying = int(
+        numpy.bitwise_or.reduce( keys ) ^ numpy.bitwise_and.reduce( keys )
+        )
+
+    digit_mask = ( 1 << digit_bits ) - 1
+    dtype = numpy.uint8 if digit_bits <= 8 else numpy.uint16 if digit_bits <= 16 else numpy.uint32
+    for shift in xrange( 0, 64, digit_bits ):
+        if not ( varying >> shift ) & digit_mask:
+            continue
+
+        digits = ( ( keys[ order ] >> numpy.uint64( shift ) ) & numpy.uint64( digit_mask ) ).astype( dtype )
+        order = order[ numpy.argsort( digits, kind = 'mergesort' ) ]
+
+    return order
+
+def sort_keys( keys ):
+    """Returns the draw order of keys.
+
+    :rtype: numpy.array
+    :return: The indices of the keys in ascending order.
+        Equal keys keep their original order.
+    """
+    return numpy.argsort( keys, kind = 'mergesort' )
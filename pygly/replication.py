@@ -0,0 +1,413 @@
+"""Replicates a scene into another process as a stream of changes.
+
+:py:class:`ReplicationEncoder` compares the scene with the state it
+last sent and encodes only the differences.
+:py:class:`ReplicationDecoder` applies the differences to a replica
+scene made of :py:class:`pygly.scene_node.SceneNode` objects.
+
+Each frame contains, in order:
+
+    * Nodes added to the scene, parents before children.
+    * Nodes moved to a new parent.
+    * Nodes removed from the scene, along with their descendants.
+    * Transform changes for new and modified nodes.
+
+Transform changes contain a bitmask of the values that changed.
+Translations and scales are sent as 32 bit floats.
+Orientations are sent in 32 bits using the 'smallest three'
+quaternion encoding.
+
+Frames are prefixed by their length, so they can be written to
+any byte stream, such as a pipe or a socket's makefile().
+
+Example::
+
+    # sender
+    encoder = ReplicationEncoder( root )
+    while running:
+        stream.write( encoder.encode() )
+        stream.flush()
+
+    # receiver
+    decoder = ReplicationDecoder()
+    while running:
+        decoder.read( stream )
+        render( decoder.root )
+"""
+
+import math
+import struct
+
+import numpy
+
+from scene_node import SceneNode
+from transform_array import flatten
+
+
+#: The parent id of the root node.
+no_parent = 0xFFFFFFFF
+
+#: The translation changed.
+translation_changed = 0x01
+#: The orientation changed.
+orientation_changed = 0x02
+#: The scale changed.
+scale_changed = 0x04
+
+_frame_header = struct.Struct( '<IIII' )
+_add_header = struct.Struct( '<IIH' )
+_length = struct.Struct( '<I' )
+
+# the components that remain when the largest is dropped
+_remaining = numpy.array( [
+    [ 1, 2, 3 ],
+    [ 0, 2, 3 ],
+    [ 0, 1, 3 ],
+    [ 0, 1, 2 ],
+    ] )
+_quaternion_bits = 10
+_quaternion_max = ( 1 << _quaternion_bits ) - 1
+_quaternion_range = 1.0 / math.sqrt( 2.0 )
+
+
+def quantize_quaternions( quaternions ):
+    """Packs unit quaternions into 32 bits each.
+
+    The largest component is dropped and its index is stored
+    in the top 2 bits. The remaining components lie within
+    +/- 1 / sqrt(2) and are stored in 10 bits each.
+
+    :param numpy.array quaternions: An (N,4) array of quaternions.
+    :rtype: numpy.array
+    :return: An (N,) array of uint32.
+    """
+    quaternions = numpy.asarray( quaternions, dtype = numpy.float64 )
+    rows = numpy.arange( len( quaternions ) )
+
+    largest = numpy.argmax( numpy.abs( quaternions ), axis = 1 )
+
+    # q and -q are the same rotation, make the dropped component positive
+    signs = numpy.where( quaternions[ rows, largest ] < 0.0, -1.0, 1.0 )
+    remaining = quaternions[ rows[ :, numpy.newaxis ], _remaining[ largest ] ]
+    remaining *= signs[ :, numpy.newaxis ]
+
+    values = ( remaining / _quaternion_range + 1.0 ) * 0.5 * _quaternion_max
+    values = numpy.clip( numpy.rint( values ), 0, _quaternion_max )
+    values = values.astype( numpy.uint32 )
+
+    return (
+        ( largest.astype( numpy.uint32 ) << 30 )
+        | ( values[ :, 0 ] << 20 )
+        | ( values[ :, 1 ] << 10 )
+        | values[ :, 2 ]
+        )
+
+def dequantize_quaternions( packed ):
+    """Unpacks quaternions packed by
+    :py:func:`pygly.replication.quantize_quaternions`.
+
+    :param numpy.array packed: An (N,) array of uint32.
+    :rtype: numpy.array
+    :return: An (N,4) array of unit quaternions.
+    """
+    packed = numpy.asarray( packed, dtype = numpy.uint32 )
+    rows = numpy.arange( len( packed ) )
+
+    largest = ( packed >> 30 ).astype( numpy.int )
+    values = numpy.empty( (len( packed ), 3), dtype = numpy.float64 )
+    values[ :, 0 ] = ( packed >> 20 ) & _quaternion_max
+    values[ :, 1 ] = ( packed >> 10 ) & _quaternion_max
+    values[ :, 2 ] = packed & _quaternion_max
+    values = ( values / _quaternion_max * 2.0 - 1.0 ) * _quaternion_range
+
+    quaternions = numpy.empty( (len( packed ), 4), dtype = numpy.float64 )
+    quaternions[ rows[ :, numpy.newaxis ], _remaining[ largest ] ] = values
+    quaternions[ rows, largest ] = numpy.sqrt(
+        numpy.maximum( 1.0 - ( values ** 2 ).sum( axis = 1 ), 0.0 )
+        )
+
+    # re-normalise to remove quantisation error
+    quaternions /= numpy.sqrt( ( quaternions ** 2 ).sum( axis = 1 ) )[ :, numpy.newaxis ]
+    return quaternions
+
+
+class ReplicationEncoder( object ):
+    """Encodes the changes made to a scene.
+    """
+
+    def __init__( self, root ):
+        """Creates an encoder for the scene beneath root.
+
+        The first frame encoded contains the entire scene.
+        """
+        super( ReplicationEncoder, self ).__init__()
+
+        self.root = root
+
+        self._ids = {}
+        self._nodes = {}
+        self._next_id = 0
+
+        # the state last sent, indexed by node id
+        self._alive = numpy.zeros( 0, dtype = numpy.bool )
+        self._parents = numpy.zeros( 0, dtype = numpy.uint32 )
+        self._translations = numpy.zeros( (0, 3), dtype = numpy.float32 )
+        self._orientations = numpy.zeros( 0, dtype = numpy.uint32 )
+        self._scales = numpy.zeros( (0, 3), dtype = numpy.float32 )
+
+    def _reserve( self, count ):
+        """Grows the id indexed arrays to hold count ids.
+        """
+        capacity = len( self._alive )
+        if count <= capacity:
+            return
+
+        capacity = max( count, capacity * 2 )
+        def grow( array ):
+            grown = numpy.zeros( (capacity,) + array.shape[ 1: ], dtype = array.dtype )
+            grown[ :len( array ) ] = array
+            return grown
+
+        self._alive = grow( self._alive )
+        self._parents = grow( self._parents )
+        self._translations = grow( self._translations )
+        self._orientations = grow( self._orientations )
+        self._scales = grow( self._scales )
+
+    def _id( self, node ):
+        id = self._ids.get( node )
+        if id is None:
+            id = self._next_id
+            self._next_id += 1
+            self._ids[ node ] = id
+            self._nodes[ id ] = node
+        return id
+
+    def encode( self ):
+        """Encodes the changes since the last call.
+
+        :rtype: str
+        :return: A length prefixed frame of bytes.
+        """
+        nodes, parents, depths, ends = flatten( self.root )
+
+        ids = numpy.array(
+            [ self._id( node ) for node in nodes ],
+            dtype = numpy.uint32
+            )
+        self._reserve( self._next_id )
+
+        parent_ids = numpy.empty( len( ids ), dtype = numpy.uint32 )
+        parent_ids[ 0 ] = no_parent
+        parent_ids[ 1: ] = ids[ parents[ 1: ] ]
+
+        # structure
+        known = self._alive[ ids ]
+        added = numpy.nonzero( ~known )[ 0 ]
+        moved = numpy.nonzero( known & ( self._parents[ ids ] != parent_ids ) )[ 0 ]
+
+        present = numpy.zeros( len( self._alive ), dtype = numpy.bool )
+        present[ ids ] = True
+        removed = numpy.nonzero( self._alive & ~present )[ 0 ].astype( numpy.uint32 )
+
+        # only the top of each removed subtree needs to be sent
+        removed = removed[
+            ~numpy.in1d( self._parents[ removed ], removed )
+            ]
+
+        # forget removed nodes so they are re-added if they return
+        if len( removed ):
+            dead = numpy.nonzero( self._alive & ~present )[ 0 ]
+            self._alive[ dead ] = False
+            for id in dead:
+                del self._ids[ self._nodes.pop( id ) ]
+
+        # transforms
+        translations = numpy.array(
+            [ node.transform.translation for node in nodes ],
+            dtype = numpy.float32
+            ).reshape( -1, 3 )
+        orientations = quantize_quaternions(
+            numpy.array(
+                [ node.transform.orientation for node in nodes ]
+                ).reshape( -1, 4 )
+            )
+        scales = numpy.array(
+            [ node.transform.scale for node in nodes ],
+            dtype = numpy.float32
+            ).reshape( -1, 3 )
+
+        masks = numpy.zeros( len( ids ), dtype = numpy.uint8 )
+        masks[
+            ( self._translations[ ids ] != translations ).any( axis = 1 )
+            ] |= translation_changed
+        masks[ self._orientations[ ids ] != orientations ] |= orientation_changed
+        masks[ ( self._scales[ ids ] != scales ).any( axis = 1 ) ] |= scale_changed
+        masks[ added ] = translation_changed | orientation_changed | scale_changed
+        changed = numpy.nonzero( masks )[ 0 ]
+
+        # remember what we sent
+        self._alive[ ids ] = True
+        self._parents[ ids ] = parent_ids
+        self._translations[ ids ] = translations
+        self._orientations[ ids ] = orientations
+        self._scales[ ids ] = scales
+
+        # build the frame
+        chunks = []
+        for index in added:
+            name = nodes[ index ].name
+            if isinstance( name, unicode ):
+                name = name.encode( 'utf-8' )
+            name = str( name )
+            chunks.append(
+                _add_header.pack( ids[ index ], parent_ids[ index ], len( name ) )
+                )
+            chunks.append( name )
+
+        chunks.append( ids[ moved ].tostring() )
+        chunks.append( parent_ids[ moved ].tostring() )
+        chunks.append( removed.tostring() )
+
+        masks = masks[ changed ]
+        chunks.append( ids[ changed ].tostring() )
+        chunks.append( masks.tostring() )
+        chunks.append(
+            translations[ changed[ ( masks & translation_changed ) != 0 ] ].tostring()
+            )
+        chunks.append(
+            orientations[ changed[ ( masks & orientation_changed ) != 0 ] ].tostring()
+            )
+        chunks.append(
+            scales[ changed[ ( masks & scale_changed ) != 0 ] ].tostring()
+            )
+
+        body = _frame_header.pack(
+            len( added ),
+            len( moved ),
+            len( removed ),
+            len( changed )
+            ) + ''.join( chunks )
+        return _length.pack( len( body ) ) + body
+
+
+class ReplicationDecoder( object ):
+    """Applies encoded changes to a replica scene.
+    """
+
+    def __init__( self, node_factory = SceneNode ):
+        """Creates a decoder with an empty replica scene.
+
+        :param callable node_factory: Called with the node's name
+            to create each replica node.
+        """
+        super( ReplicationDecoder, self ).__init__()
+
+        self.node_factory = node_factory
+
+        #: The replica nodes indexed by id.
+        self.nodes = {}
+        self._ids = {}
+        #: The root of the replica scene.
+        self.root = None
+
+    def read( self, stream ):
+        """Reads and applies a single frame from a stream.
+
+        :raise EOFError: Raised if the stream ends.
+        """
+        length = stream.read( _length.size )
+        if len( length ) < _length.size:
+            raise EOFError( "Replication stream closed" )
+        body, = _length.unpack( length )
+        self.decode( length + stream.read( body ) )
+
+    def decode( self, data ):
+        """Applies a frame of changes.
+
+        :param str data: A frame as returned by
+            :py:meth:`ReplicationEncoder.encode`.
+        :raise ValueError: Raised if the frame is incomplete.
+        """
+        length, = _length.unpack_from( data )
+        if length != len( data ) - _length.size:
+            raise ValueError( "Incomplete replication frame" )
+
+        added, moved, removed, changed = _frame_header.unpack_from(
+            data,
+            _length.size
+            )
+        offset = _length.size + _frame_header.size
+
+        def read_array( dtype, count, width = 1 ):
+            array = numpy.frombuffer(
+                data,
+                dtype = dtype,
+                count = count * width,
+                offset = offset
+                )
+            if width > 1:
+                array = array.reshape( -1, width )
+            return array, offset + array.nbytes
+
+        nodes = self.nodes
+
+        # new nodes arrive parents first
+        for index in xrange( added ):
+            id, parent, length = _add_header.unpack_from( data, offset )
+            offset += _add_header.size
+            name = data[ offset:offset + length ]
+            offset += length
+
+            node = self.node_factory( name )
+            nodes[ id ] = node
+            self._ids[ node ] = id
+            if parent == no_parent:
+                self.root = node
+            else:
+                nodes[ parent ].add_child( node )
+
+        ids, offset = read_array( numpy.uint32, moved )
+        parents, offset = read_array( numpy.uint32, moved )
+        for id, parent in zip( ids, parents ):
+            node = nodes[ id ]
+            if node.parent is not None:
+                node.parent.remove_child( node )
+            if parent == no_parent:
+                self.root = node
+            else:
+                nodes[ parent ].add_child( node )
+
+        ids, offset = read_array( numpy.uint32, removed )
+        for id in ids:
+            node = nodes[ id ]
+            if node.parent is not None:
+                node.parent.remove_child( node )
+            self._forget( node )
+
+        ids, offset = read_array( numpy.uint32, changed )
+        masks, offset = read_array( numpy.uint8, changed )
+
+        selected = ids[ ( masks & translation_changed ) != 0 ]
+        translations, offset = read_array( numpy.float32, len( selected ), 3 )
+        for id, translation in zip( selected, translations ):
+            nodes[ id ].transform.translation = translation
+
+        selected = ids[ ( masks & orientation_changed ) != 0 ]
+        orientations, offset = read_array( numpy.uint32, len( selected ) )
+        orientations = dequantize_quaternions( orientations )
+        for id, orientation in zip( selected, orientations ):
+            nodes[ id ].transform.orientation = orientation
+
+        selected = ids[ ( masks & scale_changed ) != 0 ]
+        scales, offset = read_array( numpy.float32, len( selected ), 3 )
+        for id, scale in zip( selected, scales ):
+            nodes[ id ].transform.scale = scale
+
+    def _forget( self, node ):
+        """Removes the ids of a node and its descendants.
+        """
+        for descendant in node.dfs():
+            del self.nodes[ self._ids.pop( descendant ) ]
+            if descendant is self.root:
+                self.root = None
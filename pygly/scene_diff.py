@@ -0,0 +1,247 @@
+"""Calculates the differences between two states of a scene.
+
+A :py:class:`SceneSnapshot` records the structure and local
+transforms of a scene. Comparing two snapshots with
+:py:func:`diff` produces a :py:class:`ScenePatch` that can be
+applied to the scene to move it from the first state to
+the second.
+
+Nodes are matched between snapshots by identity, so snapshots
+must be taken of the same node objects.
+
+Example::
+
+    saved = snapshot( root )
+    edit( root )
+    current = snapshot( root )
+
+    # undo the edit
+    diff( current, saved ).apply()
+"""
+
+import numpy
+
+from transform_array import flatten
+
+
+class SceneSnapshot( object ):
+    """The structure and local transforms of a scene at a
+    point in time.
+
+    The snapshot holds references to the nodes, but copies
+    of their values.
+    """
+
+    def __init__( self, nodes, parents, translations, orientations, scales ):
+        """Creates a snapshot from arrays of values.
+
+        :param list nodes: The nodes in depth-first pre-order.
+        :param numpy.array parents: The parent index of each node,
+            -1 for the root.
+        :param numpy.array translations: An (N,3) array of translations.
+        :param numpy.array orientations: An (N,4) array of orientations.
+        :param numpy.array scales: An (N,3) array of scales.
+        """
+        super( SceneSnapshot, self ).__init__()
+
+        self.nodes = list( nodes )
+        self.parents = numpy.array( parents, dtype = numpy.int )
+        self.translations = numpy.array( translations, dtype = numpy.float ).reshape( -1, 3 )
+        self.orientations = numpy.array( orientations, dtype = numpy.float ).reshape( -1, 4 )
+        self.scales = numpy.array( scales, dtype = numpy.float ).reshape( -1, 3 )
+
+        # nodes are identified by their id, which is stable
+        # while the snapshot holds a reference to them
+        self.keys = numpy.array( [ id( node ) for node in self.nodes ], dtype = numpy.int64 )
+        self.parent_keys = numpy.where(
+            self.parents >= 0,
+            self.keys[ self.parents ],
+            -1
+            )
+
+    def __len__( self ):
+        return len( self.nodes )
+
+
+def snapshot( root ):
+    """Records the current state of the scene beneath root.
+
+    :rtype: SceneSnapshot
+    """
+    nodes, parents, depths, ends = flatten( root )
+    return SceneSnapshot(
+        nodes,
+        parents,
+        [ node.transform.translation for node in nodes ],
+        [ node.transform.orientation for node in nodes ],
+        [ node.transform.scale for node in nodes ],
+        )
+
+def snapshot_from_array( array ):
+    """Records the state held in a
+    :py:class:`pygly.transform_array.TransformArray`.
+
+    This avoids reading every node when the array is
+    already up to date.
+
+    :rtype: SceneSnapshot
+    """
+    return SceneSnapshot(
+        array.nodes,
+        array.parents,
+        array.translations,
+        array.orientations,
+        array.scales
+        )
+
+def diff( old, new, tolerance = 1.0e-6 ):
+    """Calculates the changes from one snapshot to another.
+
+    :param SceneSnapshot old: The original state.
+    :param SceneSnapshot new: The new state.
+    :param float tolerance: Transform values that change by less
+        than this are ignored.
+    :rtype: ScenePatch
+    """
+    if numpy.array_equal( old.keys, new.keys ):
+        # the same nodes in the same order, which is
+        # the common case when only transforms have changed
+        matched = numpy.ones( len( new.keys ), dtype = numpy.bool )
+        old_indices = numpy.arange( len( old.keys ) )
+    else:
+        # match the new nodes against the old nodes
+        order = numpy.argsort( old.keys )
+        sorted_keys = old.keys[ order ]
+        positions = numpy.searchsorted( sorted_keys, new.keys )
+        positions = numpy.minimum( positions, max( len( sorted_keys ) - 1, 0 ) )
+        if len( sorted_keys ):
+            matched = sorted_keys[ positions ] == new.keys
+        else:
+            matched = numpy.zeros( len( new.keys ), dtype = numpy.bool )
+        old_indices = order[ positions ]
+
+    new_matched = numpy.nonzero( matched )[ 0 ]
+    old_matched = old_indices[ matched ]
+
+    added = numpy.nonzero( ~matched )[ 0 ]
+    moved = new_matched[
+        old.parent_keys[ old_matched ] != new.parent_keys[ new_matched ]
+        ]
+
+    present = numpy.zeros( len( old.keys ), dtype = numpy.bool )
+    present[ old_matched ] = True
+    removed = numpy.nonzero( ~present )[ 0 ]
+
+    # only the top of each removed subtree needs to be detached
+    parents = old.parents[ removed ]
+    removed = removed[ ( parents < 0 ) | present[ parents ] ]
+
+    # compare transforms, q and -q are the same orientation
+    if len( added ) == 0 and len( removed ) == 0 and numpy.array_equal( old_matched, new_matched ):
+        # avoid copying the values when the nodes are in the same order
+        old_slice = slice( None )
+        new_slice = slice( None )
+    else:
+        old_slice = old_matched
+        new_slice = new_matched
+
+    old_orientations = old.orientations[ old_slice ]
+    new_orientations = new.orientations[ new_slice ]
+    different = (
+        ( numpy.abs( new.translations[ new_slice ] - old.translations[ old_slice ] ) > tolerance ).any( axis = 1 )
+        | ( numpy.abs( new.scales[ new_slice ] - old.scales[ old_slice ] ) > tolerance ).any( axis = 1 )
+        | (
+            ( numpy.abs( new_orientations - old_orientations ) > tolerance ).any( axis = 1 )
+            & ( numpy.abs( new_orientations + old_orientations ) > tolerance ).any( axis = 1 )
+            )
+        )
+    changed = new_matched[ different ]
+
+    # new nodes always receive their transform
+    changed = numpy.union1d( changed, added )
+
+    # nodes are attached in pre-order so parents are in place first
+    attached = numpy.union1d( added, moved )
+
+    def parent( index ):
+        index = new.parents[ index ]
+        return new.nodes[ index ] if index >= 0 else None
+
+    return ScenePatch(
+        added = [ new.nodes[ index ] for index in added ],
+        removed = [ old.nodes[ index ] for index in removed ],
+        moved = [ new.nodes[ index ] for index in moved ],
+        attached = [ (new.nodes[ index ], parent( index )) for index in attached ],
+        detached = [
+            (old.nodes[ index ], old.nodes[ old.parents[ index ] ])
+            for index in removed
+            if old.parents[ index ] >= 0
+            ],
+        transformed = [ new.nodes[ index ] for index in changed ],
+        translations = new.translations[ changed ],
+        orientations = new.orientations[ changed ],
+        scales = new.scales[ changed ],
+        )
+
+
+class ScenePatch( object ):
+    """The changes between two snapshots of a scene.
+    """
+
+    def __init__(
+        self,
+        added,
+        removed,
+        moved,
+        attached,
+        detached,
+        transformed,
+        translations,
+        orientations,
+        scales
+        ):
+        super( ScenePatch, self ).__init__()
+
+        #: Nodes that are new in the second snapshot.
+        self.added = added
+        #: Nodes that were removed, along with their descendants.
+        self.removed = removed
+        #: Nodes that moved to a different parent.
+        self.moved = moved
+        #: Nodes whose local transform changed.
+        self.transformed = transformed
+
+        self._attached = attached
+        self._detached = detached
+        self._translations = translations
+        self._orientations = orientations
+        self._scales = scales
+
+    @property
+    def is_empty( self ):
+        """True if the snapshots were the same.
+        """
+        return not (
+            self.added or self.removed or self.moved or self.transformed
+            )
+
+    def apply( self ):
+        """Changes the nodes to match the second snapshot.
+        """
+        for node, parent in self._attached:
+            if node.parent is parent:
+                continue
+            if node.parent is not None:
+                node.parent.remove_child( node )
+            if parent is not None:
+                parent.add_child( node )
+
+        for node, parent in self._detached:
+            if node.parent is parent:
+                parent.remove_child( node )
+
+        for index, node in enumerate( self.transformed ):
+            transform = node.transform
+            transform.translation = self._translations[ index ]
+            transform.orientation = self._orientations[ index ]
+            transform.scale = self._scales[ index ]
@@ -0,0 +1,252 @@
+"""Provides lightweight copy-on-write forks of a scene.
+
+A :py:class:`SceneFork` is a speculative copy of the transforms in a
+:py:class:`pygly.transform_array.TransformArray`.
+Creating a fork does not copy any arrays. The fork stores only
+the local transforms of the nodes modified within it and
+shares every other value with the array.
+
+World matrices are recalculated only for the branches of the
+tree beneath modified nodes. Because nodes are stored in
+pre-order, each branch is the contiguous range [index, end).
+
+Example::
+
+    array = TransformArray( root )
+
+    for move in moves:
+        fork = SceneFork( array )
+        fork.set_local( node, translation = move )
+        score( fork.world_matrix( target ) )
+
+    # keep the best move
+    best.commit()
+
+.. note::
+    Forks read the array's values when they are evaluated.
+    The array must not be changed while forks are in use.
+    Setting :py:attr:`pygly.transform_array.TransformArray.writeable`
+    to False will enforce this.
+"""
+
+import numpy
+
+from transform_array import create_matrices, levels, _multiply_levels
+
+
+class SceneFork( object ):
+    """A copy-on-write view of a TransformArray.
+    """
+
+    def __init__( self, array ):
+        """Creates a fork of an array or of another fork.
+
+        :param array: The TransformArray or SceneFork to fork.
+        """
+        super( SceneFork, self ).__init__()
+
+        if isinstance( array, SceneFork ):
+            overrides = array._overrides.copy()
+            array = array.array
+        else:
+            overrides = {}
+
+        #: The TransformArray the fork shares values with.
+        self.array = array
+
+        # the index of each modified node mapped to its
+        # (translation, orientation, scale)
+        # the tuples are never modified, so forks can share them
+        self._overrides = overrides
+
+        # the indices of the recalculated nodes and their
+        # world matrices, in pre-order
+        self._indices = None
+        self._world_matrices = None
+
+    def fork( self ):
+        """Creates a fork of this fork.
+
+        :rtype: SceneFork
+        """
+        return SceneFork( self )
+
+    def __len__( self ):
+        return len( self.array )
+
+    @property
+    def modified( self ):
+        """The indices of the nodes modified in this fork.
+        """
+        return numpy.array( sorted( self._overrides ), dtype = numpy.int )
+
+    def local( self, node ):
+        """Returns the local transform values of a node.
+
+        :rtype: tuple
+        :return: A tuple of (translation, orientation, scale).
+        """
+        index = self.array.index( node )
+        if index in self._overrides:
+            return self._overrides[ index ]
+        return (
+            self.array.translations[ index ],
+            self.array.orientations[ index ],
+            self.array.scales[ index ],
+            )
+
+    def set_local(
+        self,
+        node,
+        translation = None,
+        orientation = None,
+        scale = None
+        ):
+        """Changes the local transform of a node within the fork.
+
+        Values that are not specified are unchanged.
+        """
+        index = self.array.index( node )
+        current = self.local( node )
+
+        values = (
+            current[ 0 ] if translation is None else translation,
+            current[ 1 ] if orientation is None else orientation,
+            current[ 2 ] if scale is None else scale,
+            )
+        self._overrides[ index ] = tuple(
+            numpy.array( value, dtype = numpy.float )
+            for value in values
+            )
+        self._indices = None
+
+    def _branches( self ):
+        """Returns the indices of every node beneath a modified node.
+        """
+        ends = self.array.ends
+
+        ranges = []
+        for index in sorted( self._overrides ):
+            if ranges and index < ranges[ -1 ][ 1 ]:
+                # already part of the previous branch
+                continue
+            ranges.append( (index, ends[ index ]) )
+
+        if not ranges:
+            return numpy.zeros( 0, dtype = numpy.int )
+        return numpy.concatenate( [
+            numpy.arange( start, stop ) for start, stop in ranges
+            ] )
+
+    def update( self ):
+        """Recalculates the world matrices of the modified branches.
+
+        This is called automatically when world matrices are
+        requested.
+        """
+        array = self.array
+        indices = self._branches()
+
+        local_matrices = array.local_matrices[ indices ]
+        if self._overrides:
+            overridden = numpy.array( sorted( self._overrides ), dtype = numpy.int )
+            values = [ self._overrides[ index ] for index in overridden ]
+            local_matrices[ numpy.searchsorted( indices, overridden ) ] = create_matrices(
+                numpy.array( [ value[ 0 ] for value in values ] ),
+                numpy.array( [ value[ 1 ] for value in values ] ),
+                numpy.array( [ value[ 2 ] for value in values ] )
+                )
+
+        # find each node's parent within the branches
+        parents = array.parents[ indices ]
+        positions = numpy.searchsorted( indices, parents )
+        positions = numpy.minimum( positions, max( len( indices ) - 1, 0 ) )
+        inside = indices[ positions ] == parents
+
+        out = numpy.empty_like( local_matrices )
+
+        # the top of each branch has a parent that is unchanged
+        tops = numpy.nonzero( ~inside )[ 0 ]
+        top_parents = parents[ tops ]
+        has_parent = top_parents >= 0
+        out[ tops ] = local_matrices[ tops ]
+        out[ tops[ has_parent ] ] = numpy.matmul(
+            local_matrices[ tops[ has_parent ] ],
+            array.world_matrices[ top_parents[ has_parent ] ]
+            )
+
+        # the rest of each branch is calculated one depth at a time
+        children = numpy.nonzero( inside )[ 0 ]
+        _multiply_levels(
+            local_matrices,
+            positions,
+            [ children[ level ] for level in levels( array.depths[ indices[ children ] ] ) ],
+            out
+            )
+
+        self._indices = indices
+        self._world_matrices = out
+
+    def world_matrix( self, node ):
+        """Returns the world matrix of a node within the fork.
+
+        :rtype: numpy.array
+        """
+        if self._indices is None:
+            self.update()
+
+        index = self.array.index( node )
+        position = numpy.searchsorted( self._indices, index )
+        if position < len( self._indices ) and self._indices[ position ] == index:
+            return self._world_matrices[ position ]
+        return self.array.world_matrices[ index ]
+
+    @property
+    def world_matrices( self ):
+        """The world matrices of every node within the fork.
+
+        .. note::
+            This copies the array's world matrices.
+            Use :py:meth:`world_matrix` to access individual nodes.
+        """
+        if self._indices is None:
+            self.update()
+
+        matrices = self.array.world_matrices.copy()
+        matrices[ self._indices ] = self._world_matrices
+        return matrices
+
+    def commit( self ):
+        """Writes the fork's changes into the array.
+
+        The array's world matrices are updated for the
+        modified branches only.
+        The nodes themselves are not modified, use
+        :py:meth:`pygly.transform_array.TransformArray.scatter`
+        with the returned indices to write them.
+
+        :rtype: numpy.array
+        :return: The indices of the modified nodes.
+        """
+        if self._indices is None:
+            self.update()
+
+        array = self.array
+        modified = self.modified
+        for index in modified:
+            translation, orientation, scale = self._overrides[ index ]
+            array.translations[ index ] = translation
+            array.orientations[ index ] = orientation
+            array.scales[ index ] = scale
+
+        if len( modified ):
+            array.local_matrices[ modified ] = create_matrices(
+                array.translations[ modified ],
+                array.orientations[ modified ],
+                array.scales[ modified ]
+                )
+        array.world_matrices[ self._indices ] = self._world_matrices
+
+        self._overrides = {}
+        self._indices = None
+        return modified
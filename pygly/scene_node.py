@@ -10,7 +10,7 @@
 import weakref
 
 import numpy
-from pydispatch import dispatcher
+import dispatcher
 
 from pyrr import quaternion
 from pyrr import matrix33
@@ -18,6 +18,7 @@ from pyrr import matrix44
 from tree_node import TreeNode
 from transform import Transform
 from world_transform import WorldTransform
+import affine
 
     
 class SceneNode( TreeNode ):
@@ -59,3 +60,71 @@ class SceneNode( TreeNode ):
                 self.world_transform
                 )
 
+    def reparent( self, new_parent, keep_world = True ):
+        """Moves the node to a new parent.
+
+        .. seealso::
+            Function :py:func:`pygly.scene_node.reparent`
+            Documentation of the
+            :py:func:`pygly.scene_node.reparent` function.
+        """
+        reparent( [ self ], new_parent, keep_world )
+
+
+def reparent( nodes, new_parent, keep_world = True ):
+    """Moves a group of nodes to a new parent.
+
+    When keep_world is True, each node's local transform is
+    adjusted so its world transform does not change.
+    The new local matrices are calculated in a single batch
+    using the new parent's cached inverse world matrix.
+
+    .. note::
+        A world transform containing shear, which results from
+        a non-uniform scale on a rotated parent, cannot be
+        represented by a local transform and will be approximated.
+
+    :param list nodes: The nodes to move.
+    :param SceneNode new_parent: The new parent, or None to
+        leave the nodes without a parent.
+    :param bool keep_world: Whether to preserve the world transforms.
+    :raise ValueError: Raised if the new parent is one of the nodes
+        or a descendant of one of the nodes.
+    """
+    nodes = list( nodes )
+    if not nodes:
+        return
+
+    if new_parent is not None:
+        ancestors = set( new_parent.predecessors() )
+        ancestors.add( new_parent )
+        for node in nodes:
+            if node in ancestors:
+                raise ValueError( "Node cannot be parented to itself or its descendant" )
+
+    if keep_world:
+        # read the world matrices before anything moves
+        matrices = numpy.array(
+            [ node.world_transform.matrix for node in nodes ]
+            )
+        if new_parent is not None:
+            matrices = numpy.matmul(
+                matrices,
+                new_parent.world_transform.inverse_matrix
+                )
+        translations, orientations, scales = affine.decompose( matrices )
+
+    for node in nodes:
+        if node.parent is new_parent:
+            continue
+        if node.parent is not None:
+            node.parent.remove_child( node )
+        if new_parent is not None:
+            new_parent.add_child( node )
+
+    if keep_world:
+        for index, node in enumerate( nodes ):
+            transform = node.transform
+            transform.translation = translations[ index ]
+            transform.orientation = orientations[ index ]
+            transform.scale = scales[ index ]
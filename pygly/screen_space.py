@@ -0,0 +1,134 @@
+"""Provides batched projection between world space and viewport pixels.
+
+Points are projected with a view projection matrix, such as
+:py:attr:`pygly.camera_node.CameraNode.view_projection`, onto a
+viewport given as a :py:class:`pygly.viewport.Viewport` or its
+(2,2) Pyrr rectangle of position and size in pixels.
+
+Pixels use the OpenGL window layout, with the origin at the bottom
+left of the window. Depths are window depths in the range [0,1],
+as written to the depth buffer with the default depth range.
+
+Every function works on an (N,3) array of points at once::
+
+    pixels, depths, visible = project( camera.view_projection, viewport, positions )
+    selected = numpy.nonzero( rectangle_mask(
+        camera.view_projection,
+        viewport,
+        positions,
+        [ drag_start, drag_end - drag_start ]
+        ) )[ 0 ]
+"""
+
+import numpy
+from pyrr import matrix44
+
+
+def viewport_rect( viewport ):
+    """Returns the rectangle of a viewport.
+
+    :param viewport: A :py:class:`pygly.viewport.Viewport` or
+        a (2,2) Pyrr rectangle.
+    :rtype: numpy.array
+    :return: A (2,2) float array of position and size in pixels.
+    """
+    return numpy.asarray( getattr( viewport, 'rect', viewport ), dtype = numpy.float )
+
+def project( matrix, viewport, points ):
+    """Projects world space points onto a viewport.
+
+    :param numpy.array matrix: A (4,4) view projection matrix.
+    :param viewport: The viewport to project onto.
+    :param numpy.array points: An (N,3) array of world space points.
+    :rtype: tuple
+    :return: A tuple of (pixels, depths, visible).
+        Pixels are an (N,2) array and depths an (N,) array
+        of window depths.
+        Visible is a boolean array, False for points outside of
+        the view volume, whose pixels and depths are meaningless.
+    """
+    rect = viewport_rect( viewport )
+    points = numpy.asarray( points, dtype = numpy.float ).reshape( -1, 3 )
+    matrix = numpy.asarray( matrix, dtype = numpy.float )
+
+    # clip coordinates of points with a w of 1
+    clip = numpy.dot( points, matrix[ 0:3 ] ) + matrix[ 3 ]
+    w = clip[ :, 3 ]
+    visible = numpy.all( numpy.abs( clip[ :, 0:3 ] ) <= w[ :, numpy.newaxis ], axis = 1 )
+
+    with numpy.errstate( divide = 'ignore', invalid = 'ignore' ):
+        ndc = clip[ :, 0:3 ] / w[ :, numpy.newaxis ]
+    pixels = rect[ 0 ] + ( ndc[ :, 0:2 ] + 1.0 ) * 0.5 * rect[ 1 ]
+    depths = ( ndc[ :, 2 ] + 1.0 ) * 0.5
+    return pixels, depths, visible
+
+def unproject( matrix, viewport, pixels, depths ):
+    """Converts viewport pixels and depths to world space points.
+
+    This is the inverse of :py:func:`project`.
+
+    :param numpy.array matrix: A (4,4) view projection matrix.
+    :param viewport: The viewport the pixels are on.
+    :param numpy.array pixels: An (N,2) array of pixels.
+    :param numpy.array depths: An (N,) array of window depths, or
+        a single depth for every pixel.
+    :rtype: numpy.array
+    :return: An (N,3) array of world space points.
+    """
+    rect = viewport_rect( viewport )
+    pixels = numpy.asarray( pixels, dtype = numpy.float ).reshape( -1, 2 )
+
+    ndc = numpy.empty( ( len( pixels ), 4 ) )
+    ndc[ :, 0:2 ] = ( pixels - rect[ 0 ] ) / rect[ 1 ] * 2.0 - 1.0
+    ndc[ :, 2 ] = numpy.asarray( depths, dtype = numpy.float ) * 2.0 - 1.0
+    ndc[ :, 3 ] = 1.0
+
+    points = numpy.dot( ndc, matrix44.inverse( matrix ) )
+    return points[ :, 0:3 ] / points[ :, 3:4 ]
+
+def rays( matrix, viewport, pixels ):
+    """Creates world space rays through viewport pixels.
+
+    :param numpy.array matrix: A (4,4) view projection matrix.
+    :param viewport: The viewport the pixels are on.
+    :param numpy.array pixels: An (N,2) array of pixels.
+    :rtype: numpy.array
+    :return: An (N,2,3) array of rays as used by Pyrr, starting on
+        the near plane with unit length directions.
+    """
+    pixels = numpy.asarray( pixels, dtype = numpy.float ).reshape( -1, 2 )
+
+    # unproject each pixel on the near and far planes at once
+    depths = numpy.tile( [ 0.0, 1.0 ], len( pixels ) )
+    points = unproject( matrix, viewport, numpy.repeat( pixels, 2, axis = 0 ), depths ).reshape( -1, 2, 3 )
+
+    directions = points[ :, 1 ] - points[ :, 0 ]
+    directions /= numpy.sqrt( ( directions ** 2 ).sum( axis = 1 ) )[ :, numpy.newaxis ]
+    return numpy.concatenate(
+        ( points[ :, 0:1 ], directions[ :, numpy.newaxis ] ),
+        axis = 1
+        )
+
+def rectangle_mask( matrix, viewport, points, rect ):
+    """Tests if world space points project within a rectangle.
+
+    This is used for rectangle selection with the mouse.
+
+    :param numpy.array matrix: A (4,4) view projection matrix.
+    :param viewport: The viewport the rectangle is on.
+    :param numpy.array points: An (N,3) array of world space points.
+    :param numpy.array rect: A (2,2) Pyrr rectangle in pixels.
+        The size may be negative, such as when dragging up
+        or to the left.
+    :rtype: numpy.array
+    :return: A boolean array, True for visible points within
+        the rectangle.
+    """
+    rect = numpy.asarray( rect, dtype = numpy.float )
+    low = numpy.minimum( rect[ 0 ], rect[ 0 ] + rect[ 1 ] )
+    high = numpy.maximum( rect[ 0 ], rect[ 0 ] + rect[ 1 ] )
+
+    pixels, depths, visible = project( matrix, viewport, points )
+    with numpy.errstate( invalid = 'ignore' ):
+        inside = numpy.all( ( pixels >= low ) & ( pixels <= high ), axis = 1 )
+    return visible & inside
@@ -0,0 +1,428 @@
+"""Provides a scene's packed transforms in shared memory.
+
+This allows other processes to read the current transforms
+of a scene without serialising them.
+
+The owning process publishes a
+:py:class:`pygly.transform_array.TransformArray` into the shared
+memory once per frame using :py:class:`SharedTransforms`.
+Other processes attach to it by name using
+:py:class:`SharedTransformsView`.
+
+Published values are protected by a sequence lock.
+The sequence number is odd while the owner is writing.
+A reader that sees the same even sequence number before and
+after reading has read a consistent frame.
+
+Other processes may also write new local transform values
+for node ranges they have been assigned. Each node has its own
+sequence number, and the owner picks up completed writes
+with :py:meth:`SharedTransforms.collect`.
+
+Example::
+
+    # owner
+    shared = SharedTransforms( array )
+    while running:
+        array.update()
+        shared.publish()
+        changed = shared.collect()
+
+    # worker
+    view = SharedTransformsView( name )
+    while running:
+        translations, orientations, scales, world_matrices = view.read()
+        view.write( start, stop, translations = new_translations )
+
+.. note::
+    Uses multiprocessing.shared_memory where it is available.
+    Otherwise the memory is a memory mapped file in /dev/shm where
+    it exists, which is memory backed, or in the system's temporary
+    directory.
+"""
+
+import os
+import mmap
+import tempfile
+import time
+import uuid
+from timeit import default_timer
+
+import numpy
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    shared_memory = None
+
+
+# header values
+_sequence = 0
+_count = 1
+_capacity = 2
+_header_size = 4
+
+
+def _layout( capacity ):
+    """Returns the (name, dtype, shape) of each section of the memory.
+    """
+    return [
+        ( 'header', numpy.int64, ( _header_size, ) ),
+        ( 'parents', numpy.int64, ( capacity, ) ),
+        ( 'translations', numpy.float64, ( capacity, 3 ) ),
+        ( 'orientations', numpy.float64, ( capacity, 4 ) ),
+        ( 'scales', numpy.float64, ( capacity, 3 ) ),
+        ( 'world_matrices', numpy.float64, ( capacity, 4, 4 ) ),
+        # values written by other processes
+        ( 'input_sequences', numpy.int64, ( capacity, ) ),
+        ( 'input_translations', numpy.float64, ( capacity, 3 ) ),
+        ( 'input_orientations', numpy.float64, ( capacity, 4 ) ),
+        ( 'input_scales', numpy.float64, ( capacity, 3 ) ),
+        ]
+
+def _size( capacity ):
+    return sum(
+        numpy.dtype( dtype ).itemsize * int( numpy.prod( shape ) )
+        for name, dtype, shape in _layout( capacity )
+        )
+
+def _map_arrays( buffer, capacity ):
+    """Creates numpy views of each section of the memory.
+    """
+    arrays = {}
+    offset = 0
+    for name, dtype, shape in _layout( capacity ):
+        count = int( numpy.prod( shape ) )
+        array = numpy.frombuffer(
+            buffer,
+            dtype = dtype,
+            count = count,
+            offset = offset
+            )
+        arrays[ name ] = array.reshape( shape )
+        offset += array.nbytes
+    return arrays
+
+
+class _Segment( object ):
+    """A named block of memory shared between processes.
+    """
+
+    def __init__( self, name, size = None ):
+        super( _Segment, self ).__init__()
+
+        self.name = name
+        create = size is not None
+
+        if shared_memory:
+            self._memory = shared_memory.SharedMemory(
+                name = name,
+                create = create,
+                size = size or 0
+                )
+            self.buffer = self._memory.buf
+            return
+
+        self._memory = None
+        directory = '/dev/shm' if os.path.isdir( '/dev/shm' ) else tempfile.gettempdir()
+        self._path = os.path.join( directory, name )
+        if create:
+            with open( self._path, 'wb' ) as f:
+                f.truncate( size )
+        with open( self._path, 'r+b' ) as f:
+            self.buffer = mmap.mmap( f.fileno(), 0 )
+
+    def close( self ):
+        if self._memory:
+            self.buffer = None
+            self._memory.close()
+        else:
+            self.buffer.close()
+
+    def unlink( self ):
+        if self._memory:
+            self._memory.unlink()
+        else:
+            os.remove( self._path )
+
+
+class SharedTransforms( object ):
+    """Publishes a TransformArray into shared memory.
+    """
+
+    def __init__( self, array, name = None, capacity = None ):
+        """Creates the shared memory for the array.
+
+        :param TransformArray array: The array to publish.
+        :param string name: The name other processes attach with.
+            If not specified, a unique name is generated.
+        :param int capacity: The maximum number of nodes.
+            Defaults to the number of nodes in the array.
+        :raise ValueError: Raised if the array has more nodes than
+            the capacity.
+        """
+        super( SharedTransforms, self ).__init__()
+
+        self.array = array
+        self.name = name or 'pygly_%s' % uuid.uuid4().hex[ :16 ]
+        self.capacity = capacity or len( array )
+
+        self._segment = _Segment( self.name, _size( self.capacity ) )
+        self._arrays = _map_arrays( self._segment.buffer, self.capacity )
+        self._arrays[ 'header' ][ _capacity ] = self.capacity
+
+        # the input sequence values that have been collected
+        self._collected = numpy.zeros( self.capacity, dtype = numpy.int64 )
+        # the nodes of the last published structure
+        self._nodes = None
+
+        self.publish()
+
+    @property
+    def sequence( self ):
+        """The current sequence number of the published values.
+        """
+        return int( self._arrays[ 'header' ][ _sequence ] )
+
+    def publish( self ):
+        """Copies the current array values into the shared memory.
+
+        If the structure of the array has changed, such as after
+        :py:meth:`pygly.transform_array.TransformArray.rebuild`,
+        any values written by other processes that have not been
+        collected are discarded.
+
+        :raise ValueError: Raised if the array has more nodes
+            than the capacity.
+        """
+        array = self.array
+        count = len( array )
+        if count > self.capacity:
+            raise ValueError( "Array exceeds shared memory capacity" )
+
+        arrays = self._arrays
+        header = arrays[ 'header' ]
+
+        # an odd sequence tells readers we are writing
+        header[ _sequence ] += 1
+
+        if array.nodes is not self._nodes:
+            # old input values refer to the previous structure
+            arrays[ 'input_sequences' ][:] = 0
+            self._collected[:] = 0
+            self._nodes = array.nodes
+        header[ _count ] = count
+        arrays[ 'parents' ][ :count ] = array.parents
+        arrays[ 'translations' ][ :count ] = array.translations
+        arrays[ 'orientations' ][ :count ] = array.orientations
+        arrays[ 'scales' ][ :count ] = array.scales
+        arrays[ 'world_matrices' ][ :count ] = array.world_matrices
+
+        header[ _sequence ] += 1
+
+    def collect( self, scatter = True ):
+        """Copies values written by other processes into the array.
+
+        Only nodes with completed writes since the last call are
+        copied. Nodes still being written are picked up by a
+        later call.
+
+        :param bool scatter: If True, the new values are also written
+            to the nodes' local transforms.
+        :rtype: numpy.array
+        :return: The indices of the nodes that were changed.
+        """
+        array = self.array
+        count = len( array )
+        arrays = self._arrays
+        sequences = arrays[ 'input_sequences' ][ :count ]
+
+        before = sequences.copy()
+        changed = numpy.nonzero(
+            ( before != self._collected[ :count ] ) & ( before % 2 == 0 )
+            )[ 0 ]
+        if len( changed ) == 0:
+            return changed
+
+        translations = arrays[ 'input_translations' ][ changed ]
+        orientations = arrays[ 'input_orientations' ][ changed ]
+        scales = arrays[ 'input_scales' ][ changed ]
+
+        # discard any rows that were re-written while we read them
+        valid = sequences[ changed ] == before[ changed ]
+        changed = changed[ valid ]
+
+        array.translations[ changed ] = translations[ valid ]
+        array.orientations[ changed ] = orientations[ valid ]
+        array.scales[ changed ] = scales[ valid ]
+        self._collected[ changed ] = before[ changed ]
+
+        if scatter:
+            array.scatter( changed )
+        return changed
+
+    def close( self ):
+        """Closes and removes the shared memory.
+        """
+        self._arrays = None
+        self._segment.close()
+        self._segment.unlink()
+
+
+class SharedTransformsView( object ):
+    """Provides access to transforms published by another process.
+    """
+
+    #: The longest time, in seconds, to wait for the owner
+    #: to finish writing.
+    timeout = 1.0
+
+    def __init__( self, name ):
+        """Attaches to the shared memory with the specified name.
+        """
+        super( SharedTransformsView, self ).__init__()
+
+        self.name = name
+
+        # read the capacity before mapping the full layout
+        self._segment = _Segment( name )
+        header = numpy.frombuffer(
+            self._segment.buffer,
+            dtype = numpy.int64,
+            count = _header_size
+            )
+        self.capacity = int( header[ _capacity ] )
+        self._arrays = _map_arrays( self._segment.buffer, self.capacity )
+
+    @property
+    def count( self ):
+        """The number of published nodes.
+        """
+        return int( self._arrays[ 'header' ][ _count ] )
+
+    @property
+    def parents( self ):
+        """The parent index of each node.
+        """
+        return self._arrays[ 'parents' ][ :self.count ]
+
+    @property
+    def translations( self ):
+        """A zero-copy view of the published translations.
+
+        Use :py:meth:`begin_read` and :py:meth:`end_read`
+        to check the values were consistent.
+        """
+        return self._arrays[ 'translations' ][ :self.count ]
+
+    @property
+    def orientations( self ):
+        """A zero-copy view of the published orientations.
+        """
+        return self._arrays[ 'orientations' ][ :self.count ]
+
+    @property
+    def scales( self ):
+        """A zero-copy view of the published scales.
+        """
+        return self._arrays[ 'scales' ][ :self.count ]
+
+    @property
+    def world_matrices( self ):
+        """A zero-copy view of the published world matrices.
+        """
+        return self._arrays[ 'world_matrices' ][ :self.count ]
+
+    def begin_read( self ):
+        """Waits for the owner to finish writing.
+
+        :raise RuntimeError: Raised if the owner is still writing
+            after :py:attr:`timeout` seconds.
+        :rtype: int
+        :return: The sequence number to pass to
+            :py:meth:`end_read`.
+        """
+        header = self._arrays[ 'header' ]
+        sequence = header[ _sequence ]
+        if sequence % 2:
+            start = default_timer()
+            while sequence % 2:
+                if default_timer() - start > self.timeout:
+                    raise RuntimeError( "Timed out waiting for shared transforms to be published" )
+                # let the owner run
+                time.sleep( 0 )
+                sequence = header[ _sequence ]
+        return int( sequence )
+
+    def end_read( self, sequence ):
+        """Checks that values read since :py:meth:`begin_read`
+        were not modified.
+
+        :rtype: bool
+        :return: True if the values were consistent.
+        """
+        return self._arrays[ 'header' ][ _sequence ] == sequence
+
+    def read( self ):
+        """Copies a consistent frame of published values.
+
+        :rtype: tuple
+        :return: A tuple of (translations, orientations, scales,
+            world_matrices).
+        """
+        while True:
+            sequence = self.begin_read()
+            values = (
+                self.translations.copy(),
+                self.orientations.copy(),
+                self.scales.copy(),
+                self.world_matrices.copy(),
+                )
+            if self.end_read( sequence ):
+                return values
+
+    def write(
+        self,
+        start,
+        stop,
+        translations = None,
+        orientations = None,
+        scales = None
+        ):
+        """Writes new local transform values for a range of nodes.
+
+        Values that are not specified are copied from the
+        published values.
+
+        .. note::
+            Each range of nodes should only be written by
+            a single process.
+        """
+        arrays = self._arrays
+        sequences = arrays[ 'input_sequences' ][ start:stop ]
+
+        # published values are copied from a consistent frame
+        values = [ translations, orientations, scales ]
+        names = [ 'translations', 'orientations', 'scales' ]
+        while any( value is None for value in values ):
+            sequence = self.begin_read()
+            defaults = [
+                arrays[ name ][ start:stop ].copy() if value is None else value
+                for name, value in zip( names, values )
+                ]
+            if self.end_read( sequence ):
+                values = defaults
+        translations, orientations, scales = values
+
+        # an odd sequence tells the owner we are writing
+        sequences += 1
+        arrays[ 'input_translations' ][ start:stop ] = translations
+        arrays[ 'input_orientations' ][ start:stop ] = orientations
+        arrays[ 'input_scales' ][ start:stop ] = scales
+        sequences += 1
+
+    def close( self ):
+        """Detaches from the shared memory.
+        """
+        self._arrays = None
+        self._segment.close()
@@ -151,3 +151,369 @@ def sort_radius_back_to_front(
     # reverse the array
     return sorted_objects[::-1]
 
+
+# a cached range used to fill index buffers without allocating
+_indices = numpy.arange( 0, dtype = numpy.uint64 )
+
+def _range( count ):
+    global _indices
+    if len( _indices ) < count:
+        _indices = numpy.arange( max( count, len( _indices ) * 2 ), dtype = numpy.uint64 )
+    return _indices[ :count ]
+
+def _buffer( buffer, shape, dtype ):
+    """Returns a view of the start of buffer, or a new array
+    if no buffer is provided.
+    """
+    if buffer is None:
+        return numpy.empty( shape, dtype = dtype )
+    if buffer.dtype != dtype or len( buffer ) < shape[ 0 ]:
+        raise ValueError( "Buffer is too small or of the wrong type" )
+    return buffer[ :shape[ 0 ] ]
+
+def argsort_keys( keys, indices = None, back_to_front = False ):
+    """Sorts float64 keys and returns the sorted indices, without
+    allocating memory.
+
+    Each key is converted to an unsigned integer with the same
+    ordering and its index is packed into the lowest bits.
+    The packed values are then sorted in place.
+    Packing removes the lowest bits of precision from the keys,
+    keys that differ only in those bits may be sorted in either order.
+
+    Sorting back to front inverts the packed values before sorting,
+    so no reversed copy is needed.
+
+    .. note::
+        The keys array is used as storage while sorting.
+        Its contents are undefined afterward.
+
+    :param numpy.array keys: A contiguous float64 array of keys.
+    :param numpy.array indices: An optional int64 array of at least
+        the same length to write the sorted indices into.
+    :param bool back_to_front: If True, the indices are sorted by
+        descending key.
+    :rtype: numpy.array
+    :return: The indices of the keys in sorted order.
+    :raise ValueError: Raised if a buffer is too small or of the
+        wrong type.
+    """
+    count = len( keys )
+    indices = _buffer( indices, (count,), numpy.int64 )
+    if count == 0:
+        return indices
+
+    # re-interpret the keys as integers
+    bits = keys.view( numpy.int64 )
+    unsigned = keys.view( numpy.uint64 )
+
+    # negative floats must have all of their bits inverted,
+    # positive floats only have their sign bit set
+    numpy.right_shift( bits, 63, out = indices )
+    numpy.bitwise_or( indices, numpy.int64( -2 ** 63 ), out = indices )
+    numpy.bitwise_xor( bits, indices, out = bits )
+
+    # replace the lowest bits with the index of the key
+    index_bits = max( int( count - 1 ).bit_length(), 1 )
+    index_mask = numpy.uint64( ( 1 << index_bits ) - 1 )
+    numpy.bitwise_and( unsigned, ~index_mask, out = unsigned )
+    numpy.bitwise_or( unsigned, _range( count ), out = unsigned )
+
+    if back_to_front:
+        numpy.invert( unsigned, out = unsigned )
+        unsigned.sort()
+        numpy.invert( unsigned, out = unsigned )
+    else:
+        unsigned.sort()
+
+    numpy.bitwise_and( unsigned, index_mask, out = indices.view( numpy.uint64 ) )
+    return indices
+
+def sort_plane_indices(
+    render_position,
+    render_direction,
+    positions,
+    back_to_front = False,
+    keys = None,
+    indices = None
+    ):
+    """Sorts positions along a flat plane and returns
+    the sorted indices.
+
+    When key and index buffers are provided, no memory
+    is allocated.
+
+    :param numpy.array render_position: The position of the camera the scene
+        is being rendered from.
+    :param numpy.array render_direction: The direction the camera is facing.
+    :param numpy.array positions: A contiguous (N,3) float64 array of
+        object positions.
+    :param bool back_to_front: If True, the furthest positions are first.
+    :param numpy.array keys: An optional float64 buffer of at least N values.
+    :param numpy.array indices: An optional int64 buffer of at least N values.
+    :rtype: numpy.array
+    :return: A view of the indices buffer containing the sorted indices.
+    """
+    count = len( positions )
+    keys = _buffer( keys, (count,), numpy.float64 )
+
+    # dot( position - render_position, direction )
+    numpy.dot( positions, render_direction, out = keys )
+    keys -= numpy.dot( render_position, render_direction )
+
+    return argsort_keys( keys, indices, back_to_front )
+
+def sort_radius_indices(
+    render_position,
+    positions,
+    back_to_front = False,
+    keys = None,
+    indices = None,
+    scratch = None
+    ):
+    """Sorts positions by their distance from the camera and
+    returns the sorted indices.
+
+    When key, index and scratch buffers are provided, no memory
+    is allocated.
+
+    :param numpy.array render_position: The position of the camera the scene
+        is being rendered from.
+    :param numpy.array positions: An (N,3) array of object positions.
+    :param bool back_to_front: If True, the furthest positions are first.
+    :param numpy.array keys: An optional float64 buffer of at least N values.
+    :param numpy.array indices: An optional int64 buffer of at least N values.
+    :param numpy.array scratch: An optional (N,3) float64 buffer used
+        to store relative positions.
+    :rtype: numpy.array
+    :return: A view of the indices buffer containing the sorted indices.
+    """
+    count = len( positions )
+    keys = _buffer( keys, (count,), numpy.float64 )
+    scratch = _buffer( scratch, (count, 3), numpy.float64 )
+
+    numpy.subtract( positions, render_position, out = scratch )
+    numpy.einsum( 'ij,ij->i', scratch, scratch, out = keys )
+
+    return argsort_keys( keys, indices, back_to_front )
+
+
+def argsort_top_k( keys, k, back_to_front = False ):
+    """Returns the indices of the k smallest keys in sorted order.
+
+    The k keys are selected in linear time with numpy.argpartition,
+    only the selected keys are sorted.
+
+    :param numpy.array keys: The keys to select from.
+    :param int k: The number of keys to return.
+    :param bool back_to_front: If True, the k largest keys are
+        returned, largest first.
+    :rtype: numpy.array
+    :return: The indices of up to k keys.
+    """
+    keys = numpy.asarray( keys )
+    count = len( keys )
+    k = min( k, count )
+    if k <= 0:
+        return numpy.zeros( 0, dtype = numpy.int )
+
+    if back_to_front:
+        if k < count:
+            indices = numpy.argpartition( keys, count - k )[ count - k: ]
+        else:
+            indices = numpy.arange( count )
+        return indices[ numpy.argsort( keys[ indices ] )[ ::-1 ] ]
+
+    if k < count:
+        indices = numpy.argpartition( keys, k - 1 )[ :k ]
+    else:
+        indices = numpy.arange( count )
+    return indices[ numpy.argsort( keys[ indices ] ) ]
+
+def sort_plane_top_k(
+    render_position,
+    render_direction,
+    positions,
+    k,
+    back_to_front = False
+    ):
+    """Finds the k nearest positions along a flat plane.
+
+    :param numpy.array render_position: The position of the camera the scene
+        is being rendered from.
+    :param numpy.array render_direction: The direction the camera is facing.
+    :param numpy.array positions: An (N,3) array of object positions.
+    :param int k: The number of positions to return.
+    :param bool back_to_front: If True, the k furthest positions are
+        returned, furthest first.
+    :rtype: numpy.array
+    :return: The indices of the positions, in sorted order.
+    """
+    keys = numpy.dot( positions, render_direction )
+    keys -= numpy.dot( render_position, render_direction )
+    return argsort_top_k( keys, k, back_to_front )
+
+def sort_radius_top_k(
+    render_position,
+    positions,
+    k,
+    back_to_front = False
+    ):
+    """Finds the k positions nearest to the camera.
+
+    :param numpy.array render_position: The position of the camera the scene
+        is being rendered from.
+    :param numpy.array positions: An (N,3) array of object positions.
+    :param int k: The number of positions to return.
+    :param bool back_to_front: If True, the k furthest positions are
+        returned, furthest first.
+    :rtype: numpy.array
+    :return: The indices of the positions, in sorted order.
+    """
+    relative_positions = positions - render_position
+    keys = numpy.einsum( 'ij,ij->i', relative_positions, relative_positions )
+    return argsort_top_k( keys, k, back_to_front )
+
+
+class CoherentSorter( object ):
+    """Sorts keys that change little between frames.
+
+    The order from the previous frame is kept. Each frame,
+    the keys are read in that order and only the keys that
+    are now out of order are sorted and merged back in,
+    which is close to linear when few keys have moved.
+
+    If too many keys are out of order, or the number of keys
+    changes, a full sort is performed instead.
+
+    Example::
+
+        sorter = CoherentSorter()
+        while running:
+            indices = sorter.sort_plane( position, direction, positions, back_to_front = True )
+    """
+
+    def __init__( self, threshold = 0.1 ):
+        """Creates a sorter.
+
+        :param float threshold: The fraction of keys that may be
+            out of order before a full sort is used.
+        """
+        super( CoherentSorter, self ).__init__()
+
+        self.threshold = threshold
+        #: The number of keys that were out of order in the last sort.
+        self.displaced = 0
+        #: True if the last sort was a full sort.
+        self.full_sort = False
+
+        self._order = None
+
+    def reset( self ):
+        """Discards the previous order, the next sort will
+        be a full sort.
+        """
+        self._order = None
+
+    def _repair( self, keys ):
+        """Repairs the previous order for the new keys.
+
+        :rtype: bool
+        :return: False if too many keys were out of order.
+        """
+        order = self._order
+        ordered_keys = keys[ order ]
+
+        # remove both keys of each pair that is out of order
+        # until the remaining keys are in order
+        kept = numpy.arange( len( order ) )
+        for iteration in xrange( 4 ):
+            kept_keys = ordered_keys[ kept ]
+            descending = kept_keys[ 1: ] < kept_keys[ :-1 ]
+            if not descending.any():
+                break
+            removed = numpy.zeros( len( kept ), dtype = numpy.bool )
+            removed[ 1: ] |= descending
+            removed[ :-1 ] |= descending
+            kept = kept[ ~removed ]
+            if len( order ) - len( kept ) > self.threshold * len( order ):
+                return False
+        else:
+            # keep only the keys that are not less than
+            # any key before them, which are always in order
+            kept_keys = ordered_keys[ kept ]
+            kept = kept[ kept_keys >= numpy.maximum.accumulate( kept_keys ) ]
+
+        in_order = numpy.zeros( len( order ), dtype = numpy.bool )
+        in_order[ kept ] = True
+
+        displaced = order[ ~in_order ]
+        self.displaced = len( displaced )
+        if self.displaced == 0:
+            return True
+        if self.displaced > self.threshold * len( order ):
+            return False
+
+        # sort the displaced keys and merge them into the ordered keys
+        kept = order[ in_order ]
+        displaced = displaced[ numpy.argsort( keys[ displaced ], kind = 'mergesort' ) ]
+        positions = numpy.searchsorted( keys[ kept ], keys[ displaced ], side = 'right' )
+        self._order = numpy.insert( kept, positions, displaced )
+        return True
+
+    def sort( self, keys, back_to_front = False ):
+        """Returns the indices of the keys in sorted order.
+
+        :param numpy.array keys: The keys to sort.
+        :param bool back_to_front: If True, the indices are sorted
+            by descending key.
+        :rtype: numpy.array
+        :return: The sorted indices. These are used by the next
+            sort and must not be modified.
+        """
+        keys = numpy.asarray( keys )
+
+        self.full_sort = (
+            self._order is None
+            or len( self._order ) != len( keys )
+            or not self._repair( keys )
+            )
+        if self.full_sort:
+            self._order = numpy.argsort( keys, kind = 'mergesort' )
+            self.displaced = len( keys )
+
+        if back_to_front:
+            return self._order[ ::-1 ]
+        return self._order
+
+    def sort_plane(
+        self,
+        render_position,
+        render_direction,
+        positions,
+        back_to_front = False
+        ):
+        """Sorts positions along a flat plane.
+
+        :rtype: numpy.array
+        :return: The sorted indices of the positions.
+        """
+        # the render position adds the same value to every key
+        # so it doesn't change the order
+        keys = numpy.dot( positions, render_direction )
+        return self.sort( keys, back_to_front )
+
+    def sort_radius(
+        self,
+        render_position,
+        positions,
+        back_to_front = False
+        ):
+        """Sorts positions by their distance from the camera.
+
+        :rtype: numpy.array
+        :return: The sorted indices of the positions.
+        """
+        relative_positions = positions - render_position
+        keys = numpy.einsum( 'ij,ij->i', relative_positions, relative_positions )
+        return self.sort( keys, back_to_front )
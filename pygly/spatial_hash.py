@@ -0,0 +1,348 @@
+"""Provides a uniform grid for proximity queries over points.
+
+A :py:class:`SpatialHash` divides space into cubic cells and stores
+points sorted by the cell they are in. Queries look up the cells
+around each query point rather than testing every point.
+
+The grid is cheap to build from an (N,3) array of positions, so it
+can be rebuilt each frame from the world translations of a
+:py:class:`pygly.transform_array.TransformArray`::
+
+    array.update()
+    grid = SpatialHash( cell_size = 10.0, positions = array.world_matrices[ :, 3, 0:3 ] )
+
+    # every node within 5 units of each enemy
+    queries, indices, distances = grid.radius( enemy_positions, 5.0 )
+    for query, index in zip( queries, indices ):
+        enemies[ query ].notice( array.nodes[ index ] )
+
+    # the 4 nodes nearest each enemy
+    indices, distances = grid.nearest( enemy_positions, 4 )
+
+Queries are batched, each is passed an (M,3) array of points.
+Queries are fastest when the cell size is similar to the radius
+being searched.
+
+Cells are identified by their integer coordinates packed into
+a single int64. Coordinates must be within 2^20 cells of the origin.
+"""
+
+import numpy
+
+from bvh import _expand
+
+
+# the bits used by each cell coordinate
+_bits = 21
+_bias = 1 << ( _bits - 1 )
+
+
+def _pack( cells ):
+    """Packs (N,3) integer cell coordinates into int64 keys.
+    """
+    cells = cells + _bias
+    return ( cells[ :, 0 ] << ( 2 * _bits ) ) | ( cells[ :, 1 ] << _bits ) | cells[ :, 2 ]
+
+def _unpack( keys ):
+    """Reverses :py:func:`_pack`.
+    """
+    mask = ( 1 << _bits ) - 1
+    return numpy.column_stack( (
+        keys >> ( 2 * _bits ),
+        ( keys >> _bits ) & mask,
+        keys & mask,
+        ) ) - _bias
+
+def _offsets( rings ):
+    """Returns the coordinate offsets of the cells within rings of a cell.
+    """
+    steps = numpy.arange( -rings, rings + 1, dtype = numpy.int64 )
+    x, y, z = numpy.meshgrid( steps, steps, steps, indexing = 'ij' )
+    return numpy.column_stack( ( x.ravel(), y.ravel(), z.ravel() ) )
+
+
+class SpatialHash( object ):
+    """A uniform grid of points.
+    """
+
+    #: The largest number of cells per occupied cell for which
+    #: a dense table of cells is used.
+    table_ratio = 16
+
+    #: The most candidate points tested at once, which limits
+    #: the memory used by large searches.
+    chunk_size = 1 << 20
+
+    def __init__( self, cell_size, positions = None ):
+        """Creates a grid.
+
+        :param float cell_size: The width of each cell.
+        :param numpy.array positions: An optional (N,3) array of points.
+        """
+        super( SpatialHash, self ).__init__()
+
+        self.cell_size = float( cell_size )
+        if positions is None:
+            positions = numpy.zeros( ( 0, 3 ), dtype = numpy.float )
+        self.build( positions )
+
+    def __len__( self ):
+        return len( self.positions )
+
+    def _cells( self, positions ):
+        return numpy.floor( positions / self.cell_size ).astype( numpy.int64 )
+
+    def build( self, positions ):
+        """Replaces the points in the grid.
+
+        :param numpy.array positions: An (N,3) array of points.
+        """
+        #: The points in the grid, in the order they were added.
+        self.positions = numpy.array( positions, dtype = numpy.float ).reshape( -1, 3 )
+
+        keys = _pack( self._cells( self.positions ) )
+        order = numpy.argsort( keys, kind = 'mergesort' )
+        self._store( keys[ order ], order )
+
+    def insert( self, positions ):
+        """Adds points to the grid.
+
+        The new points are merged into the existing sorted points,
+        which is cheaper than rebuilding the grid when few
+        points are added.
+
+        :param numpy.array positions: An (N,3) array of points.
+        :rtype: numpy.array
+        :return: The indices of the new points.
+        """
+        positions = numpy.asarray( positions, dtype = numpy.float ).reshape( -1, 3 )
+        first = len( self.positions )
+
+        keys = _pack( self._cells( positions ) )
+        order = numpy.argsort( keys, kind = 'mergesort' )
+        keys = keys[ order ]
+
+        # insert after any equal keys to keep points in the
+        # order they were added
+        insertions = numpy.searchsorted( self._keys, keys, side = 'right' )
+        self.positions = numpy.concatenate( ( self.positions, positions ) )
+        self._store(
+            numpy.insert( self._keys, insertions, keys ),
+            numpy.insert( self.order, insertions, order + first )
+            )
+        return numpy.arange( first, len( self.positions ) )
+
+    def _store( self, keys, order ):
+        self._keys = keys
+        #: The indices of the points, sorted by cell.
+        self.order = order
+        self._positions = self.positions[ order ]
+
+        # the range of each occupied cell within the sorted points
+        starts = numpy.ones( len( keys ), dtype = numpy.bool )
+        starts[ 1: ] = keys[ 1: ] != keys[ :-1 ]
+        starts = numpy.nonzero( starts )[ 0 ]
+        self.cell_keys = keys[ starts ]
+        self.cell_starts = starts
+        self.cell_counts = numpy.diff( numpy.append( starts, len( keys ) ) )
+
+        # when the occupied cells are compact, cells are found with
+        # a dense table of the cells within their bounds rather
+        # than by searching the sorted keys
+        self._table = None
+        if len( starts ):
+            cells = _unpack( self.cell_keys )
+            minimum = cells.min( axis = 0 )
+            shape = cells.max( axis = 0 ) - minimum + 1
+            if numpy.prod( shape ) <= max( SpatialHash.table_ratio * len( starts ), 4096 ):
+                self._table = numpy.full( shape, -1, dtype = numpy.int )
+                self._table[ tuple( ( cells - minimum ).T ) ] = numpy.arange( len( starts ) )
+                self._table_minimum = minimum
+
+    def _candidates( self, points, rings ):
+        """Finds the points in the cells within rings of each query.
+
+        :rtype: tuple
+        :return: A tuple of (queries, sorted indices).
+        """
+        offsets = _offsets( rings )
+        queries = numpy.repeat( numpy.arange( len( points ) ), len( offsets ) )
+        cells = self._cells( points )
+
+        if self._table is not None:
+            # the index of each neighbour within the flattened table
+            shape = self._table.shape
+            indices = 0
+            inside = True
+            for axis in xrange( 3 ):
+                coordinates = ( cells[ :, axis, numpy.newaxis ] - self._table_minimum[ axis ] + offsets[ :, axis ] ).ravel()
+                inside = inside & ( coordinates >= 0 ) & ( coordinates < shape[ axis ] )
+                indices = indices * shape[ axis ] + coordinates
+
+            cells = numpy.full( len( indices ), -1, dtype = numpy.int )
+            cells[ inside ] = self._table.ravel()[ indices[ inside ] ]
+            found = cells >= 0
+        else:
+            deltas = ( offsets[ :, 0 ] << ( 2 * _bits ) ) + ( offsets[ :, 1 ] << _bits ) + offsets[ :, 2 ]
+            keys = ( _pack( cells )[ :, numpy.newaxis ] + deltas ).ravel()
+            cells = numpy.searchsorted( self.cell_keys, keys )
+            cells = numpy.minimum( cells, len( self.cell_keys ) - 1 )
+            found = self.cell_keys[ cells ] == keys
+
+        cells = cells[ found ]
+        counts = self.cell_counts[ cells ]
+
+        return (
+            numpy.repeat( queries[ found ], counts ),
+            _expand( self.cell_starts[ cells ], counts )
+            )
+
+    def _chunks( self, points, rings, exhaustive ):
+        """Finds the candidates of each query, a few queries at a time.
+
+        :param bool exhaustive: If True, every point is a candidate
+            rather than the points within rings of each query.
+        :rtype: generator
+        :return: Yields tuples of (start, stop, queries, sorted indices)
+            for each range of queries. Queries are relative to start.
+        """
+        if exhaustive:
+            per_query = len( self.positions )
+        else:
+            per_query = ( 2 * rings + 1 ) ** 3
+        step = max( self.chunk_size // per_query, 1 )
+
+        for start in xrange( 0, len( points ), step ):
+            stop = min( start + step, len( points ) )
+            if exhaustive:
+                queries = numpy.repeat( numpy.arange( stop - start ), len( self.positions ) )
+                sorted_indices = numpy.tile( numpy.arange( len( self.positions ) ), stop - start )
+            else:
+                queries, sorted_indices = self._candidates( points[ start:stop ], rings )
+            yield start, stop, queries, sorted_indices
+
+    def radius( self, points, radius ):
+        """Finds the points within a distance of each query point.
+
+        :param numpy.array points: An (M,3) array of query points.
+        :param radius: The distance to search, either a single
+            value or one per query.
+        :rtype: tuple
+        :return: A tuple of (queries, indices, distances) arrays,
+            with an entry per point found. Entries are grouped by query
+            in ascending order.
+        """
+        points = numpy.asarray( points, dtype = numpy.float ).reshape( -1, 3 )
+        radius = numpy.broadcast_to( numpy.asarray( radius, dtype = numpy.float ), ( len( points ), ) )
+        if not len( self.positions ) or not len( points ):
+            empty = numpy.zeros( 0, dtype = numpy.int )
+            return empty, empty, numpy.zeros( 0, dtype = numpy.float )
+
+        # queries are grouped by the rings they search, so a
+        # large radius doesn't enlarge every other query
+        rings = numpy.ceil( numpy.minimum( radius / self.cell_size, _bias ) ).astype( numpy.int64 )
+        results = []
+        for group_rings in numpy.unique( rings ):
+            group = numpy.nonzero( rings == group_rings )[ 0 ]
+            group_rings = int( group_rings )
+
+            # once the searched cells outnumber the occupied
+            # cells it is cheaper to test every point
+            exhaustive = ( 2 * group_rings + 1 ) ** 3 >= len( self.cell_keys )
+            for start, stop, queries, sorted_indices in self._chunks( points[ group ], group_rings, exhaustive ):
+                queries = group[ start + queries ]
+                distances = ( ( self._positions[ sorted_indices ] - points[ queries ] ) ** 2 ).sum( axis = 1 )
+                found = distances <= radius[ queries ] ** 2
+                results.append( ( queries[ found ], sorted_indices[ found ], distances[ found ] ) )
+
+        queries, sorted_indices, distances = [ numpy.concatenate( values ) for values in zip( *results ) ]
+        order = numpy.argsort( queries, kind = 'mergesort' )
+        return (
+            queries[ order ],
+            self.order[ sorted_indices[ order ] ],
+            numpy.sqrt( distances[ order ] )
+            )
+
+    def nearest( self, points, k, max_distance = numpy.inf ):
+        """Finds the k nearest points to each query point.
+
+        Rings of cells around each query are searched until k points
+        are found that are closer than any unsearched cell.
+
+        :param numpy.array points: An (M,3) array of query points.
+        :param int k: The number of points to find.
+        :param float max_distance: Points further than this
+            are ignored.
+        :rtype: tuple
+        :return: A tuple of (indices, distances), each an (M,k) array
+            sorted by distance. Where fewer than k points were found
+            the indices are -1 and the distances are infinite.
+        """
+        points = numpy.asarray( points, dtype = numpy.float ).reshape( -1, 3 )
+        indices = numpy.full( ( len( points ), k ), -1, dtype = numpy.int )
+        distances = numpy.full( ( len( points ), k ), numpy.inf )
+        if not len( self.positions ) or not k:
+            return indices, distances
+
+        # beyond this many rings every cell has been searched
+        cells = self._cells( numpy.concatenate( ( self.positions, points ) ) )
+        max_rings = int( ( cells.max( axis = 0 ) - cells.min( axis = 0 ) ).max() )
+
+        # start with the rings expected to hold k points
+        # if the points are evenly distributed
+        extents = numpy.maximum( self.positions.max( axis = 0 ) - self.positions.min( axis = 0 ), self.cell_size )
+        density = len( self.positions ) / numpy.prod( extents )
+        expected = ( 3.0 * k / ( 4.0 * numpy.pi * density ) ) ** ( 1.0 / 3.0 )
+        rings = max( int( numpy.ceil( expected / self.cell_size ) ), 1 )
+
+        # the distance from each query to the walls of its cell
+        walls = points / self.cell_size - numpy.floor( points / self.cell_size )
+        walls = numpy.minimum( walls, 1.0 - walls ).min( axis = 1 ) * self.cell_size
+
+        remaining = numpy.arange( len( points ) )
+        while len( remaining ):
+            # once the searched cells outnumber the occupied
+            # cells it is cheaper to test every point
+            exhaustive = rings >= max_rings or ( 2 * rings + 1 ) ** 3 >= len( self.cell_keys )
+            done = numpy.zeros( len( remaining ), dtype = numpy.bool )
+            for start, stop, queries, sorted_indices in self._chunks( points[ remaining ], rings, exhaustive ):
+                chunk = remaining[ start:stop ]
+                squared = ( ( self._positions[ sorted_indices ] - points[ chunk ][ queries ] ) ** 2 ).sum( axis = 1 )
+
+                # candidates are grouped by query, place them in a table
+                # with a row per query
+                counts = numpy.bincount( queries, minlength = len( chunk ) )
+                columns = numpy.arange( len( queries ) ) - numpy.repeat( numpy.cumsum( counts ) - counts, counts )
+                width = max( counts.max(), k )
+                nearest = numpy.full( ( len( chunk ), width ), numpy.inf )
+                nearest[ queries, columns ] = squared
+                candidates = numpy.full( ( len( chunk ), width ), -1, dtype = numpy.int )
+                candidates[ queries, columns ] = sorted_indices
+
+                # the k nearest candidates of each query, in order
+                rows = numpy.arange( len( chunk ) )[ :, numpy.newaxis ]
+                if width > k:
+                    columns = numpy.argpartition( nearest, k - 1, axis = 1 )[ :, :k ]
+                    nearest = nearest[ rows, columns ]
+                    candidates = candidates[ rows, columns ]
+                columns = numpy.argsort( nearest, axis = 1 )
+                nearest = numpy.sqrt( nearest[ rows, columns ] )
+                candidates = candidates[ rows, columns ]
+                nearest[ nearest > max_distance ] = numpy.inf
+
+                # points closer than the edge of the searched cells
+                # can't have been missed
+                searched = rings * self.cell_size + walls[ chunk ]
+                chunk_done = ( nearest[ :, -1 ] <= searched ) | ( searched >= max_distance ) | exhaustive
+
+                found = numpy.isfinite( nearest ) & chunk_done[ :, numpy.newaxis ]
+                nearest[ ~found ] = numpy.inf
+                candidates = numpy.where( found, self.order[ candidates ], -1 )
+                indices[ chunk[ chunk_done ] ] = candidates[ chunk_done ]
+                distances[ chunk[ chunk_done ] ] = nearest[ chunk_done ]
+                done[ start:stop ] = chunk_done
+
+            remaining = remaining[ ~done ]
+            rings += 1
+
+        return indices, distances
@@ -0,0 +1,250 @@
+"""Provides a sweep and prune broadphase for overlapping bounds.
+
+A :py:class:`SweepAndPrune` finds the pairs of axis aligned boxes
+that overlap, such as the world space bounds of scene nodes
+calculated with :py:func:`pygly.affine.transform_aabbs`.
+
+The boxes are sorted by their minimum along the sweep axis,
+the axis along which the boxes are most spread out.
+Each box is swept along this axis to find the boxes that start
+before it ends, and only these are tested for overlap.
+
+A single sweep tests every box against all boxes that share
+its range on the sweep axis, however far apart they are on the
+other axes. To avoid this, the other two axes are divided into
+columns of cells and boxes are only swept against the boxes in
+the neighbouring columns. Boxes larger than a cell are tested
+against every box instead.
+
+Boxes usually move little between frames, so the sorted orders
+are repaired with a :py:class:`pygly.sort.CoherentSorter` rather
+than sorted again, and the overlapping pairs are compared with
+those of the previous frame::
+
+    broadphase = SweepAndPrune()
+    while running:
+        aabbs = affine.transform_aabbs( local_bounds, array.world_matrices )
+        added, removed = broadphase.update( aabbs )
+        for first, second in added:
+            on_enter( array.nodes[ first ], array.nodes[ second ] )
+        for first, second in removed:
+            on_exit( array.nodes[ first ], array.nodes[ second ] )
+
+Boxes are identified by their index in the array of boxes,
+so the same box must keep the same index between frames.
+Boxes that touch are considered to overlap.
+"""
+
+import numpy
+
+from sort import CoherentSorter
+from bvh import _expand
+
+
+# columns are packed into an int64 in the same way as
+# the cells of a spatial hash
+_bits = 21
+_bias = 1 << ( _bits - 1 )
+
+# the columns a box may overlap, relative to the column of
+# its minimum corner
+_column_offsets = [ ( 0, 0 ), ( 1, 0 ), ( 0, 1 ), ( 1, 1 ) ]
+
+
+def _pack_columns( cells ):
+    """Packs (N,2) integer column coordinates into int64 keys.
+    """
+    cells = cells + _bias
+    return ( cells[ :, 0 ] << _bits ) | cells[ :, 1 ]
+
+def _pair_keys( pairs, count ):
+    return pairs[ :, 0 ] * count + pairs[ :, 1 ]
+
+
+class SweepAndPrune( object ):
+    """Finds overlapping pairs of boxes each frame.
+    """
+
+    #: The largest cell size as a multiple of the mean box size,
+    #: when the cell size is chosen automatically.
+    cell_ratio = 4.0
+
+    def __init__( self, cell_size = None, threshold = 0.1 ):
+        """Creates an empty broadphase.
+
+        :param float cell_size: The size of the columns across the
+            sweep axis. If None, the size is chosen from the boxes
+            of the first update.
+        :param float threshold: The fraction of boxes that may be
+            out of order before they are sorted again.
+        """
+        super( SweepAndPrune, self ).__init__()
+
+        self._cell_size = cell_size
+        self._sweep_sorter = CoherentSorter( threshold )
+        self._column_sorter = CoherentSorter( threshold )
+
+        #: The overlapping pairs of the last update, an (N,2) array
+        #: with the lowest index first, sorted by the first index
+        #: then the second.
+        self.pairs = numpy.zeros( ( 0, 2 ), dtype = numpy.int )
+        #: The axis that boxes are swept along.
+        self.axis = None
+        #: The size of the columns across the sweep axis.
+        self.cell_size = cell_size
+
+        self._count = 0
+
+    def reset( self ):
+        """Discards the sorted orders and pairs of the previous update.
+
+        The sweep axis and cell size are chosen again by
+        the next update.
+        """
+        self._sweep_sorter.reset()
+        self._column_sorter.reset()
+        self.pairs = numpy.zeros( ( 0, 2 ), dtype = numpy.int )
+        self.axis = None
+        self.cell_size = self._cell_size
+        self._count = 0
+
+    def _choose( self, mins, maxs ):
+        """Chooses the sweep axis and cell size from the boxes.
+        """
+        centres = ( mins + maxs ) * 0.5
+        self.axis = int( numpy.argmax( centres.max( axis = 0 ) - centres.min( axis = 0 ) ) )
+
+        if self.cell_size is None:
+            across = [ axis for axis in xrange( 3 ) if axis != self.axis ]
+            sizes = ( maxs - mins )[ :, across ]
+            self.cell_size = min( sizes.max(), sizes.mean() * self.cell_ratio )
+            if self.cell_size <= 0.0:
+                self.cell_size = 1.0
+
+    def _large_pairs( self, large, mins, maxs ):
+        """Finds the candidate pairs of boxes larger than a cell.
+        """
+        indices = numpy.arange( len( mins ) )
+        is_large = numpy.zeros( len( mins ), dtype = numpy.bool )
+        is_large[ large ] = True
+
+        # limit the size of each block of tests
+        block = max( 1, ( 1 << 20 ) // max( len( mins ), 1 ) )
+        firsts = []
+        seconds = []
+        for start in xrange( 0, len( large ), block ):
+            boxes = large[ start:start + block ]
+            overlapping = numpy.all(
+                ( mins[ boxes, numpy.newaxis ] <= maxs ) & ( mins <= maxs[ boxes, numpy.newaxis ] ),
+                axis = 2
+                )
+            # pairs of large boxes are only found from the first box
+            overlapping &= ~is_large | ( indices > boxes[ :, numpy.newaxis ] )
+            rows, columns = numpy.nonzero( overlapping )
+            firsts.append( boxes[ rows ] )
+            seconds.append( columns )
+        return numpy.concatenate( firsts ), numpy.concatenate( seconds )
+
+    def _sweep( self, aabbs ):
+        """Finds the overlapping pairs of boxes.
+        """
+        mins = aabbs[ :, 0 ]
+        maxs = aabbs[ :, 1 ]
+        count = len( aabbs )
+        if count == 0:
+            return numpy.zeros( ( 0, 2 ), dtype = numpy.int )
+        if self.axis is None:
+            self._choose( mins, maxs )
+        across = [ axis for axis in xrange( 3 ) if axis != self.axis ]
+
+        # the rank of each box along the sweep axis, and the
+        # number of boxes that start before each box ends
+        order = self._sweep_sorter.sort( mins[ :, self.axis ] )
+        ranks = numpy.empty( count, dtype = numpy.int64 )
+        ranks[ order ] = numpy.arange( count )
+        # searching in sorted order is much faster than in box order
+        ends = numpy.empty( count, dtype = numpy.int64 )
+        ends[ order ] = numpy.searchsorted( mins[ order, self.axis ], maxs[ order, self.axis ], side = 'right' )
+
+        # each box is placed in every column it overlaps, a box
+        # no larger than a cell overlaps at most four columns
+        sizes = ( maxs - mins )[ :, across ]
+        large = ( sizes > self.cell_size ).any( axis = 1 )
+        cells = numpy.floor( mins[ :, across ] / self.cell_size ).astype( numpy.int64 )
+        spans = numpy.floor( maxs[ :, across ] / self.cell_size ).astype( numpy.int64 ) - cells
+        columns = numpy.empty( ( len( _column_offsets ), count ), dtype = numpy.int64 )
+        for index, ( row, column ) in enumerate( _column_offsets ):
+            columns[ index ] = _pack_columns( cells + ( row, column ) )
+            columns[ index, ( spans[ :, 0 ] < row ) | ( spans[ :, 1 ] < column ) | large ] = -1
+        columns = columns.ravel()
+
+        # sort the boxes by column, then along the sweep axis,
+        # unused columns are sorted first by a key that doesn't
+        # change, so that they don't need to be sorted again
+        keys = columns * count + numpy.tile( ranks, len( _column_offsets ) )
+        unused = numpy.nonzero( columns < 0 )[ 0 ]
+        keys[ unused ] = unused - len( keys )
+        entries = self._column_sorter.sort( keys )
+        sorted_keys = keys[ entries ]
+        first_entry = numpy.searchsorted( sorted_keys, 0 )
+        entries = entries[ first_entry: ]
+        sorted_keys = sorted_keys[ first_entry: ]
+        columns = columns[ entries ]
+        boxes = entries % count
+
+        # sweep each box through the boxes that start after
+        # it in the same column
+        stops = numpy.searchsorted( sorted_keys, columns * count + ends[ boxes ] )
+        counts = stops - numpy.arange( 1, len( entries ) + 1 )
+        first = numpy.repeat( boxes, counts )
+        second = boxes[ _expand( numpy.arange( 1, len( entries ) + 1 ), counts ) ]
+
+        # boxes that share several columns are found in each of
+        # them, keep only the column containing the minimum
+        # corner of their overlap
+        shared = numpy.repeat( columns, counts ) == _pack_columns(
+            numpy.maximum( cells[ first ], cells[ second ] )
+            )
+        firsts = [ first[ shared ] ]
+        seconds = [ second[ shared ] ]
+
+        if large.any():
+            first, second = self._large_pairs( numpy.nonzero( large )[ 0 ], mins, maxs )
+            firsts.append( first )
+            seconds.append( second )
+
+        first = numpy.concatenate( firsts )
+        second = numpy.concatenate( seconds )
+        overlapping = numpy.all(
+            ( mins[ first ] <= maxs[ second ] ) & ( mins[ second ] <= maxs[ first ] ),
+            axis = 1
+            )
+        pairs = numpy.column_stack( ( first[ overlapping ], second[ overlapping ] ) )
+        pairs.sort( axis = 1 )
+        return pairs
+
+    def update( self, aabbs ):
+        """Finds the overlapping boxes and compares them with
+        the previous update.
+
+        :param numpy.array aabbs: An (N,2,3) array of boxes.
+        :rtype: tuple
+        :return: A tuple of (added, removed) pairs, each an (M,2) array
+            of box indices with the lowest index first.
+        """
+        aabbs = numpy.asarray( aabbs, dtype = numpy.float ).reshape( -1, 2, 3 )
+        count = max( len( aabbs ), self._count )
+
+        pairs = self._sweep( aabbs )
+        keys = _pair_keys( pairs, count )
+        order = numpy.argsort( keys )
+        pairs = pairs[ order ]
+        keys = keys[ order ]
+
+        previous = _pair_keys( self.pairs, count )
+        added = pairs[ ~numpy.in1d( keys, previous, assume_unique = True ) ]
+        removed = self.pairs[ ~numpy.in1d( previous, keys, assume_unique = True ) ]
+
+        self.pairs = pairs
+        self._count = len( aabbs )
+        return added, removed
@@ -0,0 +1,231 @@
+"""Provides fast filtering of scene nodes by tag.
+
+Each node in a :py:class:`TagIndex` has a bitmask of tags
+stored in a packed numpy array. Queries are a vectorised
+bitwise test over the array rather than a walk of the tree.
+
+The index listens for nodes being added to and removed from
+the scene and updates itself incrementally. The tags of removed
+nodes are remembered, so a node moved within the scene, by
+removing it and adding it to another parent, keeps its tags.
+
+Example::
+
+    index = TagIndex( root )
+    index.add_tags( node, 'opaque', 'shadow_caster' )
+
+    # per render pass
+    opaque = index.select( index.mask( 'opaque' ) )
+    shadows = index.select(
+        index.mask( 'shadow_caster' ),
+        no_tags = index.mask( 'transparent' )
+        )
+"""
+
+import weakref
+
+import numpy
+import dispatcher
+
+from tree_node import TreeNode
+
+
+class TagIndex( object ):
+    """A packed array of tag bitmasks for the nodes of a scene.
+
+    Up to 64 different tags are supported.
+    """
+
+    #: The number of different tags that can be used.
+    max_tags = 64
+
+    def __init__( self, root, capacity = 64 ):
+        """Creates an index of the nodes beneath root.
+
+        :param TreeNode root: The root of the scene.
+        :param int capacity: The initial number of node slots.
+        """
+        super( TagIndex, self ).__init__()
+
+        self.root = root
+
+        # the bit used by each tag
+        self.tags = {}
+
+        # each node has a slot in the arrays
+        # removed nodes leave their slot free for re-use
+        self.nodes = []
+        self.slots = {}
+        self._free = []
+        self.masks = numpy.zeros( capacity, dtype = numpy.uint64 )
+        self.alive = numpy.zeros( capacity, dtype = numpy.bool )
+
+        # the tags of nodes removed from the scene, restored
+        # if they are added again while still alive
+        self._detached = weakref.WeakKeyDictionary()
+
+        self._add_tree( root )
+
+        # listen for changes to the structure of any tree,
+        # nodes that are not in our scene are ignored
+        dispatcher.connect(
+            self._on_child_added,
+            TreeNode.on_child_added,
+            dispatcher.Any
+            )
+        dispatcher.connect(
+            self._on_child_removed,
+            TreeNode.on_child_removed,
+            dispatcher.Any
+            )
+
+    def __len__( self ):
+        return len( self.slots )
+
+    def __contains__( self, node ):
+        return node in self.slots
+
+    def _on_child_added( self, child ):
+        if child.parent in self.slots:
+            self._add_tree( child )
+
+    def _on_child_removed( self, child ):
+        if child in self.slots:
+            self._remove_tree( child )
+
+    def _add_tree( self, node ):
+        for child in node.dfs():
+            if child in self.slots:
+                continue
+
+            if self._free:
+                slot = self._free.pop()
+                self.nodes[ slot ] = child
+            else:
+                slot = len( self.nodes )
+                self.nodes.append( child )
+                if slot >= len( self.masks ):
+                    self._grow( slot + 1 )
+
+            self.slots[ child ] = slot
+            self.masks[ slot ] = self._detached.pop( child, 0 )
+            self.alive[ slot ] = True
+
+    def _remove_tree( self, node ):
+        for child in node.dfs():
+            slot = self.slots.pop( child, None )
+            if slot is None:
+                continue
+
+            if self.masks[ slot ]:
+                self._detached[ child ] = self.masks[ slot ]
+
+            self.nodes[ slot ] = None
+            self.masks[ slot ] = 0
+            self.alive[ slot ] = False
+            self._free.append( slot )
+
+    def _grow( self, size ):
+        capacity = max( size, len( self.masks ) * 2 )
+
+        masks = numpy.zeros( capacity, dtype = numpy.uint64 )
+        masks[ :len( self.masks ) ] = self.masks
+        self.masks = masks
+
+        alive = numpy.zeros( capacity, dtype = numpy.bool )
+        alive[ :len( self.alive ) ] = self.alive
+        self.alive = alive
+
+    def bit( self, tag ):
+        """Returns the bit used by a tag.
+
+        A bit is allocated the first time a tag is used.
+
+        :raise ValueError: Raised if there are no bits remaining.
+        :rtype: int
+        """
+        if tag not in self.tags:
+            if len( self.tags ) >= TagIndex.max_tags:
+                raise ValueError( "Too many tags" )
+            self.tags[ tag ] = len( self.tags )
+        return self.tags[ tag ]
+
+    def mask( self, *tags ):
+        """Returns a mask with the bits of each tag set.
+
+        :rtype: numpy.uint64
+        """
+        mask = 0
+        for tag in tags:
+            mask |= 1 << self.bit( tag )
+        return numpy.uint64( mask )
+
+    def add_tags( self, node, *tags ):
+        """Adds tags to a node.
+
+        :raise KeyError: Raised if the node is not in the index.
+        """
+        self.masks[ self.slots[ node ] ] |= self.mask( *tags )
+
+    def remove_tags( self, node, *tags ):
+        """Removes tags from a node.
+
+        :raise KeyError: Raised if the node is not in the index.
+        """
+        self.masks[ self.slots[ node ] ] &= ~self.mask( *tags )
+
+    def has_tags( self, node, *tags ):
+        """Checks if a node has every one of the tags.
+
+        :raise KeyError: Raised if the node is not in the index.
+        :rtype: bool
+        """
+        mask = self.mask( *tags )
+        return ( self.masks[ self.slots[ node ] ] & mask ) == mask
+
+    def node_tags( self, node ):
+        """Returns the tags of a node.
+
+        :raise KeyError: Raised if the node is not in the index.
+        :rtype: set
+        """
+        mask = int( self.masks[ self.slots[ node ] ] )
+        return set(
+            tag for tag, bit in self.tags.items() if mask & ( 1 << bit )
+            )
+
+    def query( self, all_tags = 0, any_tags = 0, no_tags = 0 ):
+        """Finds the slots of the nodes that match the masks.
+
+        :param numpy.uint64 all_tags: Nodes must have every tag in this mask.
+        :param numpy.uint64 any_tags: If specified, nodes must have at
+            least one tag in this mask.
+        :param numpy.uint64 no_tags: Nodes must have no tags in this mask.
+        :rtype: numpy.array
+        :return: The matching slots, in ascending order.
+        """
+        all_tags = numpy.uint64( all_tags )
+        any_tags = numpy.uint64( any_tags )
+        no_tags = numpy.uint64( no_tags )
+
+        count = len( self.nodes )
+        masks = self.masks[ :count ]
+
+        matches = self.alive[ :count ].copy()
+        if all_tags:
+            matches &= ( masks & all_tags ) == all_tags
+        if any_tags:
+            matches &= ( masks & any_tags ) != 0
+        if no_tags:
+            matches &= ( masks & no_tags ) == 0
+        return numpy.nonzero( matches )[ 0 ]
+
+    def select( self, all_tags = 0, any_tags = 0, no_tags = 0 ):
+        """Finds the nodes that match the masks.
+
+        Accepts the same parameters as :py:meth:`query`.
+
+        :rtype: list
+        """
+        nodes = self.nodes
+        return [ nodes[ slot ] for slot in self.query( all_tags, any_tags, no_tags ) ]
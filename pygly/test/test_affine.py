@@ -0,0 +1,104 @@
+import unittest
+import math
+
+import numpy
+
+from pyrr import matrix44
+from pygly import affine
+from pygly.transform_array import create_matrices
+
+
+def random_transforms( count ):
+    translations = numpy.random.uniform( -10.0, 10.0, (count, 3) )
+    orientations = numpy.random.normal( size = (count, 4) )
+    orientations /= numpy.sqrt( ( orientations ** 2 ).sum( axis = 1 ) )[ :, numpy.newaxis ]
+    scales = numpy.random.uniform( 0.5, 2.0, (count, 3) )
+    return translations, orientations, scales
+
+
+class test_affine( unittest.TestCase ):
+
+    def setUp( self ):
+        pass
+
+    def tearDown( self ):
+        pass
+
+    def test_inverse( self ):
+        matrices = create_matrices( *random_transforms( 10 ) )
+
+        # orthogonal rows
+        result = affine.inverse( matrices )
+        self.assertTrue(
+            numpy.allclose( result, numpy.linalg.inv( matrices ) ),
+            "Scale and rotation inverse incorrect"
+            )
+
+        # shear
+        sheared = numpy.matmul( matrices, matrices[ ::-1 ] )
+        result = affine.inverse( sheared )
+        self.assertTrue(
+            numpy.allclose( result, numpy.linalg.inv( sheared ) ),
+            "Affine inverse incorrect"
+            )
+
+        # a small sheared matrix batched with a large scale
+        mixed = numpy.array( [ numpy.eye( 4 ), numpy.eye( 4 ) ] )
+        mixed[ 0, 0:3, 0:3 ] *= 1000.0
+        mixed[ 1, 1, 0 ] = 0.5
+        mixed[ 1, 0:3, 0:3 ] *= 0.01
+        result = affine.inverse( mixed )
+        self.assertTrue(
+            numpy.allclose( numpy.matmul( mixed, result ), numpy.eye( 4 ) ),
+            "Mixed scale inverse incorrect"
+            )
+        self.assertTrue(
+            numpy.allclose( result[ 1 ], affine.inverse( mixed[ 1 ] ) ),
+            "Batched inverse differs from single inverse"
+            )
+
+        # projection
+        projection = matrix44.create_perspective_projection_matrix( 80.0, 1.5, 1.0, 100.0 )
+        self.assertTrue(
+            numpy.allclose( affine.inverse( projection ), numpy.linalg.inv( projection ) ),
+            "Projection inverse incorrect"
+            )
+
+    def test_decompose( self ):
+        translations, orientations, scales = random_transforms( 10 )
+        matrices = create_matrices( translations, orientations, scales )
+
+        result = affine.decompose( matrices )
+        self.assertTrue( numpy.allclose( result[ 0 ], translations ), "Translation incorrect" )
+        self.assertTrue( numpy.allclose( result[ 2 ], scales ), "Scale incorrect" )
+        self.assertTrue(
+            numpy.allclose( numpy.abs( ( result[ 1 ] * orientations ).sum( axis = 1 ) ), 1.0 ),
+            "Orientation incorrect"
+            )
+
+        translation, orientation, scale = affine.decompose( matrices[ 0 ] )
+        self.assertTrue( numpy.allclose( translation, translations[ 0 ] ), "Translation incorrect" )
+
+    def test_transform_aabbs( self ):
+        matrices = create_matrices( *random_transforms( 10 ) )
+        aabb = numpy.array( [ [ -1.0, -2.0, -3.0 ], [ 1.0, 2.0, 3.0 ] ] )
+
+        # the corners of the box, transformed
+        corners = numpy.array( [
+            [ x, y, z, 1.0 ]
+            for x in aabb[ :, 0 ]
+            for y in aabb[ :, 1 ]
+            for z in aabb[ :, 2 ]
+            ] )
+        points = numpy.dot( corners, matrices )[ ..., 0:3 ]
+
+        result = affine.transform_aabbs( aabb, matrices )
+        self.assertTrue( numpy.allclose( result[ :, 0 ], points.min( axis = 0 ) ), "Minimum incorrect" )
+        self.assertTrue( numpy.allclose( result[ :, 1 ], points.max( axis = 0 ) ), "Maximum incorrect" )
+
+        result = affine.transform_aabbs( numpy.tile( aabb, ( 10, 1, 1 ) ), matrices )
+        self.assertTrue( numpy.allclose( result[ :, 0 ], points.min( axis = 0 ) ), "Minimum incorrect" )
+
+
+if __name__ == '__main__':
+    unittest.main()
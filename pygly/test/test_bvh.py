@@ -0,0 +1,150 @@
+import unittest
+
+import numpy
+
+from pyrr import matrix44
+from pygly import frustum
+from pygly.bvh import BVH
+
+
+def random_aabbs( count, size = 100.0 ):
+    centres = numpy.random.uniform( -size, size, (count, 3) )
+    extents = numpy.random.uniform( 0.1, 3.0, (count, 3) )
+    return numpy.concatenate(
+        ( ( centres - extents )[ :, numpy.newaxis ], ( centres + extents )[ :, numpy.newaxis ] ),
+        axis = 1
+        )
+
+def ray_mask( ray, aabbs ):
+    with numpy.errstate( divide = 'ignore', invalid = 'ignore' ):
+        near = ( aabbs[ :, 0 ] - ray[ 0 ] ) / ray[ 1 ]
+        far = ( aabbs[ :, 1 ] - ray[ 0 ] ) / ray[ 1 ]
+    entry = numpy.minimum( near, far ).max( axis = 1 )
+    exit = numpy.maximum( near, far ).min( axis = 1 )
+    return exit >= numpy.maximum( entry, 0.0 )
+
+
+class test_bvh( unittest.TestCase ):
+
+    def setUp( self ):
+        numpy.random.seed( 0 )
+        self.aabbs = random_aabbs( 2000 )
+        self.bvh = BVH( self.aabbs )
+
+        view = matrix44.create_from_translation( [ 0.0, 0.0, -20.0 ] )
+        projection = matrix44.create_perspective_projection_matrix( 60.0, 1.5, 1.0, 100.0 )
+        self.planes = frustum.planes_from_matrix( numpy.dot( view, projection ) )
+
+    def tearDown( self ):
+        pass
+
+    def test_build( self ):
+        bvh = self.bvh
+        self.assertEqual( len( bvh ), 2000, "Incorrect length" )
+        self.assertTrue(
+            numpy.array_equal( numpy.sort( bvh.order ), numpy.arange( 2000 ) ),
+            "Items missing from tree"
+            )
+
+        # every tree node contains the boxes beneath it
+        for node in xrange( len( bvh.bounds ) ):
+            items = bvh.order[ bvh.starts[ node ]:bvh.starts[ node ] + bvh.counts[ node ] ]
+            self.assertTrue(
+                numpy.all( bvh.aabbs[ items, 0 ] >= bvh.bounds[ node, 0 ] )
+                and numpy.all( bvh.aabbs[ items, 1 ] <= bvh.bounds[ node, 1 ] ),
+                "Tree node does not contain its items"
+                )
+
+        leaves = bvh.children < 0
+        self.assertTrue(
+            numpy.all( bvh.counts[ leaves ] <= bvh.max_leaf_size ),
+            "Leaf too large"
+            )
+
+    def test_frustum( self ):
+        expected = numpy.nonzero( frustum.aabb_mask( self.planes, self.aabbs ) )[ 0 ]
+        result = numpy.sort( self.bvh.frustum( self.planes ) )
+        self.assertTrue( len( expected ) > 0, "Frustum is empty" )
+        self.assertTrue( numpy.array_equal( result, expected ), "Incorrect frustum query" )
+
+    def test_sphere( self ):
+        sphere = numpy.array( [ 10.0, -5.0, 20.0, 40.0 ] )
+        nearest = numpy.clip( sphere[ 0:3 ], self.aabbs[ :, 0 ], self.aabbs[ :, 1 ] )
+        distances = numpy.sqrt( ( ( nearest - sphere[ 0:3 ] ) ** 2 ).sum( axis = 1 ) )
+        expected = numpy.nonzero( distances <= sphere[ 3 ] )[ 0 ]
+
+        result = numpy.sort( self.bvh.sphere( sphere ) )
+        self.assertTrue( numpy.array_equal( result, expected ), "Incorrect sphere query" )
+
+    def test_ray( self ):
+        ray = numpy.array( [ [ -150.0, 0.0, 0.0 ], [ 1.0, 0.01, 0.02 ] ] )
+        expected = numpy.nonzero( ray_mask( ray, self.aabbs ) )[ 0 ]
+
+        indices, distances = self.bvh.ray( ray )
+        self.assertTrue(
+            numpy.array_equal( numpy.sort( indices ), expected ),
+            "Incorrect ray query"
+            )
+        self.assertTrue( numpy.all( numpy.diff( distances ) >= 0.0 ), "Hits not sorted" )
+
+        indices, distances = self.bvh.ray( ray, max_distance = 150.0 )
+        self.assertTrue( numpy.all( distances <= 150.0 ), "Hits beyond max distance" )
+
+    def test_refit( self ):
+        moved = self.aabbs + numpy.random.uniform( -5.0, 5.0, (2000, 1, 3) )
+        self.bvh.refit( moved )
+
+        expected = numpy.nonzero( frustum.aabb_mask( self.planes, moved ) )[ 0 ]
+        result = numpy.sort( self.bvh.frustum( self.planes ) )
+        self.assertTrue( numpy.array_equal( result, expected ), "Incorrect query after refit" )
+
+    def test_update( self ):
+        # small movements only refit the tree
+        moved = self.aabbs + 0.01
+        self.assertFalse( self.bvh.update( moved ), "Small movement rebuilt tree" )
+
+        # shuffling every box degrades the tree
+        shuffled = moved[ numpy.random.permutation( 2000 ) ]
+        self.assertTrue( self.bvh.update( shuffled ), "Degraded tree not rebuilt" )
+        self.assertTrue(
+            self.bvh.cost() <= self.bvh.build_cost,
+            "Incorrect cost after rebuild"
+            )
+
+        self.assertTrue( self.bvh.update( shuffled[ :100 ] ), "Resized tree not rebuilt" )
+        self.assertEqual( len( self.bvh ), 100, "Incorrect length after rebuild" )
+
+    def test_empty( self ):
+        bvh = BVH( numpy.zeros( ( 0, 2, 3 ) ) )
+        self.assertEqual( len( bvh.frustum( self.planes ) ), 0, "Empty tree returned items" )
+        self.assertEqual( len( bvh.sphere( [ 0.0, 0.0, 0.0, 10.0 ] ) ), 0, "Empty tree returned items" )
+
+        # identical boxes can't be split by position
+        bvh = BVH( numpy.zeros( ( 100, 2, 3 ) ) )
+        self.assertEqual( len( bvh.sphere( [ 0.0, 0.0, 0.0, 1.0 ] ) ), 100, "Missing identical boxes" )
+
+    def test_small_leaves( self ):
+        # a single box is a single leaf
+        bvh = BVH( self.aabbs[ :1 ] )
+        self.assertEqual( bvh.children.tolist(), [ -1 ], "Single box was split" )
+        self.assertEqual( bvh.sphere( [ 0.0, 0.0, 0.0, 1000.0 ] ).tolist(), [ 0 ], "Missing single box" )
+
+        # every leaf holds one box
+        bvh = BVH( self.aabbs[ :100 ], max_leaf_size = 1 )
+        leaves = bvh.children < 0
+        self.assertTrue( numpy.all( bvh.counts[ leaves ] == 1 ), "Leaf too large" )
+        self.assertEqual( numpy.count_nonzero( leaves ), 100, "Incorrect number of leaves" )
+
+        expected = numpy.nonzero( frustum.aabb_mask( self.planes, self.aabbs[ :100 ] ) )[ 0 ]
+        result = numpy.sort( bvh.frustum( self.planes ) )
+        self.assertTrue( numpy.array_equal( result, expected ), "Incorrect frustum query" )
+
+        bvh = BVH( self.aabbs, max_leaf_size = 1 )
+        self.assertTrue(
+            numpy.array_equal( numpy.sort( bvh.order ), numpy.arange( 2000 ) ),
+            "Items missing from tree"
+            )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import unittest
+import math
+
+import numpy
+
+from pyrr import matrix44
+from pygly.scene_node import SceneNode
+from pygly.camera_node import CameraNode
+from pygly import frustum
+
+
+class test_camera_node( unittest.TestCase ):
+
+    def setUp( self ):
+        self.root = SceneNode( 'root' )
+        self.projection = matrix44.create_perspective_projection_matrix(
+            fovy = 80.0,
+            aspect = 1.5,
+            near = 1.0,
+            far = 100.0
+            )
+        self.camera = CameraNode( 'camera', self.projection )
+        self.root.add_child( self.camera )
+
+        self.root.transform.scale = [ 2.0, 2.0, 2.0 ]
+        self.camera.transform.translation = [ 0.0, 10.0, 20.0 ]
+        self.camera.transform.object.rotate_x( -math.pi / 4.0 )
+
+    def tearDown( self ):
+        pass
+
+    def test_model_view( self ):
+        expected = numpy.linalg.inv( self.camera.world_transform.matrix )
+        model_view = self.camera.model_view
+
+        self.assertTrue( numpy.allclose( model_view, expected ), "Model view incorrect" )
+        self.assertTrue( self.camera.model_view is model_view, "Model view not cached" )
+
+        # moving a parent invalidates the cache
+        self.root.transform.translation = [ 1.0, 0.0, 0.0 ]
+        expected = numpy.linalg.inv( self.camera.world_transform.matrix )
+        self.assertTrue(
+            numpy.allclose( self.camera.model_view, expected ),
+            "Model view not updated"
+            )
+
+    def test_view_projection( self ):
+        expected = numpy.dot( self.camera.model_view, self.projection )
+        view_projection = self.camera.view_projection
+
+        self.assertTrue( numpy.allclose( view_projection, expected ), "View projection incorrect" )
+        self.assertTrue( self.camera.view_projection is view_projection, "View projection not cached" )
+
+        projection = matrix44.create_orthogonal_projection_matrix( -1.0, 1.0, -1.0, 1.0, 1.0, 10.0 )
+        self.camera.projection_matrix = projection
+        expected = numpy.dot( self.camera.model_view, projection )
+        self.assertTrue(
+            numpy.allclose( self.camera.view_projection, expected ),
+            "View projection not updated"
+            )
+
+
+    def test_frustum( self ):
+        planes = self.camera.frustum
+        self.assertEqual( planes.shape, (6, 4), "Incorrect frustum shape" )
+        self.assertTrue( self.camera.frustum is planes, "Frustum not cached" )
+
+        # the camera looks down its -z axis
+        camera = self.camera.world_transform
+        point = camera.translation - camera.object.z * 10.0
+        self.assertTrue( frustum.point_mask( planes, point )[ 0 ], "Point not visible" )
+        point = camera.translation + camera.object.z * 10.0
+        self.assertFalse( frustum.point_mask( planes, point )[ 0 ], "Point visible" )
+
+        self.camera.transform.translation = [ 0.0, 0.0, 0.0 ]
+        self.assertFalse( self.camera.frustum is planes, "Frustum not updated" )
+
+    def test_screen_ray( self ):
+        rect = numpy.array( [ [ 10, 20 ], [ 300, 200 ] ] )
+        camera = self.camera.world_transform
+
+        # the centre of the viewport looks down the camera's -z axis
+        ray = self.camera.screen_ray( rect, [ 160.0, 120.0 ] )
+        self.assertTrue( numpy.allclose( ray[ 1 ], -camera.object.z ), "Incorrect ray direction" )
+        self.assertTrue( numpy.isclose( numpy.linalg.norm( ray[ 1 ] ), 1.0 ), "Direction not normalised" )
+
+        # the ray passes through a point projected onto the viewport
+        point = camera.translation - camera.object.z * 15.0 + camera.object.x * 3.0
+        clip = numpy.dot( numpy.append( point, 1.0 ), self.camera.view_projection )
+        ndc = clip[ 0:2 ] / clip[ 3 ]
+        pixel = rect[ 0 ] + ( ndc + 1.0 ) * 0.5 * rect[ 1 ]
+
+        ray = self.camera.screen_ray( rect, pixel )
+        offset = point - ray[ 0 ]
+        self.assertTrue(
+            numpy.allclose( offset - numpy.dot( offset, ray[ 1 ] ) * ray[ 1 ], 0.0 ),
+            "Ray misses projected point"
+            )
+
+    def test_project( self ):
+        rect = numpy.array( [ [ 0, 0 ], [ 640, 480 ] ] )
+        camera = self.camera.world_transform
+        points = numpy.array( [
+            camera.translation - camera.object.z * 15.0,
+            camera.translation + camera.object.z * 15.0,
+            ] )
+
+        pixels, depths, visible = self.camera.project( rect, points )
+        self.assertTrue( numpy.array_equal( visible, [ True, False ] ), "Incorrect visibility" )
+        self.assertTrue( numpy.allclose( pixels[ 0 ], [ 320.0, 240.0 ] ), "Incorrect pixel" )
+
+        unprojected = self.camera.unproject( rect, pixels[ 0:1 ], depths[ 0:1 ] )
+        self.assertTrue( numpy.allclose( unprojected[ 0 ], points[ 0 ] ), "Incorrect unprojected point" )
+
+
+if __name__ == '__main__':
+    unittest.main()
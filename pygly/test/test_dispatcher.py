@@ -4,6 +4,7 @@ import math
 import numpy
 import pyglet
 
+from pygly import dispatcher
 from pygly.dispatcher import Dispatcher
 
 
@@ -38,6 +39,159 @@ class test_dispatcher( unittest.TestCase ):
             "Handler still registered"
             )
 
+    def test_compact( self ):
+        obj = Dispatcher()
+
+        class Receiver( object ):
+            def __init__( self ):
+                self.values = []
+
+            def handler( self, value ):
+                self.values.append( value )
+
+        a = Receiver()
+        b = Receiver()
+        obj.register_handler( a.handler )
+        obj.register_handler( b.handler )
+        obj.register_handler( a.handler )
+        self.assertEqual( len( obj ), 2, "Handler registered twice" )
+
+        obj.dispatch( 1 )
+        self.assertEqual( a.values, [ 1 ], "Handler not called" )
+
+        del b
+        obj.dispatch( 2 )
+        self.assertEqual( len( obj ), 1, "Dead handler not removed" )
+        self.assertEqual( a.values, [ 1, 2 ], "Handler not called" )
+
+    def test_references( self ):
+        obj = Dispatcher()
+        values = []
+
+        class Receiver( object ):
+            def handler( self, value ):
+                values.append( ( 'method', value ) )
+
+        def handler( value ):
+            values.append( ( 'function', value ) )
+
+        # functions are held strongly, bound methods weakly
+        receiver = Receiver()
+        obj.register_handler( handler )
+        obj.register_handler( receiver.handler )
+        del handler
+        del receiver
+
+        obj.dispatch( 1 )
+        self.assertEqual( values, [ ( 'function', 1 ) ], "Incorrect handlers called" )
+        self.assertEqual( len( obj ), 1, "Function handler removed" )
+
+    def test_backends( self ):
+        backend = dispatcher.backend
+        try:
+            for name in [ 'slots', 'pydispatch' ]:
+                dispatcher.set_backend( name )
+
+                sender = object.__new__( type( 'Sender', ( object, ), {} ) )
+                values = []
+                def handler( value ):
+                    values.append( value )
+
+                dispatcher.connect( handler, 'signal', sender )
+                dispatcher.send( 'signal', sender, 1 )
+                dispatcher.send( 'other', sender, 2 )
+                dispatcher.disconnect( handler, 'signal', sender )
+                dispatcher.send( 'signal', sender, 3 )
+
+                self.assertEqual( values, [ 1 ], "Incorrect values received" )
+        finally:
+            dispatcher.set_backend( backend )
+
+    def test_deferred( self ):
+        backend = dispatcher.backend
+        try:
+            for name in [ 'slots', 'pydispatch' ]:
+                dispatcher.set_backend( name )
+
+                sender = object.__new__( type( 'Sender', ( object, ), {} ) )
+                immediate = []
+                deferred = []
+                def immediate_handler( value ):
+                    immediate.append( value )
+                def deferred_handler( value ):
+                    deferred.append( value )
+
+                dispatcher.connect( immediate_handler, 'signal', sender )
+                dispatcher.connect( deferred_handler, 'signal', sender, deferred = True )
+                for value in range( 3 ):
+                    dispatcher.send( 'signal', sender, value )
+
+                self.assertEqual( immediate, [ 0, 1, 2 ], "Immediate receiver deferred" )
+                self.assertEqual( deferred, [], "Deferred receiver called" )
+
+                self.assertEqual( dispatcher.flush(), 1, "Events not coalesced" )
+                self.assertEqual( deferred, [ 2 ], "Deferred receiver incorrect" )
+                self.assertEqual( dispatcher.flush(), 0, "Queue not emptied" )
+
+                dispatcher.disconnect( deferred_handler, 'signal', sender, deferred = True )
+                dispatcher.send( 'signal', sender, 3 )
+                dispatcher.flush()
+                self.assertEqual( deferred, [ 2 ], "Receiver not disconnected" )
+        finally:
+            dispatcher.set_backend( backend )
+
+
+    def test_profiling( self ):
+        backend = dispatcher.backend
+        try:
+            for name in [ 'slots', 'pydispatch' ]:
+                dispatcher.set_backend( name )
+                dispatcher.set_profiling( True )
+                dispatcher.end_frame()
+
+                sender = object.__new__( type( 'Sender', ( object, ), {} ) )
+                def outer_handler():
+                    dispatcher.send( 'inner', sender )
+                def inner_handler():
+                    pass
+
+                dispatcher.connect( outer_handler, 'outer', sender )
+                dispatcher.connect( inner_handler, 'inner', sender )
+                dispatcher.send( 'outer', sender )
+                dispatcher.send( 'outer', sender )
+
+                profile = dispatcher.end_frame()
+                self.assertEqual( profile[ 'outer' ].sends, 2, "Incorrect send count" )
+                self.assertEqual( profile[ 'inner' ].sends, 2, "Nested send not counted" )
+                self.assertEqual( profile[ 'outer' ].receivers, 2, "Incorrect receiver count" )
+                self.assertTrue(
+                    profile[ 'outer' ].self_time <= profile[ 'outer' ].time,
+                    "Nested time not excluded"
+                    )
+                self.assertEqual( dispatcher.end_frame(), {}, "Counters not reset" )
+
+                # receivers destroyed during the send are not counted
+                class Receiver( object ):
+                    def handler( self ):
+                        pass
+                class Destroyer( object ):
+                    def handler( self ):
+                        receivers.pop()
+                receivers = [ Receiver() ]
+                destroyer = Destroyer()
+                dispatcher.connect( receivers[ 0 ].handler, 'destroy', sender )
+                dispatcher.connect( destroyer.handler, 'destroy', sender )
+                dispatcher.send( 'destroy', sender )
+                profile = dispatcher.end_frame()
+                self.assertEqual( profile[ 'destroy' ].receivers, 1, "Dead receiver counted" )
+
+                dispatcher.set_profiling( False )
+                dispatcher.send( 'outer', sender )
+                self.assertEqual( dispatcher.end_frame(), {}, "Counted while disabled" )
+        finally:
+            dispatcher.set_profiling( False )
+            dispatcher.set_backend( backend )
+
 
 if __name__ == '__main__':
     unittest.main()
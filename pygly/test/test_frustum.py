@@ -0,0 +1,79 @@
+import unittest
+
+import numpy
+
+from pyrr import matrix44
+from pygly import frustum
+
+
+class test_frustum( unittest.TestCase ):
+
+    def setUp( self ):
+        self.projection = matrix44.create_perspective_projection_matrix(
+            fovy = 90.0,
+            aspect = 1.0,
+            near = 1.0,
+            far = 100.0
+            )
+
+    def tearDown( self ):
+        pass
+
+    def test_planes( self ):
+        planes = frustum.planes_from_matrix( self.projection )
+
+        self.assertTrue(
+            numpy.allclose( planes[ frustum.near ], [ 0.0, 0.0, -1.0, 1.0 ] ),
+            "Incorrect near plane"
+            )
+        self.assertTrue(
+            numpy.allclose( planes[ frustum.far ], [ 0.0, 0.0, 1.0, -100.0 ] ),
+            "Incorrect far plane"
+            )
+
+        points = numpy.array( [
+            [ 0.0, 0.0,-10.0 ],
+            [ 0.0, 0.0, 10.0 ],
+            [ 0.0, 0.0,-200.0 ],
+            [ 9.0, 0.0,-10.0 ],
+            [ 11.0, 0.0,-10.0 ],
+            ] )
+        self.assertEqual(
+            list( frustum.point_mask( planes, points ) ),
+            [ True, False, False, True, False ],
+            "Incorrect point mask"
+            )
+
+    def test_bounds( self ):
+        # move the camera back 10 units
+        view = matrix44.create_from_translation( [ 0.0, 0.0,-10.0 ] )
+        planes = frustum.planes_from_matrix( numpy.dot( view, self.projection ) )
+
+        spheres = numpy.array( [
+            [ 0.0, 0.0, 0.0, 1.0 ],
+            [ 0.0, 0.0, 10.5, 2.0 ],
+            [ 0.0, 0.0, 10.5, 1.0 ],
+            [ 15.0, 0.0, 0.0, 3.0 ],
+            ] )
+        self.assertEqual(
+            list( frustum.sphere_mask( planes, spheres ) ),
+            [ True, True, False, False ],
+            "Incorrect sphere mask"
+            )
+
+        aabbs = numpy.array( [
+            [ [-1.0,-1.0,-1.0 ], [ 1.0, 1.0, 1.0 ] ],
+            [ [ 9.0,-1.0,-1.0 ], [ 20.0, 1.0, 1.0 ] ],
+            [ [ 11.0,-1.0,-1.0 ], [ 20.0, 1.0, 1.0 ] ],
+            [ [-1.0,-1.0, 20.0 ], [ 1.0, 1.0, 30.0 ] ],
+            ] )
+        self.assertEqual(
+            list( frustum.aabb_mask( planes, aabbs ) ),
+            [ True, True, False, False ],
+            "Incorrect box mask"
+            )
+
+
+if __name__ == '__main__':
+    unittest.main()
+
@@ -0,0 +1,144 @@
+import unittest
+
+import numpy
+
+from pyrr import matrix44
+from pygly.occlusion import OcclusionBuffer
+
+
+def quad( left, bottom, right, top, z ):
+    return numpy.array( [
+        [ [ left, bottom, z ], [ right, bottom, z ], [ right, top, z ] ],
+        [ [ left, bottom, z ], [ right, top, z ], [ left, top, z ] ],
+        ] )
+
+def box( minimum, maximum ):
+    return numpy.array( [ minimum, maximum ], dtype = numpy.float )
+
+
+class test_occlusion( unittest.TestCase ):
+
+    def setUp( self ):
+        numpy.random.seed( 0 )
+        # with an identity matrix, points are already in clip space
+        self.identity = numpy.identity( 4 )
+
+    def tearDown( self ):
+        pass
+
+    def brute_force( self, buffer, triangles ):
+        depths = numpy.ones( ( buffer.height, buffer.width ) )
+        for triangle in triangles:
+            x = ( triangle[ :, 0 ] + 1.0 ) * 0.5 * buffer.width
+            y = ( triangle[ :, 1 ] + 1.0 ) * 0.5 * buffer.height
+            z = ( triangle[ :, 2 ] + 1.0 ) * 0.5
+            area = ( x[ 1 ] - x[ 0 ] ) * ( y[ 2 ] - y[ 0 ] ) - ( x[ 2 ] - x[ 0 ] ) * ( y[ 1 ] - y[ 0 ] )
+            if area == 0.0:
+                continue
+            for py in xrange( buffer.height ):
+                for px in xrange( buffer.width ):
+                    cx = px + 0.5
+                    cy = py + 0.5
+                    weights = numpy.array( [
+                        ( x[ 1 ] - cx ) * ( y[ 2 ] - cy ) - ( x[ 2 ] - cx ) * ( y[ 1 ] - cy ),
+                        ( x[ 2 ] - cx ) * ( y[ 0 ] - cy ) - ( x[ 0 ] - cx ) * ( y[ 2 ] - cy ),
+                        ( x[ 0 ] - cx ) * ( y[ 1 ] - cy ) - ( x[ 1 ] - cx ) * ( y[ 0 ] - cy ),
+                        ] ) / area
+                    if numpy.all( weights >= 0.0 ):
+                        depths[ py, px ] = min( depths[ py, px ], numpy.dot( weights, z ) )
+        return depths
+
+    def test_rasterize( self ):
+        buffer = OcclusionBuffer( 32, 24 )
+        triangles = numpy.random.uniform( -1.2, 1.2, (30, 3, 3) )
+        triangles[ :, :, 2 ] = numpy.random.uniform( -1.0, 1.0, (30, 3) )
+        buffer.rasterize( self.identity, triangles )
+
+        expected = self.brute_force( buffer, triangles )
+        self.assertTrue( numpy.allclose( buffer.depths, expected ), "Incorrect depths" )
+        self.assertEqual( buffer.rasterized, 30, "Incorrect rasterized count" )
+
+        # rasterising in small chunks gives the same depths
+        chunked = OcclusionBuffer( 32, 24 )
+        chunked.chunk_size = 50
+        chunked.rasterize( self.identity, triangles )
+        self.assertTrue( numpy.allclose( chunked.depths, buffer.depths ), "Incorrect chunked depths" )
+
+        buffer.clear()
+        self.assertTrue( numpy.all( buffer.depths == 1.0 ), "Buffer not cleared" )
+        self.assertEqual( buffer.rasterized, 0, "Rasterized count not cleared" )
+
+    def test_near_plane( self ):
+        buffer = OcclusionBuffer( 16, 16 )
+        # the first vertex is in front of the near plane
+        triangle = numpy.array( [ [ [ -1.0, -1.0, -1.5 ], [ 1.0, -1.0, 0.0 ], [ 0.0, 1.0, 0.0 ] ] ] )
+        buffer.rasterize( self.identity, triangle )
+        self.assertTrue( numpy.all( buffer.depths == 1.0 ), "Triangle crossing near plane rasterised" )
+
+    def test_pyramid( self ):
+        buffer = OcclusionBuffer( 10, 6 )
+        buffer.depths[ : ] = numpy.random.uniform( 0.0, 1.0, (6, 10) )
+        pyramid = buffer.pyramid
+
+        self.assertEqual( [ level.shape for level in pyramid ], [ (6, 10), (3, 5), (2, 3), (1, 2), (1, 1) ], "Incorrect levels" )
+        self.assertEqual( pyramid[ 1 ][ 1, 2 ], buffer.depths[ 2:4, 4:6 ].max(), "Incorrect furthest depth" )
+        self.assertEqual( pyramid[ -1 ][ 0, 0 ], 1.0, "Padding not at far plane" )
+        self.assertTrue( buffer.pyramid is pyramid, "Pyramid not cached" )
+
+    def test_test( self ):
+        buffer = OcclusionBuffer( 64, 32 )
+        # a wall covering the left half of the screen
+        buffer.rasterize( self.identity, quad( -1.0, -1.0, 0.0, 1.0, 0.0 ) )
+
+        aabbs = numpy.array( [
+            # behind the wall
+            box( [ -0.8, -0.5, 0.2 ], [ -0.2, 0.5, 0.6 ] ),
+            # in front of the wall
+            box( [ -0.8, -0.5, -0.6 ], [ -0.2, 0.5, -0.2 ] ),
+            # behind the wall, but extending past its edge
+            box( [ -0.5, -0.5, 0.2 ], [ 0.5, 0.5, 0.6 ] ),
+            # behind the right half of the screen
+            box( [ 0.2, -0.5, 0.2 ], [ 0.8, 0.5, 0.6 ] ),
+            # crossing the near plane
+            box( [ -0.8, -0.5, -2.0 ], [ -0.2, 0.5, 0.6 ] ),
+            # a single pixel behind the wall
+            box( [ -0.51, -0.01, 0.5 ], [ -0.5, 0.0, 0.5 ] ),
+            ] )
+        visible = buffer.test( self.identity, aabbs )
+        self.assertEqual( visible.tolist(), [ False, True, True, True, True, False ], "Incorrect visibility" )
+        self.assertEqual( buffer.tested, 6, "Incorrect tested count" )
+        self.assertEqual( buffer.culled, 2, "Incorrect culled count" )
+
+        # a wall that is moved behind the boxes no longer hides them
+        buffer.clear()
+        buffer.rasterize( self.identity, quad( -1.0, -1.0, 0.0, 1.0, 0.9 ) )
+        self.assertTrue( numpy.all( buffer.test( self.identity, aabbs ) ), "Box hidden by further wall" )
+        self.assertEqual( buffer.culled, 0, "Incorrect culled count" )
+
+    def test_perspective( self ):
+        view = matrix44.create_from_translation( [ 0.0, 0.0, -10.0 ] )
+        projection = matrix44.create_perspective_projection_matrix( 60.0, 2.0, 1.0, 100.0 )
+        matrix = numpy.dot( view, projection )
+
+        buffer = OcclusionBuffer( 64, 32 )
+        # a wall in front of the origin, wound clockwise
+        buffer.rasterize( matrix, quad( -3.0, -3.0, 3.0, 3.0, 2.0 )[ :, ::-1 ] )
+
+        aabbs = numpy.array( [
+            box( [ -1.0, -1.0, -1.0 ], [ 1.0, 1.0, 1.0 ] ),
+            box( [ -1.0, -1.0, 3.0 ], [ 1.0, 1.0, 4.0 ] ),
+            box( [ 20.0, -1.0, -1.0 ], [ 22.0, 1.0, 1.0 ] ),
+            ] )
+        visible = buffer.test( matrix, aabbs )
+        self.assertEqual( visible.tolist(), [ False, True, True ], "Incorrect visibility" )
+
+        # single sided triangles wound clockwise are skipped
+        buffer.clear()
+        buffer.rasterize( matrix, quad( -3.0, -3.0, 3.0, 3.0, 2.0 )[ :, ::-1 ], double_sided = False )
+        self.assertTrue( numpy.all( buffer.depths == 1.0 ), "Back faces rasterised" )
+        buffer.rasterize( matrix, quad( -3.0, -3.0, 3.0, 3.0, 2.0 ), double_sided = False )
+        self.assertEqual( buffer.test( matrix, aabbs ).tolist(), [ False, True, True ], "Front faces not rasterised" )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+import unittest
+
+import numpy
+
+from pyrr import matrix44
+from pygly import frustum
+from pygly import octree
+from pygly.octree import LooseOctree
+
+
+def random_aabbs( count, size = 100.0 ):
+    centres = numpy.random.uniform( -size, size, (count, 3) )
+    extents = numpy.random.uniform( 0.1, 3.0, (count, 3) )
+    return numpy.concatenate(
+        ( ( centres - extents )[ :, numpy.newaxis ], ( centres + extents )[ :, numpy.newaxis ] ),
+        axis = 1
+        )
+
+
+class test_octree( unittest.TestCase ):
+
+    def setUp( self ):
+        numpy.random.seed( 0 )
+        self.aabbs = random_aabbs( 2000 )
+        # some boxes are outside of the octree or too large for it
+        self.aabbs[ :5 ] += 300.0
+        self.aabbs[ 5, 1 ] += 500.0
+
+        self.octree = LooseOctree( [ 0.0, 0.0, 0.0 ], 200.0, max_depth = 4 )
+        self.slots = numpy.array( [
+            self.octree.insert( index, aabb )
+            for index, aabb in enumerate( self.aabbs )
+            ] )
+
+        view = matrix44.create_from_translation( [ 0.0, 0.0, -20.0 ] )
+        projection = matrix44.create_perspective_projection_matrix( 60.0, 1.5, 1.0, 400.0 )
+        self.planes = frustum.planes_from_matrix( numpy.dot( view, projection ) )
+
+    def tearDown( self ):
+        pass
+
+    def assertQueries( self, aabbs, alive = True ):
+        expected = numpy.nonzero( frustum.aabb_mask( self.planes, aabbs ) & alive )[ 0 ]
+        result = self.octree.select( self.octree.frustum( self.planes ) )
+        self.assertTrue( len( expected ) > 0, "Frustum is empty" )
+        self.assertEqual( sorted( result ), expected.tolist(), "Incorrect frustum query" )
+
+        region = numpy.array( [ [ -50.0, -20.0, -30.0 ], [ 10.0, 40.0, 20.0 ] ] )
+        mask = numpy.all( ( aabbs[ :, 0 ] <= region[ 1 ] ) & ( aabbs[ :, 1 ] >= region[ 0 ] ), axis = 1 )
+        expected = numpy.nonzero( mask & alive )[ 0 ]
+        result = self.octree.select( self.octree.aabb( region ) )
+        self.assertEqual( sorted( result ), expected.tolist(), "Incorrect box query" )
+
+        sphere = numpy.array( [ 10.0, -5.0, 20.0, 40.0 ] )
+        nearest = numpy.clip( sphere[ 0:3 ], aabbs[ :, 0 ], aabbs[ :, 1 ] )
+        mask = ( ( nearest - sphere[ 0:3 ] ) ** 2 ).sum( axis = 1 ) <= sphere[ 3 ] ** 2
+        expected = numpy.nonzero( mask & alive )[ 0 ]
+        result = self.octree.select( self.octree.sphere( sphere ) )
+        self.assertEqual( sorted( result ), expected.tolist(), "Incorrect sphere query" )
+
+    def test_morton_codes( self ):
+        coordinates = numpy.random.randint( 0, 1 << 15, (100, 3) )
+        codes = octree.morton_codes( coordinates )
+        self.assertTrue(
+            numpy.array_equal( octree.morton_coordinates( codes ), coordinates ),
+            "Morton codes did not round trip"
+            )
+        self.assertEqual(
+            octree.morton_codes( [ [ 1, 0, 0 ], [ 0, 1, 0 ], [ 0, 0, 1 ] ] ).tolist(),
+            [ 4, 2, 1 ],
+            "Incorrect bit order"
+            )
+
+    def test_cell_keys( self ):
+        keys = self.octree.cell_keys( self.aabbs )
+        self.assertTrue(
+            numpy.all( keys[ :6 ] == LooseOctree.outside ),
+            "Boxes outside of the octree not detected"
+            )
+        self.assertTrue( numpy.all( keys[ 6: ] >= 0 ), "Boxes inside the octree not placed" )
+
+        # a cell's loose bounds contain its boxes
+        tree = self.octree
+        depths = keys[ 6: ] & 15
+        coordinates = octree.morton_coordinates( keys[ 6: ] >> 4 ) >> ( tree.max_depth - depths )[ :, numpy.newaxis ]
+        cell_sizes = ( tree.size / ( 1 << depths ) )[ :, numpy.newaxis ]
+        mins = tree.origin + ( coordinates - 0.5 ) * cell_sizes
+        maxs = tree.origin + ( coordinates + 1.5 ) * cell_sizes
+        self.assertTrue(
+            numpy.all( self.aabbs[ 6:, 0 ] >= mins ) and numpy.all( self.aabbs[ 6:, 1 ] <= maxs ),
+            "Box outside of its cell"
+            )
+
+    def test_query( self ):
+        self.assertEqual( len( self.octree ), 2000, "Incorrect length" )
+        self.assertTrue( 10 in self.octree, "Node missing" )
+        self.assertQueries( self.aabbs )
+
+    def test_update( self ):
+        self.assertQueries( self.aabbs )
+
+        # small movements leave most boxes in their cells
+        moved = self.aabbs + numpy.random.uniform( -0.5, 0.5, (2000, 1, 3) )
+        changed = self.octree.update_slots( self.slots, moved )
+        self.assertTrue( 0 < changed < 1000, "Incorrect number of boxes changed cells" )
+        self.assertQueries( moved )
+
+        # a few boxes move a long way and are stale until re-sorted
+        moved[ ::100 ] = moved[ ::100 ] * -1.0
+        moved[ ::100 ] = numpy.sort( moved[ ::100 ], axis = 1 )
+        self.octree.update( range( 0, 2000, 100 ), moved[ ::100 ] )
+        self.assertTrue( self.octree._stale_count > 0, "Moved boxes not stale" )
+        self.assertQueries( moved )
+
+        self.assertTrue( self.octree.move( 7, moved[ 7 ] + 150.0 ), "Box did not change cells" )
+        moved[ 7 ] += 150.0
+        self.assertTrue( numpy.allclose( self.octree.bounds( 7 ), moved[ 7 ] ), "Incorrect bounds" )
+        self.assertQueries( moved )
+
+    def test_remove( self ):
+        alive = numpy.ones( 2000, dtype = numpy.bool )
+        for index in xrange( 0, 2000, 3 ):
+            self.octree.remove( index )
+            alive[ index ] = False
+        self.assertEqual( len( self.octree ), numpy.count_nonzero( alive ), "Incorrect length" )
+        self.assertQueries( self.aabbs, alive )
+
+        # removed slots are re-used
+        slot = self.octree.insert( 'new', self.aabbs[ 0 ] )
+        self.assertFalse( alive[ slot ], "Slot not re-used" )
+        self.assertRaises( ValueError, self.octree.insert, 'new', self.aabbs[ 0 ] )
+        self.assertRaises( KeyError, self.octree.remove, 0 )
+
+    def test_contained_cell( self ):
+        tree = LooseOctree( [ 0.0, 0.0, 0.0 ], 200.0, max_depth = 4 )
+        aabbs = numpy.array( [
+            # a shallow cell that shares the code of the contained cell
+            [ [ 0.0, 0.0, 0.0 ], [ 120.0, 120.0, 120.0 ] ],
+            # a deeper cell that is partially intersected
+            [ [ -115.0, -115.0, -115.0 ], [ -75.0, -75.0, -75.0 ] ],
+            # the contained cell
+            [ [ -96.0, -96.0, -96.0 ], [ -94.0, -94.0, -94.0 ] ],
+            ] )
+        for index, aabb in enumerate( aabbs ):
+            tree.insert( index, aabb )
+        self.assertEqual( ( tree.cell_keys( aabbs ) & 15 ).tolist(), [ 0, 2, 4 ], "Incorrect depths" )
+
+        result = tree.select( tree.aabb( [ [ -110.0, -110.0, -110.0 ], [ -80.0, -80.0, -80.0 ] ] ) )
+        self.assertEqual( sorted( result ), [ 1, 2 ], "Incorrect box query" )
+
+    def test_empty( self ):
+        empty = LooseOctree( [ 0.0, 0.0, 0.0 ], 100.0 )
+        self.assertEqual( len( empty.frustum( self.planes ) ), 0, "Empty octree returned nodes" )
+        self.assertRaises( ValueError, LooseOctree, [ 0.0, 0.0, 0.0 ], 100.0, looseness = 1.0 )
+
+
+if __name__ == '__main__':
+    unittest.main()
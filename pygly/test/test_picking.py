@@ -0,0 +1,190 @@
+import unittest
+
+import numpy
+
+from pyrr import matrix44
+from pygly.bvh import BVH
+from pygly.picking import Picker, ray_triangles, transform_rays
+from pygly import affine
+
+
+class test_picking( unittest.TestCase ):
+
+    def setUp( self ):
+        numpy.random.seed( 0 )
+
+        # a small mesh and a mesh with its own hierarchy
+        self.meshes = [
+            numpy.random.uniform( -1.0, 1.0, (20, 3, 3) ),
+            numpy.random.uniform( -1.0, 1.0, (500, 3, 3) ),
+            ]
+
+        count = 60
+        self.mesh_indices = numpy.random.randint( 0, 2, count )
+        self.matrices = numpy.array( [
+            reduce( matrix44.multiply, [
+                matrix44.create_from_x_rotation( numpy.random.uniform( -numpy.pi, numpy.pi ) ),
+                matrix44.create_from_y_rotation( numpy.random.uniform( -numpy.pi, numpy.pi ) ),
+                matrix44.create_from_translation( numpy.random.uniform( -10.0, 10.0, 3 ) ),
+                ] )
+            for index in xrange( count )
+            ] )
+        self.matrices[ :, 0:3, 0:3 ] *= numpy.random.uniform( 0.5, 2.0, (count, 1, 1) )
+
+        local_bounds = numpy.array( [
+            [ mesh.reshape( -1, 3 ).min( axis = 0 ), mesh.reshape( -1, 3 ).max( axis = 0 ) ]
+            for mesh in self.meshes
+            ] )
+        self.bvh = BVH( affine.transform_aabbs( local_bounds[ self.mesh_indices ], self.matrices ) )
+
+    def tearDown( self ):
+        pass
+
+    def test_ray_triangles( self ):
+        triangles = numpy.array( [
+            [ [ 0.0, 0.0, 0.0 ], [ 1.0, 0.0, 0.0 ], [ 0.0, 1.0, 0.0 ] ],
+            [ [ 0.0, 0.0, -2.0 ], [ 0.0, 1.0, -2.0 ], [ 1.0, 0.0, -2.0 ] ],
+            [ [ 5.0, 5.0, -1.0 ], [ 6.0, 5.0, -1.0 ], [ 5.0, 6.0, -1.0 ] ],
+            [ [ 0.0, 0.0, -1.0 ], [ 0.0, 1.0, -1.0 ], [ 0.0, 0.0, -2.0 ] ],
+            ] )
+        ray = numpy.array( [ [ 0.25, 0.5, 1.0 ], [ 0.0, 0.0, -1.0 ] ] )
+        distances, barycentrics = ray_triangles( ray, triangles )
+
+        self.assertTrue( numpy.allclose( distances[ 0:2 ], [ 1.0, 3.0 ] ), "Incorrect distances" )
+        self.assertTrue( numpy.all( numpy.isinf( distances[ 2: ] ) ), "Missed triangles hit" )
+        self.assertTrue( numpy.allclose( barycentrics[ 0 ], [ 0.25, 0.5 ] ), "Incorrect barycentrics" )
+        self.assertTrue( numpy.allclose( barycentrics[ 1 ], [ 0.5, 0.25 ] ), "Incorrect barycentrics" )
+
+        distances, barycentrics = ray_triangles( ray, triangles, max_distance = 2.0 )
+        self.assertTrue( numpy.isinf( distances[ 1 ] ), "Distant triangle hit" )
+
+    def test_transform_rays( self ):
+        ray = numpy.array( [ [ 1.0, 2.0, 3.0 ], [ 0.0, 1.0, 1.0 ] ] )
+        transformed = transform_rays( ray, self.matrices )
+        self.assertEqual( transformed.shape, (60, 2, 3), "Incorrect shape" )
+
+        point = numpy.append( ray[ 0 ] + ray[ 1 ] * 2.5, 1.0 )
+        for matrix, transformed_ray in zip( self.matrices, transformed ):
+            expected = numpy.dot( point, matrix )[ 0:3 ]
+            self.assertTrue(
+                numpy.allclose( transformed_ray[ 0 ] + transformed_ray[ 1 ] * 2.5, expected ),
+                "Distances not preserved"
+                )
+
+        single = transform_rays( ray, self.matrices[ 0 ] )
+        self.assertTrue( numpy.allclose( single, transformed[ 0 ] ), "Incorrect single ray" )
+
+    def brute_force( self, ray ):
+        nearest = None
+        for index, matrix in enumerate( self.matrices ):
+            mesh = self.meshes[ self.mesh_indices[ index ] ]
+            vertices = numpy.dot( mesh.reshape( -1, 3 ), matrix[ 0:3, 0:3 ] ) + matrix[ 3, 0:3 ]
+            distances, barycentrics = ray_triangles( ray, vertices.reshape( -1, 3, 3 ) )
+            triangle = numpy.argmin( distances )
+            if distances[ triangle ] < numpy.inf and ( nearest is None or distances[ triangle ] < nearest[ 1 ] ):
+                nearest = ( index, distances[ triangle ], triangle, barycentrics[ triangle ] )
+        return nearest
+
+    def test_pick( self ):
+        picker = Picker( self.meshes )
+        hits = 0
+        for index in xrange( 40 ):
+            origin = numpy.random.uniform( -20.0, 20.0, 3 )
+            target = numpy.random.uniform( -8.0, 8.0, 3 )
+            ray = numpy.array( [ origin, ( target - origin ) / numpy.linalg.norm( target - origin ) ] )
+
+            expected = self.brute_force( ray )
+            hit = picker.pick( ray, self.bvh, self.mesh_indices, self.matrices )
+            if expected is None:
+                self.assertTrue( hit is None, "Ray hit nothing" )
+                continue
+
+            hits += 1
+            self.assertEqual( hit[ 0 ], expected[ 0 ], "Incorrect node" )
+            self.assertTrue( numpy.isclose( hit[ 1 ], expected[ 1 ] ), "Incorrect distance" )
+            self.assertEqual( hit[ 2 ], expected[ 2 ], "Incorrect triangle" )
+            self.assertTrue( numpy.allclose( hit[ 3 ], expected[ 3 ] ), "Incorrect barycentrics" )
+
+        self.assertTrue( hits > 10, "Too few rays hit" )
+        self.assertTrue(
+            numpy.array_equal( picker.mesh_clusters[ :, 1 ], [ 1, 16 ] ),
+            "Incorrect cluster counts"
+            )
+
+    def test_intersect( self ):
+        picker = Picker( self.meshes )
+        rays = numpy.array( [
+            [ [ 0.0, 0.0, 5.0 ], [ 0.0, 0.0, -1.0 ] ],
+            [ [ 0.0, 0.0, 5.0 ], [ 0.0, 0.0, 1.0 ] ],
+            [ [ 0.1, 0.2, -5.0 ], [ 0.0, 0.0, 1.0 ] ],
+            ] )
+        meshes = numpy.array( [ 1, 1, 0 ] )
+        triangles, distances, barycentrics = picker.intersect( rays, meshes )
+
+        for index, ( ray, mesh ) in enumerate( zip( rays, meshes ) ):
+            expected, expected_barycentrics = ray_triangles( ray, self.meshes[ mesh ] )
+            nearest = numpy.argmin( expected )
+            if expected[ nearest ] == numpy.inf:
+                self.assertEqual( triangles[ index ], -1, "Missed ray hit a triangle" )
+                self.assertEqual( distances[ index ], numpy.inf, "Missed ray has a distance" )
+            else:
+                self.assertEqual( triangles[ index ], nearest, "Incorrect triangle" )
+                self.assertTrue( numpy.isclose( distances[ index ], expected[ nearest ] ), "Incorrect distance" )
+                self.assertTrue(
+                    numpy.allclose( barycentrics[ index ], expected_barycentrics[ nearest ] ),
+                    "Incorrect barycentrics"
+                    )
+        self.assertEqual( triangles[ 1 ], -1, "Ray facing away hit a triangle" )
+
+    def test_pick_world_space( self ):
+        triangles = numpy.array( [
+            [ [ [ -1.0, -1.0, -5.0 ], [ 1.0, -1.0, -5.0 ], [ 0.0, 1.0, -5.0 ] ] ],
+            [ [ [ -1.0, -1.0, -3.0 ], [ 1.0, -1.0, -3.0 ], [ 0.0, 1.0, -3.0 ] ] ],
+            ] )
+        bounds = numpy.array( [ [ mesh[ 0 ].min( axis = 0 ), mesh[ 0 ].max( axis = 0 ) ] for mesh in triangles ] )
+        picker = Picker( triangles )
+        ray = numpy.array( [ [ 0.0, 0.0, 0.0 ], [ 0.0, 0.0, -1.0 ] ] )
+
+        index, distance, triangle, barycentrics = picker.pick( ray, BVH( bounds ) )
+        self.assertEqual( index, 1, "Incorrect node" )
+        self.assertTrue( numpy.isclose( distance, 3.0 ), "Incorrect distance" )
+        self.assertTrue(
+            picker.pick( ray, BVH( bounds ), max_distance = 2.0 ) is None,
+            "Hit beyond the maximum distance"
+            )
+
+        # a scene with a single node
+        hit = picker.pick( ray, BVH( bounds[ :1 ] ) )
+        self.assertEqual( hit[ 0 ], 0, "Incorrect node" )
+        self.assertTrue( numpy.isclose( hit[ 1 ], 5.0 ), "Incorrect distance" )
+
+    def test_pick_mixed_scale( self ):
+        # a small sheared node in front of a large scale node
+        triangle = numpy.array( [ [ [ -1.0, -1.0, 0.0 ], [ 1.0, -1.0, 0.0 ], [ 0.0, 1.0, 0.0 ] ] ] )
+        matrices = numpy.array( [ numpy.eye( 4 ), numpy.eye( 4 ) ] )
+        matrices[ 0, 0:3, 0:3 ] *= 1000.0
+        matrices[ 0, 3, 0:3 ] = [ 0.0, 0.0, -100.0 ]
+        matrices[ 1, 1, 0 ] = 2.0
+        matrices[ 1, 0:3, 0:3 ] *= 0.01
+        matrices[ 1, 3, 0:3 ] = [ 0.0, 0.0, -5.0 ]
+
+        vertices = numpy.dot( triangle[ 0 ], matrices[ 1, 0:3, 0:3 ] ) + matrices[ 1, 3, 0:3 ]
+        bounds = affine.transform_aabbs(
+            numpy.array( [ [ triangle[ 0 ].min( axis = 0 ), triangle[ 0 ].max( axis = 0 ) ] ] * 2 ),
+            matrices
+            )
+        picker = Picker( triangle )
+
+        # aim at a point only inside the sheared triangle
+        target = numpy.dot( [ 0.5, 0.2, 0.3 ], vertices )
+        ray = numpy.array( [ [ target[ 0 ], target[ 1 ], 0.0 ], [ 0.0, 0.0, -1.0 ] ] )
+        index, distance, triangle_index, barycentrics = picker.pick(
+            ray, BVH( bounds ), numpy.array( [ 0, 0 ] ), matrices
+            )
+        self.assertEqual( index, 1, "Incorrect node" )
+        self.assertTrue( numpy.isclose( distance, 5.0 ), "Incorrect distance" )
+        self.assertTrue( numpy.allclose( barycentrics, [ 0.2, 0.3 ] ), "Incorrect barycentrics" )
+
+
+if __name__ == '__main__':
+    unittest.main()
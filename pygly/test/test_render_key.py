@@ -0,0 +1,57 @@
+import unittest
+
+import numpy
+
+from pygly import render_key
+
+
+class test_render_key( unittest.TestCase ):
+
+    def setUp( self ):
+        pass
+
+    def tearDown( self ):
+        pass
+
+    def test_order( self ):
+        passes = [ 1, 0, 0, 0, 0, 0 ]
+        translucent = [ False, True, True, False, False, False ]
+        shaders = [ 0, 1, 0, 2, 1, 1 ]
+        materials = [ 0, 0, 0, 0, 5, 3 ]
+        depths = [ 1.0, 2.0, 8.0, 1.0, 1.0, 9.0 ]
+
+        keys = render_key.create_keys( passes, translucent, shaders, materials, depths, 0.0, 10.0 )
+        self.assertEqual( keys.dtype, numpy.uint64, "Incorrect key type" )
+
+        # opaque by shader and material, then translucent back to front,
+        # then the next pass
+        expected = [ 5, 4, 3, 2, 1, 0 ]
+        for order in [ render_key.sort_keys( keys ), render_key.radix_argsort( keys ) ]:
+            self.assertEqual( list( order ), expected, "Incorrect draw order" )
+
+        unpacked = render_key.unpack_keys( keys )
+        for values, expected in zip( unpacked[ :4 ], [ passes, translucent, shaders, materials ] ):
+            self.assertEqual( list( values ), list( expected ), "Incorrect unpacked values" )
+
+    def test_radix_argsort( self ):
+        keys = numpy.random.randint( 0, 2 ** 62, 1000 ).astype( numpy.uint64 )
+        keys[ :10 ] = keys[ 10:20 ]
+        self.assertTrue(
+            numpy.array_equal(
+                render_key.radix_argsort( keys ),
+                numpy.argsort( keys, kind = 'mergesort' )
+                ),
+            "Incorrect order"
+            )
+
+    def test_overflow( self ):
+        self.assertRaises(
+            ValueError,
+            render_key.create_keys,
+            0, False, 2 ** render_key.shader_bits, 0, 0.0, 0.0, 1.0
+            )
+
+
+if __name__ == '__main__':
+    unittest.main()
+
@@ -0,0 +1,122 @@
+import unittest
+import math
+import os
+
+import numpy
+
+from pygly.scene_node import SceneNode
+from pygly.replication import ReplicationEncoder, ReplicationDecoder
+from pygly.replication import quantize_quaternions, dequantize_quaternions
+
+
+def structure( node ):
+    return (
+        node.name,
+        sorted( [ structure( child ) for child in node.children ] )
+        )
+
+def assert_replicated( test, node, replica ):
+    test.assertEqual( structure( node ), structure( replica ), "Structure incorrect" )
+
+    originals = dict( [ (item.name, item) for item in node.dfs() ] )
+    for item in replica.dfs():
+        original = originals[ item.name ]
+        test.assertTrue(
+            numpy.allclose( item.transform.translation, original.transform.translation ),
+            "Translation incorrect"
+            )
+        test.assertTrue(
+            numpy.allclose( item.transform.scale, original.transform.scale ),
+            "Scale incorrect"
+            )
+        test.assertTrue(
+            abs( numpy.dot( item.transform.orientation, original.transform.orientation ) ) > 0.9999,
+            "Orientation incorrect"
+            )
+
+
+class test_replication( unittest.TestCase ):
+
+    def setUp( self ):
+        self.root = SceneNode( 'root' )
+        self.a = SceneNode( 'a' )
+        self.b = SceneNode( 'b' )
+        self.c = SceneNode( 'c' )
+        self.root.add_child( self.a )
+        self.root.add_child( self.b )
+        self.a.add_child( self.c )
+
+        self.a.transform.translation = [ 1.0, 2.0, 3.0 ]
+        self.b.transform.object.rotate_y( math.pi / 3.0 )
+        self.c.transform.scale = [ 2.0, 2.0, 2.0 ]
+
+        self.encoder = ReplicationEncoder( self.root )
+        self.decoder = ReplicationDecoder()
+
+    def tearDown( self ):
+        pass
+
+    def test_quantize( self ):
+        quaternions = numpy.random.normal( size = (100, 4) )
+        quaternions /= numpy.sqrt( ( quaternions ** 2 ).sum( axis = 1 ) )[ :, numpy.newaxis ]
+
+        result = dequantize_quaternions( quantize_quaternions( quaternions ) )
+        dots = numpy.abs( ( result * quaternions ).sum( axis = 1 ) )
+        self.assertTrue( numpy.all( dots > 0.9999 ), "Quaternions not preserved" )
+
+    def test_initial( self ):
+        self.decoder.decode( self.encoder.encode() )
+        assert_replicated( self, self.root, self.decoder.root )
+
+    def test_changes( self ):
+        full = self.encoder.encode()
+        self.decoder.decode( full )
+
+        # an unchanged scene sends an empty frame
+        empty = self.encoder.encode()
+        self.assertTrue( len( empty ) < 32, "Unchanged frame too large" )
+
+        self.c.transform.translation = [ 5.0, 0.0, 0.0 ]
+        frame = self.encoder.encode()
+        self.assertTrue( len( frame ) < len( full ), "Delta frame too large" )
+        self.decoder.decode( frame )
+        assert_replicated( self, self.root, self.decoder.root )
+
+        # structural changes
+        d = SceneNode( 'd' )
+        d.transform.translation = [ 0.0, 1.0, 0.0 ]
+        self.b.add_child( d )
+        self.a.remove_child( self.c )
+        self.b.add_child( self.c )
+        self.root.remove_child( self.a )
+        self.decoder.decode( self.encoder.encode() )
+        assert_replicated( self, self.root, self.decoder.root )
+
+        # swap a parent and child
+        self.root.remove_child( self.b )
+        self.b.remove_child( d )
+        self.root.add_child( d )
+        d.add_child( self.b )
+        self.decoder.decode( self.encoder.encode() )
+        assert_replicated( self, self.root, self.decoder.root )
+
+    def test_stream( self ):
+        read, write = os.pipe()
+        read = os.fdopen( read, 'rb' )
+        write = os.fdopen( write, 'wb' )
+        try:
+            write.write( self.encoder.encode() )
+            self.b.transform.translation = [ 0.0, 0.0, 1.0 ]
+            write.write( self.encoder.encode() )
+            write.close()
+
+            self.decoder.read( read )
+            self.decoder.read( read )
+            assert_replicated( self, self.root, self.decoder.root )
+            self.assertRaises( EOFError, self.decoder.read, read )
+        finally:
+            read.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+import math
+
+import numpy
+
+from pygly.scene_node import SceneNode
+from pygly.scene_diff import snapshot, diff
+
+
+def structure( root ):
+    return sorted( [
+        (node.name, node.parent.name if node.parent else None)
+        for node in root.dfs()
+        ] )
+
+
+class test_scene_diff( unittest.TestCase ):
+
+    def setUp( self ):
+        self.root = SceneNode( 'root' )
+        self.a = SceneNode( 'a' )
+        self.b = SceneNode( 'b' )
+        self.c = SceneNode( 'c' )
+        self.d = SceneNode( 'd' )
+        self.root.add_child( self.a )
+        self.root.add_child( self.b )
+        self.a.add_child( self.c )
+        self.c.add_child( self.d )
+
+        self.a.transform.translation = [ 1.0, 0.0, 0.0 ]
+        self.b.transform.object.rotate_y( math.pi / 4.0 )
+
+    def tearDown( self ):
+        pass
+
+    def test_empty( self ):
+        patch = diff( snapshot( self.root ), snapshot( self.root ) )
+        self.assertTrue( patch.is_empty, "Patch not empty" )
+
+    def test_diff( self ):
+        before = snapshot( self.root )
+        before_structure = structure( self.root )
+
+        e = SceneNode( 'e' )
+        self.b.add_child( e )
+        self.a.remove_child( self.c )
+        self.b.add_child( self.c )
+        self.root.remove_child( self.a )
+        self.b.transform.translation = [ 0.0, 3.0, 0.0 ]
+
+        after = snapshot( self.root )
+        patch = diff( before, after )
+
+        self.assertEqual( patch.added, [ e ], "Added nodes incorrect" )
+        self.assertEqual( patch.removed, [ self.a ], "Removed nodes incorrect" )
+        self.assertEqual( patch.moved, [ self.c ], "Moved nodes incorrect" )
+        self.assertEqual( set( patch.transformed ), set( [ self.b, e ] ), "Transformed nodes incorrect" )
+
+        # undo
+        diff( after, before ).apply()
+        self.assertEqual( structure( self.root ), before_structure, "Structure not restored" )
+        self.assertTrue(
+            numpy.allclose( self.b.transform.translation, [ 0.0, 0.0, 0.0 ] ),
+            "Transform not restored"
+            )
+        self.assertTrue( diff( before, snapshot( self.root ) ).is_empty, "State not restored" )
+
+        # redo
+        diff( before, after ).apply()
+        self.assertTrue( diff( after, snapshot( self.root ) ).is_empty, "State not re-applied" )
+
+    def test_tolerance( self ):
+        before = snapshot( self.root )
+        self.a.transform.translation = [ 1.0 + 1.0e-9, 0.0, 0.0 ]
+        self.assertTrue( diff( before, snapshot( self.root ) ).is_empty, "Tolerance ignored" )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+import math
+
+import numpy
+
+from pygly.transform_array import TransformArray
+from pygly.scene_fork import SceneFork
+from pygly.test.test_transform_array import create_scene
+
+
+class test_scene_fork( unittest.TestCase ):
+
+    def setUp( self ):
+        pass
+
+    def tearDown( self ):
+        pass
+
+    def test_shared( self ):
+        root, a, b, c = create_scene()
+        array = TransformArray( root )
+
+        fork = SceneFork( array )
+        self.assertEqual( len( fork.modified ), 0, "Fork has modifications" )
+        for node in [ root, a, b, c ]:
+            self.assertTrue(
+                numpy.allclose( fork.world_matrix( node ), node.world_transform.matrix ),
+                "Unmodified world matrix incorrect"
+                )
+
+    def test_modify( self ):
+        root, a, b, c = create_scene()
+        array = TransformArray( root )
+        original = array.world_matrices.copy()
+
+        fork = SceneFork( array )
+        fork.set_local( a, translation = [ 5.0, 0.0, 0.0 ] )
+        nested = fork.fork()
+        nested.set_local( b, scale = [ 3.0, 3.0, 3.0 ] )
+
+        # the array is unchanged
+        self.assertTrue(
+            numpy.array_equal( array.world_matrices, original ),
+            "Array modified"
+            )
+
+        # compare against the real scene
+        a.transform.translation = [ 5.0, 0.0, 0.0 ]
+        self.assertTrue(
+            numpy.allclose( fork.world_matrix( c ), c.world_transform.matrix ),
+            "Child of modified node incorrect"
+            )
+        self.assertTrue(
+            numpy.allclose( fork.world_matrix( b ), b.world_transform.matrix ),
+            "Sibling of modified node incorrect"
+            )
+
+        b.transform.scale = [ 3.0, 3.0, 3.0 ]
+        expected = numpy.array( [
+            node.world_transform.matrix for node in array.nodes
+            ] )
+        self.assertTrue(
+            numpy.allclose( nested.world_matrices, expected ),
+            "Nested fork incorrect"
+            )
+
+        modified = nested.commit()
+        self.assertEqual( len( modified ), 2, "Incorrect modified nodes" )
+        self.assertTrue(
+            numpy.allclose( array.world_matrices, expected ),
+            "Commit incorrect"
+            )
+        array.update()
+        self.assertTrue(
+            numpy.allclose( array.world_matrices, expected ),
+            "Commit values incorrect"
+            )
+
+
+if __name__ == '__main__':
+    unittest.main()
+
@@ -8,7 +8,7 @@ import math
 from pyrr import matrix44
 from pyrr import vector3
 from pyrr import quaternion
-from pygly.scene_node import SceneNode
+from pygly.scene_node import SceneNode, reparent
 
 
 def test_axis( unittest, transform_space, matrix ):
@@ -385,6 +385,48 @@ class test_list( unittest.TestCase ):
         test_translation( self, child.world_transform, [-1.0, 1.0,-1.0] )
 
 
+    def test_reparent( self ):
+        root = SceneNode( '/root' )
+        group = SceneNode( '/group' )
+        child1 = SceneNode( '/child1' )
+        child2 = SceneNode( '/child2' )
+
+        root.add_child( group )
+        root.add_child( child1 )
+        root.add_child( child2 )
+
+        group.transform.translation = [ 5.0, 0.0, 0.0 ]
+        group.transform.object.rotate_y( math.pi / 2.0 )
+        group.transform.scale = [ 2.0, 2.0, 2.0 ]
+        child1.transform.translation = [ 1.0, 2.0, 3.0 ]
+        child2.transform.object.rotate_x( math.pi / 4.0 )
+
+        child1_world = child1.world_transform.matrix.copy()
+        child2_world = child2.world_transform.matrix.copy()
+
+        reparent( [ child1, child2 ], group )
+
+        self.assertTrue( child1.parent is group, "Parent not set correctly" )
+        self.assertTrue( child2.parent is group, "Parent not set correctly" )
+        self.assertTrue(
+            numpy.allclose( child1.world_transform.matrix, child1_world ),
+            "World matrix not preserved"
+            )
+        self.assertTrue(
+            numpy.allclose( child2.world_transform.matrix, child2_world ),
+            "World matrix not preserved"
+            )
+
+        # move back without preserving the world transform
+        child1.reparent( root, keep_world = False )
+        self.assertTrue( child1.parent is root, "Parent not set correctly" )
+        self.assertTrue(
+            numpy.allclose( child1.world_transform.matrix, child1.transform.matrix ),
+            "Local transform modified"
+            )
+
+        self.assertRaises( ValueError, group.reparent, child2 )
+
 
 if __name__ == '__main__':
     unittest.main()
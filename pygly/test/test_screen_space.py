@@ -0,0 +1,103 @@
+import unittest
+
+import numpy
+
+from pyrr import matrix44
+from pygly import screen_space
+
+
+class rect_viewport( object ):
+
+    def __init__( self, rect ):
+        self.rect = numpy.array( rect )
+
+
+class test_screen_space( unittest.TestCase ):
+
+    def setUp( self ):
+        numpy.random.seed( 0 )
+        view = matrix44.multiply(
+            matrix44.create_from_translation( [ 1.0, -2.0, -30.0 ] ),
+            matrix44.create_from_y_rotation( 0.3 )
+            )
+        projection = matrix44.create_perspective_projection_matrix( 60.0, 1.5, 1.0, 100.0 )
+        self.matrix = numpy.dot( view, projection )
+        self.rect = numpy.array( [ [ 10, 20 ], [ 600, 400 ] ] )
+        self.points = numpy.random.uniform( -30.0, 30.0, (500, 3) )
+
+    def tearDown( self ):
+        pass
+
+    def test_project( self ):
+        pixels, depths, visible = screen_space.project( self.matrix, self.rect, self.points )
+        self.assertEqual( pixels.shape, (500, 2), "Incorrect pixels shape" )
+        self.assertTrue( visible.any() and not visible.all(), "Test points not partially visible" )
+
+        for point, pixel, depth, is_visible in zip( self.points, pixels, depths, visible ):
+            clip = numpy.dot( numpy.append( point, 1.0 ), self.matrix )
+            ndc = clip[ 0:3 ] / clip[ 3 ]
+            self.assertEqual(
+                is_visible,
+                clip[ 3 ] > 0.0 and numpy.all( numpy.abs( ndc ) <= 1.0 ),
+                "Incorrect visibility"
+                )
+            if is_visible:
+                expected = self.rect[ 0 ] + ( ndc[ 0:2 ] + 1.0 ) * 0.5 * self.rect[ 1 ]
+                self.assertTrue( numpy.allclose( pixel, expected ), "Incorrect pixel" )
+                self.assertTrue( numpy.isclose( depth, ( ndc[ 2 ] + 1.0 ) * 0.5 ), "Incorrect depth" )
+                self.assertTrue( 0.0 <= depth <= 1.0, "Depth out of range" )
+
+        # viewports are used through their rect
+        viewport_pixels = screen_space.project( self.matrix, rect_viewport( self.rect ), self.points )[ 0 ]
+        self.assertTrue( numpy.allclose( viewport_pixels[ visible ], pixels[ visible ] ), "Viewport not used" )
+
+    def test_unproject( self ):
+        pixels, depths, visible = screen_space.project( self.matrix, self.rect, self.points )
+        points = screen_space.unproject( self.matrix, self.rect, pixels[ visible ], depths[ visible ] )
+        self.assertTrue( numpy.allclose( points, self.points[ visible ] ), "Unproject not inverse of project" )
+
+        # a single depth for every pixel
+        points = screen_space.unproject( self.matrix, self.rect, pixels[ visible ], 0.0 )
+        depths = screen_space.project( self.matrix, self.rect, points )[ 1 ]
+        self.assertTrue( numpy.allclose( depths, 0.0 ), "Incorrect single depth" )
+
+    def test_rays( self ):
+        pixels, depths, visible = screen_space.project( self.matrix, self.rect, self.points )
+        rays = screen_space.rays( self.matrix, self.rect, pixels[ visible ] )
+        self.assertEqual( rays.shape, (visible.sum(), 2, 3), "Incorrect rays shape" )
+        self.assertTrue(
+            numpy.allclose( numpy.sqrt( ( rays[ :, 1 ] ** 2 ).sum( axis = 1 ) ), 1.0 ),
+            "Directions not normalised"
+            )
+
+        # each ray passes through its point
+        offsets = self.points[ visible ] - rays[ :, 0 ]
+        along = ( offsets * rays[ :, 1 ] ).sum( axis = 1 )
+        self.assertTrue( numpy.all( along > 0.0 ), "Point behind ray" )
+        self.assertTrue(
+            numpy.allclose( offsets - along[ :, numpy.newaxis ] * rays[ :, 1 ], 0.0 ),
+            "Ray misses point"
+            )
+
+    def test_rectangle_mask( self ):
+        pixels, depths, visible = screen_space.project( self.matrix, self.rect, self.points )
+        rect = numpy.array( [ [ 100.0, 100.0 ], [ 250.0, 200.0 ] ] )
+        expected = visible & numpy.all( ( pixels >= rect[ 0 ] ) & ( pixels <= rect[ 0 ] + rect[ 1 ] ), axis = 1 )
+        self.assertTrue( expected.any(), "No points in test rectangle" )
+
+        mask = screen_space.rectangle_mask( self.matrix, self.rect, self.points, rect )
+        self.assertTrue( numpy.array_equal( mask, expected ), "Incorrect selection" )
+
+        # dragging from the opposite corner selects the same points
+        flipped = numpy.array( [ rect[ 0 ] + rect[ 1 ], -rect[ 1 ] ] )
+        mask = screen_space.rectangle_mask( self.matrix, self.rect, self.points, flipped )
+        self.assertTrue( numpy.array_equal( mask, expected ), "Incorrect selection with negative size" )
+
+        # points behind the camera are never selected
+        behind = numpy.array( [ [ -1.0, 2.0, 60.0 ] ] )
+        mask = screen_space.rectangle_mask( self.matrix, self.rect, behind, [ [ -1e6, -1e6 ], [ 2e6, 2e6 ] ] )
+        self.assertFalse( mask[ 0 ], "Point behind camera selected" )
+
+
+if __name__ == '__main__':
+    unittest.main()
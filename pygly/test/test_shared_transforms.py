@@ -0,0 +1,139 @@
+import unittest
+import math
+import multiprocessing
+
+import numpy
+
+from pygly.scene_node import SceneNode
+from pygly.transform_array import TransformArray
+from pygly.shared_transforms import SharedTransforms, SharedTransformsView
+
+
+def read_and_write( name, index, queue ):
+    # runs in another process
+    view = SharedTransformsView( name )
+    try:
+        queue.put( view.read()[ 3 ] )
+        view.write( index, index + 1, translations = [ [ 1.0, 2.0, 3.0 ] ] )
+    finally:
+        view.close()
+
+
+class test_shared_transforms( unittest.TestCase ):
+
+    def setUp( self ):
+        self.root = SceneNode( 'root' )
+        self.children = []
+        for index in range( 4 ):
+            child = SceneNode( 'child' )
+            child.transform.translation = [ index, 0.0, 0.0 ]
+            self.root.add_child( child )
+            self.children.append( child )
+        self.root.transform.object.rotate_y( math.pi / 2.0 )
+
+        self.array = TransformArray( self.root )
+        self.shared = SharedTransforms( self.array )
+        self.view = SharedTransformsView( self.shared.name )
+
+    def tearDown( self ):
+        self.view.close()
+        self.shared.close()
+
+    def test_read( self ):
+        self.assertEqual( self.view.count, len( self.array ), "Count incorrect" )
+        self.assertTrue(
+            numpy.array_equal( self.view.parents, self.array.parents ),
+            "Parents incorrect"
+            )
+
+        translations, orientations, scales, world_matrices = self.view.read()
+        self.assertTrue(
+            numpy.allclose( world_matrices, self.array.world_matrices ),
+            "World matrices incorrect"
+            )
+
+        # zero copy views see new values
+        sequence = self.view.begin_read()
+        self.array.translations[ 1 ] = [ 9.0, 9.0, 9.0 ]
+        self.array.update()
+        self.shared.publish()
+
+        self.assertFalse( self.view.end_read( sequence ), "Change not detected" )
+        self.assertTrue(
+            numpy.allclose( self.view.world_matrices, self.array.world_matrices ),
+            "View not updated"
+            )
+
+    def test_write( self ):
+        child = self.children[ 2 ]
+        index = self.array.index( child )
+
+        self.view.write(
+            index,
+            index + 1,
+            translations = [ [ 1.0, 2.0, 3.0 ] ]
+            )
+
+        changed = self.shared.collect()
+        self.assertEqual( list( changed ), [ index ], "Changed nodes incorrect" )
+        self.assertTrue(
+            numpy.allclose( child.transform.translation, [ 1.0, 2.0, 3.0 ] ),
+            "Node not updated"
+            )
+
+        # values are only collected once
+        changed = self.shared.collect()
+        self.assertEqual( len( changed ), 0, "Values collected twice" )
+
+    def test_structure( self ):
+        self.view.write( 1, 2, translations = [ [ 1.0, 2.0, 3.0 ] ] )
+
+        # a new structure with the same number of nodes
+        self.root.remove_child( self.children[ 0 ] )
+        self.root.add_child( SceneNode( 'new' ) )
+        self.array.rebuild()
+        self.shared.publish()
+
+        self.assertEqual( self.view.count, len( self.array ), "Count incorrect" )
+        self.assertEqual( len( self.shared.collect() ), 0, "Values for old structure collected" )
+
+    def test_timeout( self ):
+        # an odd sequence while the owner is writing
+        header = self.shared._arrays[ 'header' ]
+        header[ 0 ] += 1
+        self.view.timeout = 0.01
+        try:
+            self.assertRaises( RuntimeError, self.view.read )
+        finally:
+            header[ 0 ] += 1
+        self.assertEqual( len( self.view.read() ), 4, "Read failed after publish" )
+
+    def test_process( self ):
+        child = self.children[ 1 ]
+        index = self.array.index( child )
+
+        queue = multiprocessing.Queue()
+        process = multiprocessing.Process(
+            target = read_and_write,
+            args = ( self.shared.name, index, queue )
+            )
+        process.start()
+        try:
+            world_matrices = queue.get( timeout = 10.0 )
+        finally:
+            process.join( 10.0 )
+        self.assertEqual( process.exitcode, 0, "Process failed" )
+
+        self.assertTrue(
+            numpy.allclose( world_matrices, self.array.world_matrices ),
+            "Other process read incorrect values"
+            )
+        self.assertEqual( list( self.shared.collect() ), [ index ], "Other process write not collected" )
+        self.assertTrue(
+            numpy.allclose( child.transform.translation, [ 1.0, 2.0, 3.0 ] ),
+            "Node not updated"
+            )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+import unittest
+
+import numpy
+
+from pygly import sort
+
+
+class test_sort( unittest.TestCase ):
+
+    def setUp( self ):
+        pass
+
+    def tearDown( self ):
+        pass
+
+    def test_argsort_keys( self ):
+        values = numpy.array( [ 3.0, -1.5, 0.0, 1.0e10, -2.0e-8, 7.25, -3.0 ] )
+
+        indices = sort.argsort_keys( values.copy() )
+        self.assertTrue(
+            numpy.array_equal( indices, numpy.argsort( values ) ),
+            "Incorrect front to back order"
+            )
+
+        indices = sort.argsort_keys( values.copy(), back_to_front = True )
+        self.assertTrue(
+            numpy.array_equal( indices, numpy.argsort( values )[ ::-1 ] ),
+            "Incorrect back to front order"
+            )
+
+    def test_plane_indices( self ):
+        positions = numpy.random.uniform( -100.0, 100.0, (500, 3) )
+        render_position = numpy.array( [ 1.0, 2.0, 3.0 ] )
+        render_direction = numpy.array( [ 0.0, 0.0, -1.0 ] )
+        expected = numpy.argsort( numpy.dot( positions - render_position, render_direction ) )
+
+        keys = numpy.empty( 1000, dtype = numpy.float64 )
+        indices = numpy.empty( 1000, dtype = numpy.int64 )
+        result = sort.sort_plane_indices(
+            render_position,
+            render_direction,
+            positions,
+            keys = keys,
+            indices = indices
+            )
+        self.assertTrue( numpy.may_share_memory( result, indices ), "Buffer not used" )
+        self.assertTrue( numpy.array_equal( result, expected ), "Incorrect order" )
+
+        result = sort.sort_plane_indices(
+            render_position,
+            render_direction,
+            positions,
+            back_to_front = True
+            )
+        self.assertTrue( numpy.array_equal( result, expected[ ::-1 ] ), "Incorrect order" )
+
+    def test_radius_indices( self ):
+        positions = numpy.random.uniform( -100.0, 100.0, (500, 3) )
+        render_position = numpy.array( [ 1.0, 2.0, 3.0 ] )
+        expected = numpy.argsort( ( ( positions - render_position ) ** 2 ).sum( axis = 1 ) )
+
+        result = sort.sort_radius_indices( render_position, positions )
+        self.assertTrue( numpy.array_equal( result, expected ), "Incorrect order" )
+
+        result = sort.sort_radius_indices(
+            render_position,
+            positions,
+            back_to_front = True,
+            scratch = numpy.empty( (500, 3) )
+            )
+        self.assertTrue( numpy.array_equal( result, expected[ ::-1 ] ), "Incorrect order" )
+
+        self.assertEqual(
+            len( sort.sort_radius_indices( render_position, numpy.zeros( (0, 3) ) ) ),
+            0,
+            "Empty sort failed"
+            )
+
+
+    def test_coherent_sorter( self ):
+        sorter = sort.CoherentSorter()
+        keys = numpy.random.uniform( 0.0, 100.0, 1000 )
+
+        indices = sorter.sort( keys )
+        self.assertTrue( sorter.full_sort, "First sort not a full sort" )
+        self.assertTrue( numpy.array_equal( keys[ indices ], numpy.sort( keys ) ), "Incorrect order" )
+
+        # move a few keys
+        keys[ :20 ] += numpy.random.uniform( -10.0, 10.0, 20 )
+        indices = sorter.sort( keys )
+        self.assertFalse( sorter.full_sort, "Order not repaired" )
+        self.assertTrue( numpy.array_equal( keys[ indices ], numpy.sort( keys ) ), "Incorrect repaired order" )
+
+        indices = sorter.sort( keys, back_to_front = True )
+        self.assertEqual( sorter.displaced, 0, "Sorted keys displaced" )
+        self.assertTrue( numpy.array_equal( keys[ indices ], numpy.sort( keys )[ ::-1 ] ), "Incorrect order" )
+
+        # move every key
+        numpy.random.shuffle( keys )
+        indices = sorter.sort( keys )
+        self.assertTrue( sorter.full_sort, "Full sort not used" )
+        self.assertTrue( numpy.array_equal( keys[ indices ], numpy.sort( keys ) ), "Incorrect order" )
+
+
+    def test_top_k( self ):
+        positions = numpy.random.uniform( -100.0, 100.0, (1000, 3) )
+        render_position = numpy.array( [ 1.0, 2.0, 3.0 ] )
+        render_direction = numpy.array( [ 0.0, 0.0, -1.0 ] )
+
+        expected = numpy.argsort( ( ( positions - render_position ) ** 2 ).sum( axis = 1 ) )
+        result = sort.sort_radius_top_k( render_position, positions, 64 )
+        self.assertTrue( numpy.array_equal( result, expected[ :64 ] ), "Incorrect nearest" )
+        result = sort.sort_radius_top_k( render_position, positions, 64, back_to_front = True )
+        self.assertTrue( numpy.array_equal( result, expected[ ::-1 ][ :64 ] ), "Incorrect furthest" )
+
+        expected = numpy.argsort( numpy.dot( positions - render_position, render_direction ) )
+        result = sort.sort_plane_top_k( render_position, render_direction, positions, 200 )
+        self.assertTrue( numpy.array_equal( result, expected[ :200 ] ), "Incorrect nearest" )
+
+        result = sort.sort_plane_top_k( render_position, render_direction, positions, 5000 )
+        self.assertTrue( numpy.array_equal( result, expected ), "Incorrect full sort" )
+        self.assertEqual( len( sort.argsort_top_k( [], 10 ) ), 0, "Empty sort failed" )
+
+
+if __name__ == '__main__':
+    unittest.main()
+
@@ -0,0 +1,113 @@
+import unittest
+
+import numpy
+
+from pygly.spatial_hash import SpatialHash
+
+
+class test_spatial_hash( unittest.TestCase ):
+
+    def setUp( self ):
+        numpy.random.seed( 0 )
+        self.positions = numpy.random.uniform( -50.0, 50.0, (2000, 3) )
+        self.points = numpy.random.uniform( -60.0, 60.0, (50, 3) )
+
+    def tearDown( self ):
+        pass
+
+    def distances( self, point ):
+        return numpy.sqrt( ( ( self.positions - point ) ** 2 ).sum( axis = 1 ) )
+
+    def check_radius( self, grid, radius ):
+        queries, indices, distances = grid.radius( self.points, radius )
+        self.assertTrue( numpy.all( numpy.diff( queries ) >= 0 ), "Results not grouped by query" )
+
+        for query, point in enumerate( self.points ):
+            expected = numpy.nonzero( self.distances( point ) <= radius )[ 0 ]
+            found = queries == query
+            self.assertEqual(
+                sorted( indices[ found ] ),
+                expected.tolist(),
+                "Incorrect points within radius"
+                )
+            self.assertTrue(
+                numpy.allclose( distances[ found ], self.distances( point )[ indices[ found ] ] ),
+                "Incorrect distances"
+                )
+
+    def test_radius( self ):
+        grid = SpatialHash( 5.0, self.positions )
+        self.assertEqual( len( grid ), 2000, "Incorrect length" )
+        self.check_radius( grid, 5.0 )
+        self.check_radius( grid, 12.0 )
+
+        # sparse grids search the sorted cells
+        grid = SpatialHash( 0.5, self.positions )
+        self.assertTrue( grid._table is None, "Sparse grid used a table" )
+        self.check_radius( grid, 1.2 )
+
+    def test_insert( self ):
+        grid = SpatialHash( 5.0, self.positions[ :500 ] )
+        indices = grid.insert( self.positions[ 500: ] )
+        self.assertTrue( numpy.array_equal( indices, numpy.arange( 500, 2000 ) ), "Incorrect indices" )
+        self.check_radius( grid, 8.0 )
+
+        grid = SpatialHash( 5.0 )
+        grid.insert( self.positions )
+        self.check_radius( grid, 8.0 )
+
+    def test_nearest( self ):
+        grid = SpatialHash( 5.0, self.positions )
+        indices, distances = grid.nearest( self.points, 5 )
+        for query, point in enumerate( self.points ):
+            expected = numpy.sort( self.distances( point ) )[ :5 ]
+            self.assertTrue( numpy.allclose( distances[ query ], expected ), "Incorrect nearest distances" )
+            self.assertTrue(
+                numpy.allclose( self.distances( point )[ indices[ query ] ], expected ),
+                "Incorrect nearest indices"
+                )
+
+        # points beyond the maximum distance aren't returned
+        indices, distances = grid.nearest( self.points, 5, max_distance = 6.0 )
+        for query, point in enumerate( self.points ):
+            expected = numpy.sort( self.distances( point ) )[ :5 ]
+            expected[ expected > 6.0 ] = numpy.inf
+            self.assertTrue( numpy.allclose( distances[ query ], expected ), "Incorrect maximum distance" )
+            self.assertTrue( numpy.all( indices[ query ][ numpy.isinf( expected ) ] == -1 ), "Missing points not -1" )
+
+    def test_large_radius( self ):
+        # a radius far larger than the cells tests every point
+        grid = SpatialHash( 1.0, self.positions )
+        self.check_radius( grid, 300.0 )
+
+        # a large radius doesn't enlarge the other queries
+        radius = numpy.full( len( self.points ), 2.0 )
+        radius[ 3 ] = 300.0
+        queries, indices, distances = grid.radius( self.points, radius )
+        self.assertTrue( numpy.all( numpy.diff( queries ) >= 0 ), "Results not grouped by query" )
+        for query, point in enumerate( self.points ):
+            expected = numpy.nonzero( self.distances( point ) <= radius[ query ] )[ 0 ]
+            self.assertEqual( sorted( indices[ queries == query ] ), expected.tolist(), "Incorrect points within radius" )
+
+        # large searches are split into chunks
+        grid.chunk_size = 5000
+        self.check_radius( grid, 300.0 )
+        indices, distances = grid.nearest( self.points, 3 )
+        for query, point in enumerate( self.points ):
+            expected = numpy.sort( self.distances( point ) )[ :3 ]
+            self.assertTrue( numpy.allclose( distances[ query ], expected ), "Incorrect nearest distances" )
+
+    def test_few_points( self ):
+        grid = SpatialHash( 5.0, self.positions[ :3 ] )
+        indices, distances = grid.nearest( self.points[ :2 ], 5 )
+        self.assertEqual( sorted( indices[ 0, :3 ] ), [ 0, 1, 2 ], "Incorrect nearest points" )
+        self.assertTrue( numpy.all( indices[ :, 3: ] == -1 ), "Missing points not -1" )
+        self.assertTrue( numpy.all( numpy.isinf( distances[ :, 3: ] ) ), "Missing distances not infinite" )
+
+        grid = SpatialHash( 5.0 )
+        self.assertEqual( len( grid.radius( self.points, 5.0 )[ 0 ] ), 0, "Empty grid returned points" )
+        self.assertTrue( numpy.all( grid.nearest( self.points, 2 )[ 0 ] == -1 ), "Empty grid returned points" )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import unittest
+
+import numpy
+
+from pygly.sweep_and_prune import SweepAndPrune
+
+
+def brute_force_pairs( aabbs ):
+    overlapping = numpy.all(
+        ( aabbs[ :, numpy.newaxis, 0 ] <= aabbs[ :, 1 ] ) & ( aabbs[ :, 0 ] <= aabbs[ :, numpy.newaxis, 1 ] ),
+        axis = 2
+        )
+    first, second = numpy.nonzero( numpy.triu( overlapping, 1 ) )
+    return set( zip( first.tolist(), second.tolist() ) )
+
+def pair_set( pairs ):
+    return set( map( tuple, pairs.tolist() ) )
+
+
+class test_sweep_and_prune( unittest.TestCase ):
+
+    def setUp( self ):
+        numpy.random.seed( 0 )
+        self.centres = numpy.random.uniform( -40.0, 40.0, (800, 3) )
+        self.extents = numpy.random.uniform( 0.5, 3.0, (800, 3) )
+        # boxes larger than a cell are tested against every box
+        self.extents[ :10 ] *= 10.0
+
+    def tearDown( self ):
+        pass
+
+    def aabbs( self ):
+        return numpy.array( [
+            self.centres - self.extents,
+            self.centres + self.extents
+            ] ).transpose( 1, 0, 2 )
+
+    def test_update( self ):
+        broadphase = SweepAndPrune()
+        previous = set()
+        for frame in xrange( 5 ):
+            aabbs = self.aabbs()
+            added, removed = broadphase.update( aabbs )
+            expected = brute_force_pairs( aabbs )
+
+            self.assertEqual( pair_set( broadphase.pairs ), expected, "Incorrect pairs" )
+            self.assertEqual( len( broadphase.pairs ), len( expected ), "Duplicate pairs" )
+            self.assertEqual( pair_set( added ), expected - previous, "Incorrect added pairs" )
+            self.assertEqual( pair_set( removed ), previous - expected, "Incorrect removed pairs" )
+            self.assertTrue(
+                numpy.all( broadphase.pairs[ :, 0 ] < broadphase.pairs[ :, 1 ] ),
+                "Pairs not ordered"
+                )
+
+            previous = expected
+            self.centres += numpy.random.uniform( -0.5, 0.5, self.centres.shape )
+
+    def test_touching( self ):
+        aabbs = numpy.array( [
+            [ [ 0.0, 0.0, 0.0 ], [ 1.0, 1.0, 1.0 ] ],
+            [ [ 1.0, 0.0, 0.0 ], [ 2.0, 1.0, 1.0 ] ],
+            [ [ 2.5, 0.0, 0.0 ], [ 3.0, 1.0, 1.0 ] ],
+            ] )
+        broadphase = SweepAndPrune( cell_size = 1.0 )
+        added, removed = broadphase.update( aabbs )
+        self.assertEqual( pair_set( added ), set( [ (0, 1) ] ), "Touching boxes not paired" )
+        self.assertEqual( len( removed ), 0, "Incorrect removed pairs" )
+
+    def test_reset( self ):
+        broadphase = SweepAndPrune()
+        aabbs = self.aabbs()
+        broadphase.update( aabbs )
+        broadphase.reset()
+        self.assertEqual( len( broadphase.pairs ), 0, "Pairs not reset" )
+
+        added, removed = broadphase.update( aabbs )
+        self.assertEqual( pair_set( added ), brute_force_pairs( aabbs ), "Incorrect pairs after reset" )
+        self.assertEqual( len( removed ), 0, "Incorrect removed pairs" )
+
+    def test_count_change( self ):
+        broadphase = SweepAndPrune()
+        aabbs = self.aabbs()
+        broadphase.update( aabbs )
+
+        # removing boxes removes their pairs
+        added, removed = broadphase.update( aabbs[ :400 ] )
+        expected = brute_force_pairs( aabbs[ :400 ] )
+        self.assertEqual( pair_set( broadphase.pairs ), expected, "Incorrect pairs" )
+        self.assertEqual( len( added ), 0, "Incorrect added pairs" )
+        self.assertEqual(
+            pair_set( removed ),
+            brute_force_pairs( aabbs ) - expected,
+            "Incorrect removed pairs"
+            )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import unittest
+
+import numpy
+
+from pygly.scene_node import SceneNode
+from pygly.tag_index import TagIndex
+
+
+class test_tag_index( unittest.TestCase ):
+
+    def setUp( self ):
+        pass
+
+    def tearDown( self ):
+        pass
+
+    def test_query( self ):
+        root = SceneNode( 'root' )
+        a = SceneNode( 'a' )
+        b = SceneNode( 'b' )
+        c = SceneNode( 'c' )
+        root.add_child( a )
+        root.add_child( b )
+        a.add_child( c )
+
+        index = TagIndex( root, capacity = 2 )
+        self.assertEqual( len( index ), 4, "Incorrect node count" )
+
+        index.add_tags( a, 'opaque', 'shadow' )
+        index.add_tags( b, 'transparent' )
+        index.add_tags( c, 'opaque' )
+
+        opaque = index.mask( 'opaque' )
+        self.assertEqual( set( index.select( opaque ) ), set( [ a, c ] ), "All query incorrect" )
+        self.assertEqual(
+            set( index.select( any_tags = index.mask( 'shadow', 'transparent' ) ) ),
+            set( [ a, b ] ),
+            "Any query incorrect"
+            )
+        self.assertEqual(
+            index.select( opaque, no_tags = index.mask( 'shadow' ) ),
+            [ c ],
+            "None query incorrect"
+            )
+        self.assertEqual( index.node_tags( a ), set( [ 'opaque', 'shadow' ] ), "Tags incorrect" )
+
+        index.remove_tags( a, 'opaque' )
+        self.assertFalse( index.has_tags( a, 'opaque' ), "Tag not removed" )
+        self.assertTrue( index.has_tags( a, 'shadow' ), "Tag incorrectly removed" )
+
+    def test_structure( self ):
+        root = SceneNode( 'root' )
+        a = SceneNode( 'a' )
+        b = SceneNode( 'b' )
+        root.add_child( a )
+        a.add_child( b )
+
+        index = TagIndex( root )
+        index.add_tags( b, 'pickable' )
+        pickable = index.mask( 'pickable' )
+
+        root.remove_child( a )
+        self.assertFalse( b in index, "Descendant not removed" )
+        self.assertEqual( len( index.query( pickable ) ), 0, "Removed node matched" )
+
+        c = SceneNode( 'c' )
+        root.add_child( c )
+        self.assertTrue( c in index, "Node not added" )
+        index.add_tags( c, 'pickable' )
+        self.assertEqual( index.select( pickable ), [ c ], "Added node not matched" )
+
+        # nodes outside the scene are ignored
+        d = SceneNode( 'd' )
+        a.add_child( d )
+        self.assertFalse( d in index, "Node outside scene added" )
+
+    def test_move( self ):
+        root = SceneNode( 'root' )
+        a = SceneNode( 'a' )
+        b = SceneNode( 'b' )
+        c = SceneNode( 'c' )
+        root.add_child( a )
+        root.add_child( b )
+        a.add_child( c )
+
+        index = TagIndex( root )
+        index.add_tags( a, 'opaque' )
+        index.add_tags( c, 'pickable' )
+
+        # moving a subtree keeps the tags of every node in it
+        root.remove_child( a )
+        b.add_child( a )
+        self.assertEqual( index.select( index.mask( 'opaque' ) ), [ a ], "Moved node lost its tags" )
+        self.assertEqual( index.select( index.mask( 'pickable' ) ), [ c ], "Moved descendant lost its tags" )
+        self.assertEqual( index.node_tags( a ), set( [ 'opaque' ] ), "Tags incorrect" )
+
+
+if __name__ == '__main__':
+    unittest.main()
+
@@ -0,0 +1,232 @@
+import unittest
+import math
+
+import numpy
+
+from pyrr import matrix44
+from pygly.scene_node import SceneNode
+from pygly.transform_array import TransformArray, flatten
+from pygly.transform_array import partition
+from pygly.transform_buffer import TransformBuffer
+
+try:
+    from concurrent import futures
+except ImportError:
+    futures = None
+
+
+def create_scene():
+    root = SceneNode( 'root' )
+    a = SceneNode( 'a' )
+    b = SceneNode( 'b' )
+    c = SceneNode( 'c' )
+    root.add_child( a )
+    root.add_child( b )
+    a.add_child( c )
+
+    root.transform.object.rotate_y( math.pi / 2.0 )
+    a.transform.translation = [ 1.0, 2.0, 3.0 ]
+    a.transform.scale = [ 2.0, 2.0, 2.0 ]
+    a.transform.object.rotate_x( math.pi / 3.0 )
+    b.transform.translation = [-1.0, 0.0, 0.0 ]
+    c.transform.translation = [ 0.0, 0.0, 5.0 ]
+    c.transform.object.rotate_z( math.pi / 5.0 )
+
+    return root, a, b, c
+
+
+class test_transform_array( unittest.TestCase ):
+
+    def setUp( self ):
+        pass
+
+    def tearDown( self ):
+        pass
+
+    def test_flatten( self ):
+        root, a, b, c = create_scene()
+
+        nodes, parents, depths, ends = flatten( root )
+
+        self.assertEqual( len( nodes ), 4, "Incorrect node count" )
+        self.assertTrue( nodes[ 0 ] is root, "Root not first" )
+        for index, node in enumerate( nodes ):
+            if node.parent is None:
+                self.assertEqual( parents[ index ], -1, "Root has parent" )
+                continue
+            parent = parents[ index ]
+            self.assertTrue( nodes[ parent ] is node.parent, "Parent incorrect" )
+            self.assertTrue( parent < index, "Parent after child" )
+            self.assertEqual( depths[ index ], depths[ parent ] + 1, "Depth incorrect" )
+
+        a_index = nodes.index( a )
+        self.assertEqual( ends[ 0 ], 4, "Root subtree incorrect" )
+        self.assertEqual( ends[ a_index ], a_index + 2, "Subtree incorrect" )
+
+    def test_matrices( self ):
+        root, a, b, c = create_scene()
+
+        array = TransformArray( root )
+
+        for index, node in enumerate( array.nodes ):
+            self.assertTrue(
+                numpy.allclose( array.local_matrices[ index ], node.transform.matrix ),
+                "Local matrix incorrect"
+                )
+            self.assertTrue(
+                numpy.allclose( array.world_matrices[ index ], node.world_transform.matrix ),
+                "World matrix incorrect"
+                )
+
+    def test_scatter( self ):
+        root, a, b, c = create_scene()
+
+        array = TransformArray( root )
+        index = array.index( c )
+        array.translations[ index ] = [ 4.0, 5.0, 6.0 ]
+        array.update()
+        array.scatter( [ index ] )
+
+        self.assertTrue(
+            numpy.allclose( c.transform.translation, [ 4.0, 5.0, 6.0 ] ),
+            "Translation not written"
+            )
+        self.assertTrue(
+            numpy.allclose( array.world_matrices[ index ], c.world_transform.matrix ),
+            "World matrix incorrect"
+            )
+
+    def test_update_indices( self ):
+        root, a, b, c = create_scene()
+
+        array = TransformArray( root )
+        expected = array.copy()
+        a_index = array.index( a )
+        b_index = array.index( b )
+        for values in [ array, expected ]:
+            values.translations[ a_index ] = [ 4.0, 5.0, 6.0 ]
+            values.scales[ b_index ] = [ 3.0, 3.0, 3.0 ]
+        expected.update()
+
+        # only the changed nodes and their subtrees are updated
+        array.world_matrices[ array.index( c ) ] = 0.0
+        array.update( indices = [ a_index, b_index ] )
+        self.assertTrue(
+            numpy.allclose( array.local_matrices, expected.local_matrices ),
+            "Local matrices incorrect"
+            )
+        self.assertTrue(
+            numpy.allclose( array.world_matrices, expected.world_matrices ),
+            "Subtree not updated"
+            )
+
+        array.world_matrices[ 0 ] = 0.0
+        array.update( indices = [ a_index ] )
+        self.assertTrue( numpy.all( array.world_matrices[ 0 ] == 0.0 ), "Unchanged node updated" )
+
+    def test_partition( self ):
+        root, a, b, c = create_scene()
+        for node in [ a, b, c ]:
+            for index in range( 3 ):
+                node.add_child( SceneNode( 'leaf' ) )
+
+        array = TransformArray( root )
+        top, batches = partition( array.depths, array.ends, 3 )
+
+        indices = [ level for level in top ]
+        for batch in batches:
+            indices.extend( batch )
+        indices = numpy.sort( numpy.concatenate( indices ) )
+
+        self.assertTrue(
+            numpy.array_equal( indices, numpy.arange( len( array ) ) ),
+            "Partition does not cover every node once"
+            )
+
+    @unittest.skipIf( futures is None, "concurrent.futures not available" )
+    def test_parallel_update( self ):
+        root, a, b, c = create_scene()
+        for node in [ a, b, c ]:
+            for index in range( 3 ):
+                child = SceneNode( 'leaf' )
+                child.transform.translation = [ index, 1.0, 0.0 ]
+                node.add_child( child )
+
+        array = TransformArray( root )
+        expected = array.world_matrices.copy()
+        array.world_matrices[:] = 0.0
+
+        executor = futures.ThreadPoolExecutor( 2 )
+        try:
+            array.update( executor, batch_count = 2 )
+        finally:
+            executor.shutdown()
+
+        self.assertTrue(
+            numpy.allclose( array.world_matrices, expected ),
+            "Parallel update differs from serial update"
+            )
+
+
+class test_transform_buffer( unittest.TestCase ):
+
+    def setUp( self ):
+        pass
+
+    def tearDown( self ):
+        pass
+
+    def test_swap( self ):
+        root, a, b, c = create_scene()
+
+        buffer = TransformBuffer( root )
+        front = buffer.front
+        index = front.index( b )
+
+        self.assertFalse( front.writeable, "Front buffer is writeable" )
+        self.assertTrue( buffer.back.writeable, "Back buffer is not writeable" )
+
+        b.transform.translation = [ 0.0, 7.0, 0.0 ]
+        buffer.back.gather()
+        buffer.back.update()
+
+        with buffer.read() as current:
+            self.assertTrue( current is front, "Front changed before swap" )
+            original = current.world_matrices[ index ].copy()
+
+        buffer.swap()
+
+        with buffer.read() as current:
+            self.assertFalse( current is front, "Buffers not swapped" )
+            self.assertTrue(
+                numpy.allclose( current.world_matrices[ index ], b.world_transform.matrix ),
+                "Published matrix incorrect"
+                )
+            self.assertFalse(
+                numpy.allclose( current.world_matrices[ index ], original ),
+                "Published matrix not changed"
+                )
+
+        # the recycled buffer is brought up to date
+        self.assertTrue(
+            numpy.allclose( buffer.back.translations[ index ], [ 0.0, 7.0, 0.0 ] ),
+            "Back buffer not updated"
+            )
+
+    def test_rebuild( self ):
+        root, a, b, c = create_scene()
+
+        buffer = TransformBuffer( root )
+        d = SceneNode( 'd' )
+        b.add_child( d )
+
+        buffer.rebuild()
+        self.assertEqual( len( buffer.front ), 4, "Front changed before swap" )
+
+        buffer.swap()
+        self.assertEqual( len( buffer.front ), 5, "Structure not published" )
+        self.assertEqual( len( buffer.back ), 5, "Structure not recycled" )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+import unittest
+
+import numpy
+
+from pygly.scene_node import SceneNode
+from pygly.transform_array import TransformArray
+from pygly.update_scheduler import UpdateScheduler
+
+
+class test_update_scheduler( unittest.TestCase ):
+
+    def setUp( self ):
+        pass
+
+    def tearDown( self ):
+        pass
+
+    def test_step( self ):
+        root = SceneNode( 'root' )
+        near = SceneNode( 'near' )
+        far = SceneNode( 'far' )
+        root.add_child( near )
+        root.add_child( far )
+        near.transform.translation = [ 1.0, 0.0, 0.0 ]
+        far.transform.translation = [ 50.0, 0.0, 0.0 ]
+
+        array = TransformArray( root )
+        near_index = array.index( near )
+        far_index = array.index( far )
+
+        scheduler = UpdateScheduler( array, distances = [ 10.0 ], intervals = [ 1, 4 ] )
+        scheduler.assign( numpy.zeros( 3 ) )
+        self.assertEqual( scheduler.buckets[ near_index ], 0, "Near node in wrong bucket" )
+        self.assertEqual( scheduler.buckets[ far_index ], 1, "Far node in wrong bucket" )
+
+        # move every node by its elapsed time along y
+        def update( indices, elapsed ):
+            translations = array.translations[ indices ].copy()
+            translations[ :, 1 ] = scheduler.frame
+            return (
+                translations,
+                array.orientations[ indices ],
+                array.scales[ indices ],
+                )
+
+        counts = numpy.zeros( len( array ), dtype = numpy.int )
+        heights = []
+        for frame in range( 8 ):
+            indices = scheduler.step( update, 1.0 / 60.0 )
+            counts[ indices ] += 1
+            heights.append( array.translations[ far_index, 1 ] )
+
+        self.assertEqual( counts[ near_index ], 8, "Near node not updated every frame" )
+        self.assertEqual( counts[ far_index ], 2, "Far node not throttled" )
+        self.assertEqual( array.translations[ near_index, 1 ], 7.0, "Near node interpolated" )
+
+        # the far node moves smoothly between its updates
+        differences = numpy.diff( heights )
+        self.assertTrue( numpy.all( differences >= 0.0 ), "Interpolation not monotonic" )
+        self.assertTrue( numpy.count_nonzero( differences ) > 2, "Far node not interpolated" )
+
+    def test_reassign( self ):
+        root = SceneNode( 'root' )
+        far = SceneNode( 'far' )
+        root.add_child( far )
+        far.transform.translation = [ 50.0, 0.0, 0.0 ]
+
+        array = TransformArray( root )
+        far_index = array.index( far )
+        scheduler = UpdateScheduler( array, distances = [ 10.0, 100.0 ], intervals = [ 1, 4, 8 ] )
+        scheduler.assign( numpy.zeros( 3 ) )
+
+        def update( indices, elapsed ):
+            translations = array.translations[ indices ].copy()
+            translations[ :, 1 ] = scheduler.frame
+            return (
+                translations,
+                array.orientations[ indices ],
+                array.scales[ indices ],
+                )
+
+        # wait for an update that moves the node
+        while True:
+            updated = scheduler.step( update, 1.0 / 60.0 )
+            if far_index in updated and scheduler.frame > 1:
+                break
+        target = scheduler._latest[ 0 ][ far_index, 1 ]
+        heights = [ array.translations[ far_index, 1 ] ]
+        scheduler.step( update, 1.0 / 60.0 )
+        heights.append( array.translations[ far_index, 1 ] )
+
+        # moving to a slower bucket mid-interval finishes the
+        # current interval without a jump
+        scheduler.assign( numpy.zeros( 3 ), importance = numpy.array( [ 1.0, 0.1 ] ) )
+        self.assertEqual( scheduler.buckets[ far_index ], 2, "Node not reassigned" )
+        for frame in range( 2 ):
+            self.assertFalse( far_index in scheduler.step( update, 1.0 / 60.0 ), "Node updated early" )
+            self.assertTrue( far_index in scheduler.changed, "Interpolating node not written" )
+            heights.append( array.translations[ far_index, 1 ] )
+
+        self.assertTrue( numpy.all( numpy.diff( heights ) >= 0.0 ), "Node jumped when reassigned" )
+        self.assertEqual( heights[ -1 ], target, "Latest value not reached" )
+
+        # the node is idle until its next update
+        while far_index not in scheduler.due():
+            scheduler.step( update, 1.0 / 60.0 )
+            self.assertFalse( far_index in scheduler.changed, "Idle node written" )
+            self.assertEqual( array.translations[ far_index, 1 ], target, "Idle node moved" )
+
+
+if __name__ == '__main__':
+    unittest.main()
+
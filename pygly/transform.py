@@ -1,7 +1,7 @@
 import sys
 
 import numpy
-from pydispatch import dispatcher
+import dispatcher
 
 from pyrr import quaternion
 from pyrr import matrix33
@@ -157,7 +157,7 @@ class Transform( object ):
         The is an @property decorated method which allows
         retrieval and assignment of the scale value.
         """
-        if self._matrix == None:
+        if self._matrix is None:
             # matrix transformations must be done in order
             # scaling
             # rotation
@@ -0,0 +1,525 @@
+"""Provides packed, array based storage of a scene's transforms.
+
+A scene graph is flattened into depth-first pre-order.
+Every node is given an index and the local transform values
+of all nodes are stored in contiguous numpy arrays.
+
+Because the nodes are stored in pre-order, a parent always
+precedes its children and the descendants of a node
+occupy the contiguous range [index, end).
+
+World matrices are calculated one tree depth at a time
+with a single batched matrix multiply per depth.
+"""
+
+import numpy
+
+
+def flatten( root ):
+    """Flattens a tree into depth-first pre-order.
+
+    :param TreeNode root: The root of the tree.
+    :rtype: tuple
+    :return: A tuple of (nodes, parents, depths, ends).
+        nodes is a list of the nodes in pre-order.
+        parents is a numpy.array of the parent index of each
+        node, the root has a parent of -1.
+        depths is a numpy.array of the depth of each node.
+        ends is a numpy.array of the index one past the last
+        descendant of each node.
+    """
+    nodes = []
+    parents = []
+    depths = []
+
+    stack = [ (root, -1, 0) ]
+    while stack:
+        node, parent, depth = stack.pop()
+        index = len( nodes )
+
+        nodes.append( node )
+        parents.append( parent )
+        depths.append( depth )
+
+        # tree leaves don't have children
+        children = getattr( node, 'children', () )
+        stack.extend(
+            [ (child, index, depth + 1) for child in children ]
+            )
+
+    parents = numpy.array( parents, dtype = numpy.int )
+    depths = numpy.array( depths, dtype = numpy.int )
+    ends = subtree_ends( parents )
+
+    return nodes, parents, depths, ends
+
+def subtree_ends( parents ):
+    """Calculates the end of each node's subtree.
+
+    :param numpy.array parents: The parent index of each node in
+        depth-first pre-order.
+    :rtype: numpy.array
+    :return: The index one past the last descendant of each node.
+    """
+    parents = parents.tolist()
+
+    # each node's subtree ends where its last descendant ends
+    # walk backwards so children are processed before their parents
+    ends = range( 1, len( parents ) + 1 )
+    for index in xrange( len( parents ) - 1, 0, -1 ):
+        parent = parents[ index ]
+        if parent >= 0 and ends[ index ] > ends[ parent ]:
+            ends[ parent ] = ends[ index ]
+
+    return numpy.array( ends, dtype = numpy.int )
+
+def levels( depths ):
+    """Groups node indices by their depth in the tree.
+
+    :param numpy.array depths: The depth of each node.
+    :rtype: list
+    :return: A list of numpy.arrays, the first containing
+        the indices of the nodes at depth 0, the second
+        those at depth 1, etc.
+    """
+    if len( depths ) == 0:
+        return []
+
+    order = numpy.argsort( depths, kind = 'mergesort' )
+    counts = numpy.bincount( depths )
+    return numpy.split( order, numpy.cumsum( counts )[:-1] )
+
+def create_matrices( translations, orientations, scales, out = None ):
+    """Creates local matrices from arrays of transform values.
+
+    Matrices are built in the same order as
+    :py:attr:`pygly.transform.Transform.matrix`,
+    scale, then rotation, then translation.
+
+    :param numpy.array translations: An (N,3) array of translations.
+    :param numpy.array orientations: An (N,4) array of quaternions.
+    :param numpy.array scales: An (N,3) array of scales.
+    :param numpy.array out: An optional (N,4,4) array to write into.
+    :rtype: numpy.array
+    :return: An (N,4,4) array of matrices.
+    """
+    if out is None:
+        out = numpy.empty( (len( translations ), 4, 4), dtype = numpy.float )
+
+    x = orientations[ :, 0 ]
+    y = orientations[ :, 1 ]
+    z = orientations[ :, 2 ]
+    w = orientations[ :, 3 ]
+
+    x2 = x * x
+    y2 = y * y
+    z2 = z * z
+    xy = x * y
+    xz = x * z
+    yz = y * z
+    wx = w * x
+    wy = w * y
+    wz = w * z
+
+    # the rotation matches pyrr.matrix33.create_from_quaternion
+    out[ :, 0, 0 ] = 1.0 - 2.0 * (y2 + z2)
+    out[ :, 0, 1 ] = 2.0 * (xy + wz)
+    out[ :, 0, 2 ] = 2.0 * (xz - wy)
+    out[ :, 1, 0 ] = 2.0 * (xy - wz)
+    out[ :, 1, 1 ] = 1.0 - 2.0 * (x2 + z2)
+    out[ :, 1, 2 ] = 2.0 * (yz + wx)
+    out[ :, 2, 0 ] = 2.0 * (xz + wy)
+    out[ :, 2, 1 ] = 2.0 * (yz - wx)
+    out[ :, 2, 2 ] = 1.0 - 2.0 * (x2 + y2)
+
+    # scaling before rotation scales the rows
+    out[ :, 0:3, 0:3 ] *= scales[ :, :, numpy.newaxis ]
+
+    out[ :, 0:3, 3 ] = 0.0
+    out[ :, 3, 0:3 ] = translations
+    out[ :, 3, 3 ] = 1.0
+
+    return out
+
+def world_matrices( local_matrices, parents, levels, out = None ):
+    """Calculates world matrices from local matrices.
+
+    Each depth of the tree is calculated with a single
+    batched matrix multiply.
+
+    :param numpy.array local_matrices: An (N,4,4) array of local matrices.
+    :param numpy.array parents: The parent index of each node.
+    :param list levels: The node indices grouped by depth as returned
+        by :py:func:`pygly.transform_array.levels`.
+    :param numpy.array out: An optional (N,4,4) array to write into.
+    :rtype: numpy.array
+    :return: An (N,4,4) array of world matrices.
+    """
+    if out is None:
+        out = numpy.empty_like( local_matrices )
+
+    if not levels:
+        return out
+
+    # nodes at the top of the tree have no parent
+    roots = levels[ 0 ]
+    out[ roots ] = local_matrices[ roots ]
+
+    _multiply_levels( local_matrices, parents, levels[ 1: ], out )
+    return out
+
+def _multiply_levels( local_matrices, parents, levels, out ):
+    """Multiplies each level of nodes by their parent's world matrix.
+
+    The world matrices of the parents of the first level must
+    already be present in out.
+    """
+    for level in levels:
+        out[ level ] = numpy.matmul(
+            local_matrices[ level ],
+            out[ parents[ level ] ]
+            )
+
+def partition( depths, ends, count ):
+    """Divides a tree into independent batches of subtrees.
+
+    The tree is split at the shallowest depth that has at least
+    count nodes. The nodes above that depth form the top of
+    the tree, the subtrees below it are grouped into count
+    batches of roughly equal size.
+
+    :param numpy.array depths: The depth of each node in pre-order.
+    :param numpy.array ends: The end of each node's subtree as returned
+        by :py:func:`pygly.transform_array.subtree_ends`.
+    :param int count: The number of batches to create.
+    :rtype: tuple
+    :return: A tuple of (top, batches).
+        top is a list of levels for the nodes above the split.
+        batches is a list of lists of levels, one per batch.
+        Levels are in the form returned by
+        :py:func:`pygly.transform_array.levels`.
+    """
+    if len( depths ) == 0:
+        return [], []
+
+    counts = numpy.bincount( depths )
+    split = numpy.nonzero( counts >= count )[ 0 ]
+    split = split[ 0 ] if len( split ) else len( counts ) - 1
+
+    # the roots are always part of the top of the tree
+    split = max( split, 1 )
+
+    # the top of the tree is calculated serially
+    top = levels( depths )[ :split ]
+
+    # each node at the split depth roots a contiguous subtree
+    starts = numpy.nonzero( depths == split )[ 0 ]
+    stops = ends[ starts ]
+    sizes = stops - starts
+
+    # cut the subtrees into batches of similar size
+    # subtrees are kept in order, so batches are deterministic
+    total = float( sizes.sum() )
+    cuts = numpy.searchsorted(
+        numpy.cumsum( sizes ),
+        total * numpy.arange( 1, count ) / count,
+        side = 'right'
+        )
+    cuts = numpy.unique( numpy.concatenate( ( [0], cuts, [len( starts )] ) ) )
+
+    batches = []
+    for first, last in zip( cuts[ :-1 ], cuts[ 1: ] ):
+        if first == last:
+            continue
+        indices = numpy.concatenate( [
+            numpy.arange( start, stop )
+            for start, stop in zip( starts[ first:last ], stops[ first:last ] )
+            ] )
+        batch = [
+            indices[ level ]
+            for level in levels( depths[ indices ] - split )
+            ]
+        batches.append( batch )
+
+    return top, batches
+
+def world_matrices_parallel(
+    local_matrices,
+    parents,
+    top,
+    batches,
+    executor,
+    out = None
+    ):
+    """Calculates world matrices using a pool of workers.
+
+    Each batch of subtrees is calculated by a separate task.
+    Batches write to disjoint rows of the output array,
+    so the result is identical to
+    :py:func:`pygly.transform_array.world_matrices`.
+
+    NumPy releases the GIL during large matrix multiplies,
+    which allows a thread pool to use multiple cores.
+
+    :param numpy.array local_matrices: An (N,4,4) array of local matrices.
+    :param numpy.array parents: The parent index of each node.
+    :param list top: The top levels as returned by
+        :py:func:`pygly.transform_array.partition`.
+    :param list batches: The batches as returned by
+        :py:func:`pygly.transform_array.partition`.
+    :param executor: An executor such as a
+        concurrent.futures.ThreadPoolExecutor.
+    :param numpy.array out: An optional (N,4,4) array to write into.
+    :rtype: numpy.array
+    :return: An (N,4,4) array of world matrices.
+    """
+    if out is None:
+        out = numpy.empty_like( local_matrices )
+
+    # the top of the tree must be complete before the batches begin
+    world_matrices( local_matrices, parents, top, out = out )
+
+    tasks = [
+        executor.submit( _multiply_levels, local_matrices, parents, batch, out )
+        for batch in batches
+        ]
+
+    # wait for every task and re-raise any exceptions
+    for task in tasks:
+        task.result()
+
+    return out
+
+
+class TransformArray( object ):
+    """Packed transform values for every node in a scene.
+
+    The arrays are indexed by the node's position in
+    :py:attr:`nodes`.
+
+    Values are read from the scene using
+    :py:meth:`gather` and written back using :py:meth:`scatter`.
+    The arrays can also be modified directly, followed by
+    a call to :py:meth:`update`.
+
+    .. note::
+        Changes to the structure of the scene are not tracked.
+        Call :py:meth:`rebuild` after adding or removing nodes.
+    """
+
+    def __init__( self, root ):
+        """Creates a TransformArray from the scene beneath root.
+
+        :param SceneNode root: The root of the scene.
+        """
+        super( TransformArray, self ).__init__()
+
+        self.root = root
+        self.rebuild()
+
+    def rebuild( self ):
+        """Re-reads the structure of the scene and
+        re-allocates the arrays.
+
+        The transform values are gathered from the scene
+        and the world matrices are updated.
+        """
+        self.nodes, self.parents, self.depths, self.ends = flatten( self.root )
+        self.levels = levels( self.depths )
+        self.indices = dict(
+            [ (node, index) for index, node in enumerate( self.nodes ) ]
+            )
+        self.partitions = {}
+
+        count = len( self.nodes )
+        self.translations = numpy.zeros( (count, 3), dtype = numpy.float )
+        self.orientations = numpy.zeros( (count, 4), dtype = numpy.float )
+        self.scales = numpy.ones( (count, 3), dtype = numpy.float )
+        self.local_matrices = numpy.empty( (count, 4, 4), dtype = numpy.float )
+        self.world_matrices = numpy.empty( (count, 4, 4), dtype = numpy.float )
+
+        self.gather()
+        self.update()
+
+    def __len__( self ):
+        return len( self.nodes )
+
+    def index( self, node ):
+        """Returns the index of the node within the arrays.
+
+        :raise KeyError: Raised if the node is not in the array.
+        """
+        return self.indices[ node ]
+
+    @property
+    def arrays( self ):
+        """The arrays that hold per-node values.
+        """
+        return (
+            self.translations,
+            self.orientations,
+            self.scales,
+            self.local_matrices,
+            self.world_matrices,
+            )
+
+    def gather( self ):
+        """Copies the local transform values of each node
+        into the arrays.
+        """
+        for index, node in enumerate( self.nodes ):
+            transform = node.transform
+            self.translations[ index ] = transform.translation
+            self.orientations[ index ] = transform.orientation
+            self.scales[ index ] = transform.scale
+
+    def scatter( self, indices = None ):
+        """Copies the array values back to each node's local transform.
+
+        .. note::
+            Each node will dispatch 'on_transform_changed' events.
+
+        :param indices: An optional list of node indices to write.
+            If not specified, all nodes are written.
+        """
+        if indices is None:
+            indices = xrange( len( self.nodes ) )
+
+        for index in indices:
+            transform = self.nodes[ index ].transform
+            transform.translation = self.translations[ index ]
+            transform.orientation = self.orientations[ index ]
+            transform.scale = self.scales[ index ]
+
+    def update( self, executor = None, batch_count = 4, indices = None ):
+        """Recalculates the local and world matrices
+        from the current array values.
+
+        :param executor: An optional executor, such as a
+            concurrent.futures.ThreadPoolExecutor, used to calculate
+            independent subtrees in parallel.
+        :param int batch_count: The number of batches to divide the
+            tree into when an executor is used.
+        :param numpy.array indices: An optional array of the nodes
+            whose values changed. If specified, only their local
+            matrices and the world matrices of their subtrees are
+            recalculated, and the executor is not used.
+        """
+        if indices is not None:
+            self._update_subtrees( indices )
+            return
+
+        create_matrices(
+            self.translations,
+            self.orientations,
+            self.scales,
+            out = self.local_matrices
+            )
+
+        if executor is None:
+            world_matrices(
+                self.local_matrices,
+                self.parents,
+                self.levels,
+                out = self.world_matrices
+                )
+            return
+
+        # the partition only depends on the structure
+        # so it is calculated once per batch count
+        if batch_count not in self.partitions:
+            self.partitions[ batch_count ] = partition(
+                self.depths,
+                self.ends,
+                batch_count
+                )
+        top, batches = self.partitions[ batch_count ]
+
+        world_matrices_parallel(
+            self.local_matrices,
+            self.parents,
+            top,
+            batches,
+            executor,
+            out = self.world_matrices
+            )
+
+    def _update_subtrees( self, indices ):
+        indices = numpy.asarray( indices, dtype = numpy.int )
+        if not len( indices ):
+            return
+
+        self.local_matrices[ indices ] = create_matrices(
+            self.translations[ indices ],
+            self.orientations[ indices ],
+            self.scales[ indices ]
+            )
+
+        # nodes in pre-order, so each subtree is a contiguous range
+        bounds = numpy.zeros( len( self.nodes ) + 1, dtype = numpy.int )
+        numpy.add.at( bounds, indices, 1 )
+        numpy.add.at( bounds, self.ends[ indices ], -1 )
+        changed = numpy.cumsum( bounds[ :-1 ] ) > 0
+
+        for depth, level in enumerate( self.levels ):
+            level = level[ changed[ level ] ]
+            if depth == 0:
+                self.world_matrices[ level ] = self.local_matrices[ level ]
+            else:
+                self.world_matrices[ level ] = numpy.matmul(
+                    self.local_matrices[ level ],
+                    self.world_matrices[ self.parents[ level ] ]
+                    )
+
+    @property
+    def writeable( self ):
+        """Whether the value arrays can be modified.
+
+        Setting this to False makes the arrays read-only, which
+        allows the arrays to be safely shared.
+        """
+        return self.world_matrices.flags.writeable
+
+    @writeable.setter
+    def writeable( self, writeable ):
+        for array in self.arrays:
+            array.flags.writeable = writeable
+
+    def copy( self ):
+        """Returns a copy of the array.
+
+        The scene structure is shared with the copy,
+        the value arrays are not.
+        """
+        other = TransformArray.__new__( TransformArray )
+        other.root = self.root
+        other.nodes = self.nodes
+        other.parents = self.parents
+        other.depths = self.depths
+        other.ends = self.ends
+        other.levels = self.levels
+        other.indices = self.indices
+        other.partitions = self.partitions
+        other.translations = self.translations.copy()
+        other.orientations = self.orientations.copy()
+        other.scales = self.scales.copy()
+        other.local_matrices = self.local_matrices.copy()
+        other.world_matrices = self.world_matrices.copy()
+        return other
+
+    def copy_from( self, other ):
+        """Copies the values of another array into this one.
+
+        If the other array has a different structure, the
+        structure is adopted and the arrays re-allocated.
+        """
+        if self.nodes is not other.nodes:
+            copy = other.copy()
+            self.__dict__.update( copy.__dict__ )
+            return
+
+        numpy.copyto( self.translations, other.translations )
+        numpy.copyto( self.orientations, other.orientations )
+        numpy.copyto( self.scales, other.scales )
+        numpy.copyto( self.local_matrices, other.local_matrices )
+        numpy.copyto( self.world_matrices, other.world_matrices )
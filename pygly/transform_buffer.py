@@ -0,0 +1,123 @@
+"""Provides double-buffered transform snapshots.
+
+This allows a scene to be updated on one thread while
+it is rendered from another.
+
+The update thread owns the scene and the back buffer.
+It modifies the scene, gathers the new values into the
+back buffer, calculates the world matrices and then
+publishes the buffer by swapping it with the front buffer.
+
+The render thread only ever reads the front buffer, which
+is read-only and does not change while it is being read.
+
+Example::
+
+    buffer = TransformBuffer( root )
+
+    # update thread
+    while running:
+        step( root, dt )
+        buffer.back.gather()
+        buffer.back.update()
+        buffer.swap()
+
+    # render thread
+    while running:
+        with buffer.read() as front:
+            for index, node in enumerate( front.nodes ):
+                render( node, front.world_matrices[ index ] )
+"""
+
+import threading
+from contextlib import contextmanager
+
+from transform_array import TransformArray
+
+
+class TransformBuffer( object ):
+    """A pair of :py:class:`pygly.transform_array.TransformArray`
+    objects that are swapped once per frame.
+    """
+
+    def __init__( self, root ):
+        """Creates a TransformBuffer for the scene beneath root.
+
+        :param SceneNode root: The root of the scene.
+        """
+        super( TransformBuffer, self ).__init__()
+
+        front = TransformArray( root )
+        front.writeable = False
+
+        self._buffers = [ front, front.copy() ]
+        self._readers = [ 0, 0 ]
+        self._front = 0
+        self._condition = threading.Condition()
+
+    @property
+    def front( self ):
+        """The most recently published buffer.
+
+        The arrays of the front buffer are read-only.
+
+        .. note::
+            The front buffer may be recycled by the next call to
+            :py:meth:`swap`. Use :py:meth:`read` to hold the buffer
+            for the duration of a frame.
+        """
+        return self._buffers[ self._front ]
+
+    @property
+    def back( self ):
+        """The buffer being written by the update thread.
+        """
+        return self._buffers[ self._front ^ 1 ]
+
+    @contextmanager
+    def read( self ):
+        """Context manager that provides the front buffer.
+
+        The buffer will not be recycled until the context exits.
+        """
+        with self._condition:
+            index = self._front
+            self._readers[ index ] += 1
+
+        try:
+            yield self._buffers[ index ]
+        finally:
+            with self._condition:
+                self._readers[ index ] -= 1
+                self._condition.notify_all()
+
+    def swap( self ):
+        """Publishes the back buffer as the new front buffer.
+
+        The previous front buffer becomes the back buffer once
+        any readers of it have finished. Its values are then
+        brought up to date with the published buffer so the
+        update thread continues from the latest state.
+        """
+        with self._condition:
+            published = self._front ^ 1
+            self._buffers[ published ].writeable = False
+            self._front = published
+
+            # wait for readers of the old front buffer
+            recycled = published ^ 1
+            while self._readers[ recycled ]:
+                self._condition.wait()
+
+        back = self._buffers[ recycled ]
+        back.writeable = True
+        back.copy_from( self._buffers[ published ] )
+
+    def rebuild( self ):
+        """Re-reads the structure of the scene into the back buffer.
+
+        Call this from the update thread after nodes are added
+        or removed. The new structure is visible to readers
+        after the next :py:meth:`swap`.
+        """
+        self.back.rebuild()
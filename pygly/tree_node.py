@@ -2,7 +2,7 @@ import sys
 import weakref
 from collections import deque
 
-from pydispatch import dispatcher
+import dispatcher
 
     
 class TreeNode( object ):
@@ -0,0 +1,196 @@
+"""Provides distance based update rates for scene nodes.
+
+Distant nodes rarely need to be animated every frame.
+An :py:class:`UpdateScheduler` assigns the nodes of a
+:py:class:`pygly.transform_array.TransformArray` to buckets
+by their distance from the camera. Each bucket is updated
+at its own interval, and nodes within a bucket are staggered
+so the work is spread evenly across frames.
+
+Between updates, the local transforms of a node are interpolated
+from its previous values to its latest values, so motion remains
+smooth. This means a node's displayed transform lags its latest
+update by up to one interval. Only nodes that are still being
+interpolated are written, so the transform work falls as nodes
+are moved to slower buckets.
+
+Example::
+
+    def animate( indices, elapsed ):
+        # calculate new values for only the indices given
+        return translations, orientations, scales
+
+    scheduler = UpdateScheduler( array, distances = [ 20.0, 100.0 ], intervals = [ 1, 2, 8 ] )
+
+    while running:
+        scheduler.assign( camera.world_transform.translation )
+        scheduler.step( animate, dt )
+        array.update( indices = scheduler.changed )
+"""
+
+import numpy
+
+
+class UpdateScheduler( object ):
+    """Updates the nodes of a TransformArray at rates based on
+    their distance.
+    """
+
+    def __init__(
+        self,
+        array,
+        distances = ( 25.0, 100.0, 400.0 ),
+        intervals = ( 1, 2, 4, 8 )
+        ):
+        """Creates a scheduler for the nodes in an array.
+
+        :param TransformArray array: The array to update.
+        :param list distances: The distances at which each bucket begins.
+        :param list intervals: The number of frames between updates
+            for each bucket. There must be one more interval than
+            distances, the first is used for nodes closer than the
+            first distance.
+        :raise ValueError: Raised if the number of intervals does
+            not match the number of distances.
+        """
+        super( UpdateScheduler, self ).__init__()
+
+        if len( intervals ) != len( distances ) + 1:
+            raise ValueError( "Incorrect number of intervals" )
+
+        self.array = array
+        self.distances = numpy.array( distances, dtype = numpy.float )
+        self.intervals = numpy.array( intervals, dtype = numpy.int )
+        #: The current frame number.
+        self.frame = 0
+
+        self.reset()
+
+    def reset( self ):
+        """Re-allocates the scheduler's values.
+
+        This must be called after the array is rebuilt.
+        All nodes are placed in the first bucket.
+        """
+        array = self.array
+        count = len( array )
+
+        #: The bucket of each node.
+        self.buckets = numpy.zeros( count, dtype = numpy.int )
+
+        # offset each node's updates so buckets are spread across frames
+        self._phases = numpy.arange( count )
+        # frames and time since each node was last updated
+        self._frames = numpy.zeros( count, dtype = numpy.int )
+        self._elapsed = numpy.zeros( count, dtype = numpy.float )
+        # the interval each node is interpolated over, kept until
+        # its next update if it changes buckets
+        self._intervals = numpy.ones( count, dtype = numpy.int )
+
+        #: The indices of the nodes whose transform values were
+        #: written by the last call to :py:meth:`step`.
+        self.changed = numpy.zeros( 0, dtype = numpy.int )
+
+        # the values to interpolate between
+        self._previous = (
+            array.translations.copy(),
+            array.orientations.copy(),
+            array.scales.copy(),
+            )
+        self._latest = (
+            array.translations.copy(),
+            array.orientations.copy(),
+            array.scales.copy(),
+            )
+
+    def assign( self, position, importance = None ):
+        """Assigns nodes to buckets by their distance from a position.
+
+        :param numpy.array position: The position to measure from,
+            usually the camera's world translation.
+        :param numpy.array importance: An optional value per node.
+            Distances are divided by the importance, so important
+            nodes are updated more often.
+        """
+        translations = self.array.world_matrices[ :, 3, 0:3 ]
+        distances = numpy.sqrt(
+            ( ( translations - position ) ** 2 ).sum( axis = 1 )
+            )
+        if importance is not None:
+            distances /= importance
+
+        self.buckets = numpy.searchsorted( self.distances, distances, side = 'right' )
+
+    def due( self ):
+        """Returns the indices of the nodes that will be updated
+        in the next call to :py:meth:`step`.
+
+        :rtype: numpy.array
+        """
+        intervals = self.intervals[ self.buckets ]
+        return numpy.nonzero(
+            ( self.frame + self._phases ) % intervals == 0
+            )[ 0 ]
+
+    def step( self, update, dt ):
+        """Advances the scheduler by a frame.
+
+        The update callable is called with the indices of the nodes
+        that are due and the time elapsed since each was last updated.
+        It must return the new (translations, orientations, scales)
+        of those nodes.
+
+        The array's transform values are then set to the
+        interpolated values of every node that is between updates,
+        and their indices stored in :py:attr:`changed`.
+        The world matrices are not recalculated, call
+        :py:meth:`pygly.transform_array.TransformArray.update` with
+        the changed indices to do so.
+
+        :param update: The callable used to update nodes.
+        :param float dt: The time since the last frame.
+        :rtype: numpy.array
+        :return: The indices of the nodes that were updated.
+        """
+        self._elapsed += dt
+        indices = self.due()
+
+        if len( indices ):
+            values = update( indices, self._elapsed[ indices ] )
+            for previous, latest, value in zip( self._previous, self._latest, values ):
+                previous[ indices ] = latest[ indices ]
+                latest[ indices ] = value
+            self._elapsed[ indices ] = 0.0
+            self._frames[ indices ] = 0
+            self._intervals[ indices ] = self.intervals[ self.buckets[ indices ] ]
+
+        # nodes that have reached their latest values don't change
+        self.changed = numpy.nonzero( self._frames < self._intervals )[ 0 ]
+        self._interpolate( self.changed )
+
+        self._frames += 1
+        self.frame += 1
+        return indices
+
+    def _interpolate( self, indices ):
+        array = self.array
+        previous_translations, previous_orientations, previous_scales = [
+            values[ indices ] for values in self._previous
+            ]
+        latest_translations, latest_orientations, latest_scales = [
+            values[ indices ] for values in self._latest
+            ]
+
+        # the latest values are reached on the frame before the next update
+        alpha = numpy.minimum( ( self._frames[ indices ] + 1.0 ) / self._intervals[ indices ], 1.0 )
+        alpha = alpha[ :, numpy.newaxis ]
+
+        array.translations[ indices ] = previous_translations + ( latest_translations - previous_translations ) * alpha
+        array.scales[ indices ] = previous_scales + ( latest_scales - previous_scales ) * alpha
+
+        # interpolate along the shortest path between orientations
+        dots = ( previous_orientations * latest_orientations ).sum( axis = 1 )
+        signs = numpy.where( dots < 0.0, -1.0, 1.0 )[ :, numpy.newaxis ]
+        orientations = previous_orientations + ( latest_orientations * signs - previous_orientations ) * alpha
+        orientations /= numpy.sqrt( ( orientations ** 2 ).sum( axis = 1 ) )[ :, numpy.newaxis ]
+        array.orientations[ indices ] = orientations
@@ -2,7 +2,7 @@ import sys
 
 import numpy
 from OpenGL import GL
-from pydispatch import dispatcher
+import dispatcher
 
 from pyrr import rectangle
 from pyrr import geometric_tests
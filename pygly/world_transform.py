@@ -7,7 +7,7 @@ Created on 11/06/2012
 import sys
 
 import numpy
-from pydispatch import dispatcher
+import dispatcher
 
 from pyrr import quaternion
 from pyrr import matrix33
@@ -17,6 +17,7 @@ from object_space import ObjectSpace
 from inertial_space import InertialSpace
 from tree_node import TreeNode
 from transform import Transform
+import affine
 
 
 class WorldTransform( TreeNode ):
@@ -25,6 +26,7 @@ class WorldTransform( TreeNode ):
     def __init__( self, transform ):
         super( WorldTransform, self ).__init__()
 
+        self._version = 0
         self.set_dirty()
 
         # the local transform
@@ -46,10 +48,21 @@ class WorldTransform( TreeNode ):
             )
 
     def set_dirty( self ):
+        self._version += 1
         self._orientation = None
         self._translation = None
         self._scale = None
         self._matrix = None
+        self._inverse_matrix = None
+
+    @property
+    def version( self ):
+        """A number that changes each time the world transform changes.
+
+        This allows values derived from the world transform
+        to be cached.
+        """
+        return self._version
 
     def _on_parent_changed( self, old_parent, new_parent ):
         # mark ourself as dirty
@@ -94,7 +107,7 @@ class WorldTransform( TreeNode ):
     
     @property
     def scale( self ):
-        if self._scale == None:
+        if self._scale is None:
             if self.parent == None:
                 # we don't have a parent
                 # so just use our current local scale
@@ -119,7 +132,7 @@ class WorldTransform( TreeNode ):
 
     @property
     def orientation( self ):
-        if self._orientation == None:
+        if self._orientation is None:
             if self.parent == None:
                 # we don't have a parent
                 # so just use our current local orientation
@@ -147,7 +160,7 @@ class WorldTransform( TreeNode ):
 
     @property
     def translation( self ):
-        if self._translation == None:
+        if self._translation is None:
             if self.parent == None:
                 # we don't have a parent
                 # so just use our current local translation
@@ -178,7 +191,7 @@ class WorldTransform( TreeNode ):
         object translation, orientation and
         scale.
         """
-        if self._matrix == None:
+        if self._matrix is None:
             if self.parent == None:
                 self._matrix = self._transform.matrix.copy()
             else:
@@ -189,3 +202,14 @@ class WorldTransform( TreeNode ):
 
         return self._matrix
 
+    @property
+    def inverse_matrix( self ):
+        """
+        Returns the inverse of the world matrix.
+
+        The inverse is cached until the world transform changes.
+        """
+        if self._inverse_matrix is None:
+            self._inverse_matrix = affine.inverse( self.matrix )
+
+        return self._inverse_matrix